@@ -0,0 +1,307 @@
+"""
+Benchmarks for the fetch, analysis, plotting and Double Q-learning hot paths.
+
+Every benchmark runs on synthetic hourly data from meteo_stub, so results do
+not depend on the network. Wall time is the best of several runs; peak memory
+is measured in one extra run under tracemalloc, which is kept out of the timed
+runs because it slows allocations down.
+
+Usage:
+    python benchmarks.py --sizes month year --depths 1 4 --output bench.json
+    python benchmarks.py --baseline bench.json --output new.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import requests
+
+import weather
+from energy_dql import train_double_q_batch
+from meteo_stub import StubMeteoServer, synthetic_hourly
+
+LATITUDE = 52.52
+LONGITUDE = 13.41
+
+# Air temperature followed by soil layers from shallow to deep.
+VARIABLES = [
+    "temperature_2m",
+    "soil_temperature_0_to_7cm",
+    "soil_temperature_7_to_28cm",
+    "soil_temperature_28_to_100cm",
+    "soil_temperature_100_to_255cm",
+]
+
+SIZES = {
+    'month': ('2023-01-01', '2023-01-31'),
+    'year': ('2023-01-01', '2023-12-31'),
+    '30years': ('1994-01-01', '2023-12-31'),
+}
+
+
+def make_dataset(size, depths):
+    """Returns a DataFrame in the fetch_meteo_data format with air temperature and depths soil layers."""
+    start, end = SIZES[size]
+    variables = VARIABLES[:depths + 1]
+    times, values = synthetic_hourly(LATITUDE, start, end, variables)
+    df = pd.DataFrame({'time': times.astype('datetime64[ns]')})
+    for var in variables:
+        df[var] = values[var]
+    return df
+
+
+class ReplaySession:
+    """Session stand-in that answers every get() with one recorded response, to time parsing alone."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def get(self, url, **kwargs):
+        response = requests.models.Response()
+        response.status_code = 200
+        response._content = self.body
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+
+class Context:
+    """Inputs shared by the benchmarks of one dataset size and depth."""
+
+    def __init__(self, size, depths, stub_url, workdir):
+        self.size = size
+        self.depths = depths
+        self.start, self.end = SIZES[size]
+        self.variables = VARIABLES[:depths + 1]
+        self.df = make_dataset(size, depths)
+        self.stub_url = stub_url
+        self.workdir = workdir
+        body = requests.get(self._url()).content
+        self.replay = ReplaySession(body)
+        self.response_bytes = len(body)
+
+    def _url(self):
+        return (f"{self.stub_url}?latitude={LATITUDE}&longitude={LONGITUDE}&start_date={self.start}"
+                f"&end_date={self.end}&hourly={','.join(self.variables)}")
+
+    def fresh(self):
+        """Returns a copy of the dataset, since the diff functions add columns to their input."""
+        return self.df.copy()
+
+    def output(self, name):
+        return os.path.join(self.workdir, f"{name}.png")
+
+
+def _var_pair(ctx):
+    # Air against the shallowest soil layer, as in input.ipynb.
+    return ctx.variables[0], ctx.variables[1]
+
+
+def bench_fetch_stub(ctx):
+    weather.fetch_meteo_data(LATITUDE, LONGITUDE, ctx.start, ctx.end, ctx.variables, base_url=ctx.stub_url)
+
+
+def bench_fetch_parse(ctx):
+    weather.fetch_meteo_data(LATITUDE, LONGITUDE, ctx.start, ctx.end, ctx.variables, session=ctx.replay)
+
+
+def bench_print_diffs(ctx):
+    weather.calculate_and_print_hourly_diffs(ctx.fresh(), *_var_pair(ctx))
+
+
+def bench_print_diffs_grouped(ctx):
+    weather.calculate_and_print_hourly_diffs_grouped(ctx.fresh(), *_var_pair(ctx))
+
+
+def bench_print_diffs_3grouped(ctx):
+    weather.calculate_and_print_hourly_diffs_3grouped(ctx.fresh(), *_var_pair(ctx))
+
+
+def bench_print_diffs_4grouped(ctx):
+    weather.calculate_and_print_hourly_diffs_4grouped(ctx.fresh(), *_var_pair(ctx))
+
+
+def bench_find_hmm_2group(ctx):
+    weather.find_Hmm_2group(ctx.fresh(), *_var_pair(ctx))
+
+
+def bench_render_temperatures(ctx):
+    weather.plot_temperature_data(ctx.df, ctx.variables, output_path=ctx.output('temperatures'))
+
+
+def bench_render_diffs(ctx):
+    weather.calculate_and_plot_graph_hourly_diffs(ctx.fresh(), *_var_pair(ctx), output_path=ctx.output('diffs'))
+
+
+def bench_render_diffs_3group(ctx):
+    weather.calculate_and_plot_graph_hourly_diffs_3group(ctx.fresh(), *_var_pair(ctx), output_path=ctx.output('diffs_3group'))
+
+
+def bench_render_diffs_4group(ctx):
+    weather.calculate_and_plot_graph_hourly_diffs_4group(ctx.fresh(), *_var_pair(ctx), output_path=ctx.output('diffs_4group'))
+
+
+def bench_double_q(ctx):
+    air, soil = _var_pair(ctx)
+    train_double_q_batch(ctx.df[air].to_numpy(), ctx.df[soil].to_numpy(), episodes=1, seed=0)
+
+
+BENCHMARKS = {
+    'fetch_stub': bench_fetch_stub,
+    'fetch_parse': bench_fetch_parse,
+    'print_diffs': bench_print_diffs,
+    'print_diffs_grouped': bench_print_diffs_grouped,
+    'print_diffs_3grouped': bench_print_diffs_3grouped,
+    'print_diffs_4grouped': bench_print_diffs_4grouped,
+    'find_hmm_2group': bench_find_hmm_2group,
+    'render_temperatures': bench_render_temperatures,
+    'render_diffs': bench_render_diffs,
+    'render_diffs_3group': bench_render_diffs_3group,
+    'render_diffs_4group': bench_render_diffs_4group,
+    'double_q': bench_double_q,
+}
+
+
+def _call(func, ctx):
+    # The analysis functions print every hour and open figures; keep both out of the way.
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        func(ctx)
+    plt.close('all')
+
+
+def measure(func, ctx, repeat=3):
+    """
+    Times a benchmark and measures its peak traced memory.
+
+    Returns:
+        dict: wall_s (best run), wall_runs (every run) and peak_bytes.
+    """
+    _call(func, ctx)  # warm-up: imports, caches, font loading
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _call(func, ctx)
+        runs.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        _call(func, ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'wall_s': min(runs), 'wall_runs': runs, 'peak_bytes': peak}
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+        'timestamp': pd.Timestamp.now().isoformat(timespec='seconds'),
+    }
+
+
+def run_benchmarks(sizes=('month', 'year'), depths=(1, 4), names=None, repeat=3, log=print):
+    """
+    Runs the selected benchmarks for every dataset size and depth.
+
+    Args:
+        sizes (list): Keys of SIZES.
+        depths (list): Number of soil layers next to air temperature, 1 to 4.
+        names (list, optional): Keys of BENCHMARKS, defaults to all of them.
+        repeat (int): Timed runs per benchmark.
+        log (callable): Receives one progress line per benchmark.
+
+    Returns:
+        dict: 'environment' and 'results', one entry per benchmark, size and depth.
+    """
+    names = list(BENCHMARKS) if names is None else names
+    results = []
+    with StubMeteoServer() as stub, tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            for depth in depths:
+                ctx = Context(size, depth, stub.url, workdir)
+                for name in names:
+                    result = measure(BENCHMARKS[name], ctx, repeat)
+                    result.update(name=name, size=size, depths=depth, rows=len(ctx.df), response_bytes=ctx.response_bytes)
+                    results.append(result)
+                    log(f"{name:<22} {size:<8} depths={depth}  {result['wall_s'] * 1000:10.1f} ms  {result['peak_bytes'] / 2**20:8.1f} MiB")
+    return {'environment': environment(), 'results': results}
+
+
+def _key(result):
+    return result['name'], result['size'], result['depths']
+
+
+def compare(current, baseline, threshold=1.2):
+    """
+    Compares two result sets.
+
+    Args:
+        current (dict): Output of run_benchmarks.
+        baseline (dict): Earlier output of run_benchmarks.
+        threshold (float): Time or memory ratio above which a benchmark counts as a regression.
+
+    Returns:
+        pandas.DataFrame: One row per benchmark present in both, with time and
+        memory ratios (current / baseline) and a regression flag.
+    """
+    previous = {_key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        time_ratio = result['wall_s'] / old['wall_s'] if old['wall_s'] else np.nan
+        memory_ratio = result['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else np.nan
+        rows.append({
+            'name': result['name'], 'size': result['size'], 'depths': result['depths'],
+            'baseline_s': old['wall_s'], 'current_s': result['wall_s'], 'time_ratio': time_ratio,
+            'baseline_mib': old['peak_bytes'] / 2**20, 'current_mib': result['peak_bytes'] / 2**20,
+            'memory_ratio': memory_ratio,
+            'regression': bool(time_ratio > threshold or memory_ratio > threshold),
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['month', 'year'], choices=list(SIZES))
+    parser.add_argument('--depths', nargs='+', type=int, default=[1, 4], choices=[1, 2, 3, 4])
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='run only these benchmarks')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.sizes, args.depths, args.only, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare(current, baseline, args.threshold)
+        print(comparison.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        if args.fail_on_regression and comparison['regression'].any():
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
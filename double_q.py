@@ -0,0 +1,177 @@
+import random
+
+import numpy as np
+
+
+# --- Policy and update ---
+
+def epsilon_greedy(q1, q2, state, epsilon, rng):
+    """
+    Picks a random action with probability epsilon, otherwise the best action on Q1 + Q2.
+
+    Args:
+        q1, q2 (numpy.ndarray): Q tables of shape (n_states, n_actions).
+        state (int): Current state.
+        epsilon (float): Exploration rate.
+        rng (random.Random): Random number generator.
+
+    Returns:
+        int: Chosen action.
+    """
+    return _explore_or_exploit(q1, q2, state, epsilon, rng)[0]
+
+
+def _explore_or_exploit(q1, q2, state, epsilon, rng):
+    """epsilon_greedy that also returns whether the action was a random one."""
+    if rng.random() < epsilon:
+        return rng.randrange(q1.shape[1]), True
+    return int(np.argmax(q1[state] + q2[state])), False
+
+
+def double_q_update(q1, q2, state, action, reward, next_state, alpha, gamma, update_first):
+    """
+    Applies one Double Q-learning update in place.
+
+    When update_first is True, Q1 moves towards the reward plus Q2's value of
+    Q1's best next action; otherwise the roles of the two tables are swapped.
+    """
+    learner, critic = (q1, q2) if update_first else (q2, q1)
+    a_prime = np.argmax(learner[next_state])
+    learner[state, action] += alpha * (reward + gamma * critic[next_state, a_prime] - learner[state, action])
+
+
+# --- Environment ---
+
+class ChainWalk:
+    """
+    Chain of states where action 0 steps left and action 1 steps right.
+
+    Every step costs -1 and reaching the goal at the right end pays +1 and ends
+    the episode, as in the doubleQlearning script.
+
+    Args:
+        n_states (int): Number of states in the chain.
+        start (int): Starting state of every episode.
+    """
+
+    n_actions = 2
+
+    def __init__(self, n_states=5, start=0):
+        self.n_states = n_states
+        self.start = start
+        self.goal = n_states - 1
+        self.state = start
+
+    def reset(self):
+        self.state = self.start
+        return self.state
+
+    def step(self, action):
+        """Returns (next_state, reward, done)."""
+        next_state = self.state - 1 if action == 0 else self.state + 1
+        next_state = max(0, min(self.goal, next_state))  # Ensure next_state stays within bounds
+        self.state = next_state
+        done = next_state == self.goal
+        return next_state, (1 if done else -1), done
+
+
+# --- Tracing ---
+
+def print_tracer(event, **fields):
+    """Tracer printing every episode and step with the lines of the original script."""
+    if event == 'episode':
+        print("episode ", fields['episode'])
+        return
+    table = 'Q1' if fields['update_first'] else 'Q2'
+    values = fields['q1'] if fields['update_first'] else fields['q2']
+    print(f"greedy: number {'less' if fields['explored'] else 'greater'} than {fields['epsilon']}")
+    print("action ", fields['action'])
+    print("next state", fields['next_state'])
+    print("reward is", fields['reward'])
+    print(f"random {'less' if fields['update_first'] else 'greater'} than 0.5")
+    print(f"{table} state, action", fields['state'], fields['action'])
+    print(f"{table}[state, action]", values[fields['state'], fields['action']])
+    print(f"table {table}")
+    print(values)
+
+
+class SamplingTracer:
+    """
+    Forwards only every n-th step (and every episode start) to another tracer.
+
+    Args:
+        every (int): Forward one step in this many.
+        tracer (callable): Tracer receiving the sampled events.
+    """
+
+    def __init__(self, every=1000, tracer=print_tracer):
+        self.every = every
+        self.tracer = tracer
+        self.steps = 0
+
+    def __call__(self, event, **fields):
+        if event == 'step':
+            self.steps += 1
+            if self.steps % self.every:
+                return
+        self.tracer(event, **fields)
+
+
+# --- Training ---
+
+def train(env, episodes=500, alpha=0.1, gamma=0.9, epsilon=0.9, seed=None, trace=None,
+          q1=None, q2=None, max_steps=100000, rng=None):
+    """
+    Trains Double Q-learning tables on an environment.
+
+    Args:
+        env: Environment with n_states, n_actions, reset() and step(action).
+        episodes (int): Number of episodes.
+        alpha (float): Learning rate.
+        gamma (float): Discount factor.
+        epsilon (float): Exploration rate.
+        seed (int, optional): Seed of the random number generator.
+        trace (callable, optional): Called as trace('episode', episode=...) and
+            trace('step', episode=..., state=..., action=..., explored=...,
+            epsilon=..., next_state=..., reward=..., update_first=..., q1=...,
+            q2=...). When None, tracing costs a single None check per step.
+        q1, q2 (numpy.ndarray, optional): Tables to continue training from.
+        max_steps (int): Step limit per episode.
+        rng (random.Random, optional): Generator to continue from, e.g. from a
+            checkpoint; seed is ignored when given.
+
+    Returns:
+        dict: q1, q2, episode_steps and episode_return, the last two being
+        arrays with one entry per episode, and rng, the generator to resume from.
+    """
+    if rng is None:
+        rng = random.Random(seed)
+    if q1 is None:
+        q1 = np.zeros((env.n_states, env.n_actions))
+    if q2 is None:
+        q2 = np.zeros((env.n_states, env.n_actions))
+    episode_steps = np.zeros(episodes, dtype=np.int64)
+    episode_return = np.zeros(episodes)
+
+    for episode in range(episodes):
+        if trace is not None:
+            trace('episode', episode=episode)
+        state = env.reset()
+        total = 0.0
+        steps = 0
+        done = False
+        while not done and steps < max_steps:
+            action, explored = _explore_or_exploit(q1, q2, state, epsilon, rng)
+            next_state, reward, done = env.step(action)
+            update_first = rng.random() < 0.5
+            double_q_update(q1, q2, state, action, reward, next_state, alpha, gamma, update_first)
+            if trace is not None:
+                trace('step', episode=episode, state=state, action=action, explored=explored, epsilon=epsilon,
+                      next_state=next_state, reward=reward, update_first=update_first, q1=q1, q2=q2)
+            total += reward
+            steps += 1
+            state = next_state
+        episode_steps[episode] = steps
+        episode_return[episode] = total
+
+    return {'q1': q1, 'q2': q2, 'episode_steps': episode_steps, 'episode_return': episode_return, 'rng': rng}
@@ -0,0 +1,124 @@
+"""
+Checkpoints of Double Q-learning training state in .npz files.
+
+A checkpoint holds q_table1 and q_table2 plus any further arrays (energy
+store, action counts, learning curves) as plain npz members, which
+dql_controller.load_q_tables reads directly, and a JSON 'meta' member with the
+hyperparameters and random number generator states.
+"""
+import json
+import os
+import random
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def rng_state(rng):
+    """Returns the state of a random.Random or numpy Generator as JSON-compatible data."""
+    if isinstance(rng, random.Random):
+        return {'kind': 'random', 'state': rng.getstate()}
+    return {'kind': 'numpy', 'state': rng.bit_generator.state}
+
+
+def _as_tuple(value):
+    return tuple(_as_tuple(v) for v in value) if isinstance(value, list) else value
+
+
+def restore_rng(state):
+    """Rebuilds a random.Random or numpy Generator from rng_state output (also after a JSON round trip)."""
+    if state['kind'] == 'random':
+        rng = random.Random()
+        rng.setstate(_as_tuple(state['state']))
+        return rng
+    bit_generator = getattr(np.random, state['state']['bit_generator'])()
+    bit_generator.state = state['state']
+    return np.random.Generator(bit_generator)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def save_checkpoint(path, q_table1, q_table2, params=None, rngs=None, **arrays):
+    """
+    Writes a checkpoint.
+
+    The file is written under a temporary name and renamed into place, so an
+    interrupted save never leaves a truncated checkpoint behind.
+
+    Args:
+        path (str): Destination .npz file.
+        q_table1, q_table2 (numpy.ndarray): Q tables, (states, actions) or (N, states, actions).
+        params (dict, optional): Hyperparameters; an 'actions' entry is also
+            stored as an array for dql_controller.load_q_tables.
+        rngs (list, optional): Random number generators whose states are saved.
+        **arrays: Further arrays, e.g. energy_store and action_counts.
+
+    Returns:
+        str: path.
+    """
+    params = dict(params or {})
+    meta = {
+        'version': FORMAT_VERSION,
+        'params': params,
+        'rng_states': [rng_state(rng) for rng in rngs] if rngs is not None else None,
+    }
+    members = {'q_table1': np.asarray(q_table1), 'q_table2': np.asarray(q_table2)}
+    if 'actions' in params:
+        members['actions'] = np.asarray(params['actions'])
+    members.update({name: np.asarray(value) for name, value in arrays.items() if value is not None})
+    members['meta'] = np.array(json.dumps(meta, default=_json_default))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **members)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_checkpoint(path):
+    """
+    Reads a checkpoint.
+
+    Returns:
+        dict: Every stored array by name, plus 'params' and 'rngs' (restored
+        generators, or None).
+    """
+    with np.load(path) as data:
+        checkpoint = {name: np.array(data[name]) for name in data.files if name != 'meta'}
+        meta = json.loads(str(data['meta'])) if 'meta' in data.files else {}
+    checkpoint['params'] = meta.get('params', {})
+    states = meta.get('rng_states')
+    checkpoint['rngs'] = [restore_rng(state) for state in states] if states is not None else None
+    return checkpoint
+
+
+def save_result(path, result, params=None):
+    """
+    Checkpoints the result of energy_dql.train_double_q_batch or double_q.train.
+
+    Q-tables are stored as q_table1 and q_table2 whichever trainer produced
+    them, the other arrays of the result under their own names and the
+    generators' states in meta.
+    """
+    q_table1 = result['q_table1'] if 'q_table1' in result else result['q1']
+    q_table2 = result['q_table2'] if 'q_table2' in result else result['q2']
+    rngs = result.get('rngs') or ([result['rng']] if 'rng' in result else None)
+    arrays = {name: value for name, value in result.items() if name not in ('q_table1', 'q_table2', 'q1', 'q2', 'rngs', 'rng')}
+    return save_checkpoint(path, q_table1, q_table2, params, rngs, **arrays)
+
+
+def resume_kwargs(checkpoint):
+    """Returns the q1, q2 and rng arguments that continue double_q.train from a checkpoint."""
+    rngs = checkpoint.get('rngs')
+    return {
+        'q1': np.array(checkpoint['q_table1'], dtype=np.float64),
+        'q2': np.array(checkpoint['q_table2'], dtype=np.float64),
+        'rng': rngs[0] if rngs else None,
+    }
@@ -0,0 +1,314 @@
+"""
+Runs a trained Double Q-learning policy against streaming temperature input.
+
+Example:
+    result = energy_dql.train_double_q_batch(air, soil, episodes=10)
+    dql_checkpoint.save_result("q_tables.npz", result, {'actions': energy_dql.ACTIONS})
+
+    controller = PolicyController.from_file("q_tables.npz", learn=True)
+    queue = asyncio.Queue(maxsize=1024)
+    service = ControllerService(controller, queue)
+    asyncio.run(run_simulation(service, air, soil))
+"""
+import asyncio
+import random
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from dql_checkpoint import save_checkpoint
+from double_q import double_q_update
+from energy_dql import ACTIONS, CSTORE, VMAX, VOUT, energy_bounds, state_edges
+
+
+def load_q_tables(path, index=0):
+    """
+    Loads q_table1 and q_table2 from an .npz file or dql_checkpoint checkpoint.
+
+    Files saved from the train_double_q_batch result hold tables of shape
+    (N, states, actions); index picks one of the N controllers.
+
+    Returns:
+        tuple: (q_table1, q_table2, actions, energy_store) where actions and
+        energy_store are None if the file does not store them.
+    """
+    with np.load(path) as data:
+        q_table1 = np.array(data['q_table1'], dtype=np.float64)
+        q_table2 = np.array(data['q_table2'], dtype=np.float64)
+        actions = np.array(data['actions']) if 'actions' in data else None
+        energy_store = np.array(data['energy_store'], dtype=np.float64) if 'energy_store' in data else None
+    if q_table1.ndim == 3:
+        q_table1, q_table2 = q_table1[index], q_table2[index]
+        if energy_store is not None and energy_store.ndim == 1:
+            energy_store = energy_store[index]
+    return q_table1, q_table2, actions, None if energy_store is None else float(energy_store)
+
+
+class PolicyController:
+    """
+    Picks duty-cycle actions for hourly temperature readings with a lookup table.
+
+    The controller tracks the energy store like doubleQlearningpaper: each
+    reading harvests |air - soil| * 0.1, the chosen action consumes
+    0.01 + 0.005 * action, and the state is the bin of the resulting state of
+    energy. The greedy action of every state is precomputed, so a decision is
+    a bisect over the state edges and a list lookup on Python floats.
+
+    With learn set, every transition is queued and learn_batch applies at most
+    max_batch Double Q-learning updates at a time, refreshing the lookup table
+    only for the states it touched.
+
+    Args:
+        q_table1, q_table2 (numpy.ndarray): Q tables of shape (states, actions).
+        actions (list): Action values, ACTIONS by default.
+        Cstore, Vmax, Vout (float): Capacitor parameters.
+        learn (bool): Keep learning from the readings.
+        alpha, gamma (float): Learning rate and discount factor for online learning.
+        max_batch (int): Maximum updates applied per learn_batch call.
+        seed (int, optional): Seed for the update coin flips.
+    """
+
+    def __init__(self, q_table1, q_table2, actions=ACTIONS, Cstore=CSTORE, Vmax=VMAX, Vout=VOUT,
+                 learn=False, alpha=0.3, gamma=0.8, max_batch=64, seed=None):
+        self.q_table1 = np.array(q_table1, dtype=np.float64)
+        self.q_table2 = np.array(q_table2, dtype=np.float64)
+        self.actions = [float(a) for a in actions]
+        self.max_action = max(self.actions)
+        num_states = self.q_table1.shape[0]
+        self.edges = state_edges(num_states).tolist()
+        self.last_state = num_states - 1
+        Emin, Emax = energy_bounds(Cstore, Vmax, Vout)
+        self.Emin, self.Emax = float(Emin), float(Emax)
+        self.reset()
+        self.policy = np.argmax(self.q_table1 + self.q_table2, axis=1).tolist()
+
+        self.learn = learn
+        self.alpha = alpha
+        self.gamma = gamma
+        self.max_batch = max_batch
+        self.pending = []
+        self.updates = 0
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_file(cls, path, index=0, **kwargs):
+        """
+        Builds a controller from load_q_tables(path, index).
+
+        Stored actions are used unless given, and the energy store continues
+        from a checkpointed value.
+        """
+        q_table1, q_table2, actions, energy_store = load_q_tables(path, index)
+        if actions is not None:
+            kwargs.setdefault('actions', actions)
+        controller = cls(q_table1, q_table2, **kwargs)
+        if energy_store is not None:
+            controller.reset(energy_store)
+        return controller
+
+    def reset(self, energy_store=None):
+        """Sets the energy store, by default to the middle of its range as at the start of training."""
+        if energy_store is None:
+            energy_store = self.Emin + (self.Emax - self.Emin) / 2
+        self.energy_store = float(energy_store)
+        self.soes = self._soes(self.energy_store)
+        self.state = self._state(self.soes)
+
+    def _soes(self, energy_store):
+        return 0.0 if energy_store < self.Emin else (energy_store - self.Emin) / (self.Emax - self.Emin)
+
+    def _state(self, soes):
+        # Same bins as energy_dql.determine_state.
+        return bisect_right(self.edges, soes) if 0.0 <= soes < 1.0 else self.last_state
+
+    def step(self, air_temp, soil_temp):
+        """
+        Decides the action for one reading and advances the energy store.
+
+        Returns:
+            float: The chosen action.
+        """
+        state = self.state
+        action_index = self.policy[state]
+        action = self.actions[action_index]
+        energy = self.energy_store + abs(air_temp - soil_temp) * 0.1 - (0.01 + 0.005 * action)
+        self.energy_store = energy = min(max(energy, self.Emin), self.Emax)
+        soes = self._soes(energy)
+        next_state = self._state(soes)
+        if self.learn:
+            reward = soes - self.soes
+            if reward > 0:
+                reward += 0.1 * (action / self.max_action)
+            self.pending.append((state, action_index, reward, next_state))
+        self.soes = soes
+        self.state = next_state
+        return action
+
+    def learn_batch(self):
+        """
+        Applies up to max_batch queued updates.
+
+        Returns:
+            int: Number of updates applied.
+        """
+        batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+        touched = set()
+        for state, action_index, reward, next_state in batch:
+            double_q_update(self.q_table1, self.q_table2, state, action_index, reward, next_state,
+                            self.alpha, self.gamma, self._rng.random() < 0.5)
+            touched.add(state)
+        for state in touched:
+            self.policy[state] = int(np.argmax(self.q_table1[state] + self.q_table2[state]))
+        self.updates += len(batch)
+        return len(batch)
+
+    def save(self, path):
+        """Checkpoints the tables and energy store for from_file; queued, unapplied updates are not saved."""
+        params = {'actions': self.actions, 'alpha': self.alpha, 'gamma': self.gamma}
+        return save_checkpoint(path, self.q_table1, self.q_table2, params, [self._rng], energy_store=self.energy_store)
+
+
+class ControllerMetrics:
+    """Decision count, throughput and queue lag of a ControllerService."""
+
+    def __init__(self):
+        self.decisions = 0
+        self.updates = 0
+        self.busy_ns = 0
+        self.lag_total_ns = 0
+        self.lag_max_ns = 0
+        self.started_ns = time.monotonic_ns()
+
+    def record(self, lag_ns, busy_ns):
+        self.decisions += 1
+        self.busy_ns += busy_ns
+        self.lag_total_ns += lag_ns
+        if lag_ns > self.lag_max_ns:
+            self.lag_max_ns = lag_ns
+
+    def summary(self, queue_depth=0):
+        """
+        Returns:
+            dict: decisions, decisions_per_sec over the service's lifetime,
+            decision_us (mean time spent per decision), mean and max queue lag
+            in milliseconds, online updates and the current queue depth.
+        """
+        elapsed = (time.monotonic_ns() - self.started_ns) / 1e9
+        decisions = max(self.decisions, 1)
+        return {
+            'decisions': self.decisions,
+            'decisions_per_sec': self.decisions / elapsed if elapsed > 0 else 0.0,
+            'decision_us': self.busy_ns / decisions / 1e3,
+            'lag_mean_ms': self.lag_total_ns / decisions / 1e6,
+            'lag_max_ms': self.lag_max_ns / 1e6,
+            'updates': self.updates,
+            'queue_depth': queue_depth,
+        }
+
+
+def reading(air_temp, soil_temp):
+    """Builds a queue item; the enqueue time stamp is what queue lag is measured from."""
+    return time.monotonic_ns(), float(air_temp), float(soil_temp)
+
+
+class ControllerService:
+    """
+    Consumes temperature readings from an asyncio.Queue and runs the controller on each.
+
+    Queue items are made by reading(); None stops the service. When the queue
+    runs dry or learn_every decisions have passed, one bounded learning batch
+    is applied, so learning never delays a waiting reading by more than
+    max_batch updates.
+
+    Args:
+        controller (PolicyController): The controller.
+        queue (asyncio.Queue): Source of readings.
+        on_decision (callable, optional): Called with (air, soil, action) after every decision.
+        learn_every (int): Decisions between learning batches while the queue is busy.
+    """
+
+    def __init__(self, controller, queue, on_decision=None, learn_every=256):
+        self.controller = controller
+        self.queue = queue
+        self.on_decision = on_decision
+        self.learn_every = learn_every
+        self.metrics = ControllerMetrics()
+
+    def _learn(self):
+        self.metrics.updates += self.controller.learn_batch()
+
+    async def run(self):
+        """Processes readings until None is received; returns the metrics summary."""
+        controller = self.controller
+        metrics = self.metrics
+        since_learn = 0
+        while True:
+            if controller.learn and controller.pending and (self.queue.empty() or since_learn >= self.learn_every):
+                self._learn()
+                since_learn = 0
+            item = await self.queue.get()
+            if item is None:
+                break
+            enqueued, air_temp, soil_temp = item
+            started = time.monotonic_ns()
+            action = controller.step(air_temp, soil_temp)
+            done = time.monotonic_ns()
+            metrics.record(started - enqueued, done - started)
+            since_learn += 1
+            if self.on_decision is not None:
+                self.on_decision(air_temp, soil_temp, action)
+        while controller.learn and controller.pending:
+            self._learn()
+        return self.metrics.summary(self.queue.qsize())
+
+
+async def simulated_feed(queue, air_temp, soil_temp, rate=None):
+    """
+    Puts a temperature series on the queue, then None.
+
+    Args:
+        queue (asyncio.Queue): Destination queue.
+        air_temp, soil_temp (array-like): Readings, e.g. from meteo_stub.synthetic_hourly.
+        rate (float, optional): Readings per second; as fast as the queue accepts when None.
+    """
+    interval = 1.0 / rate if rate else 0.0
+    for air, soil in zip(np.asarray(air_temp, dtype=np.float64).tolist(), np.asarray(soil_temp, dtype=np.float64).tolist()):
+        await queue.put(reading(air, soil))
+        await asyncio.sleep(interval)
+    await queue.put(None)
+
+
+async def reader_feed(reader, queue, air_col, soil_col, poll_interval=0.5, stop=None):
+    """
+    Forwards readings from a sensor_serial.SerialReader or sensor_frames.FrameReader.
+
+    The reader's thread fills its ring buffer; every poll_interval seconds the
+    buffered readings are drained and queued. Readings with a missing air or
+    soil value are skipped.
+
+    Args:
+        reader: A started reader.
+        queue (asyncio.Queue): Destination queue.
+        air_col, soil_col (str): Reader columns used as air and soil temperature.
+        poll_interval (float): Seconds between drains.
+        stop (asyncio.Event, optional): Ends the feed (after a final drain) and queues None.
+    """
+    while True:
+        finished = stop is not None and stop.is_set()
+        df = reader.to_dataframe()
+        values = df[[air_col, soil_col]].to_numpy(dtype=np.float64)
+        for air, soil in values[~np.isnan(values).any(axis=1)].tolist():
+            await queue.put(reading(air, soil))
+        if finished:
+            break
+        await asyncio.sleep(poll_interval)
+    await queue.put(None)
+
+
+async def run_simulation(service, air_temp, soil_temp, rate=None):
+    """Runs a simulated feed into the service's queue and returns the service metrics."""
+    feed = asyncio.create_task(simulated_feed(service.queue, air_temp, soil_temp, rate))
+    summary = await service.run()
+    await feed
+    return summary
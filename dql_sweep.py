@@ -0,0 +1,255 @@
+import hashlib
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from dql_checkpoint import load_checkpoint, save_checkpoint
+from double_q import ChainWalk, train
+from energy_dql import ACTIONS, CSTORE, NUM_STATES, VMAX, VOUT, precompute_energy, train_double_q_batch
+
+# Values used for any parameter the grid leaves out (doubleQlearningpaper settings).
+DEFAULTS = {
+    'alpha': 0.3,
+    'gamma': 0.8,
+    'epsilon': 0.02,
+    'num_episodes': 10,
+    'Cstore': CSTORE,
+    'Vmax': VMAX,
+    'Vout': VOUT,
+    'actions': tuple(ACTIONS),
+    'num_states': NUM_STATES,
+}
+
+# Defaults for the chain-walk sweep (doubleQlearning settings).
+CHAIN_DEFAULTS = {
+    'alpha': 0.1,
+    'gamma': 0.9,
+    'epsilon': 0.9,
+    'num_episodes': 500,
+    'n_states': 5,
+}
+
+# Per-run arrays of a sweep result, stacked per chunk in checkpoints.
+_CHUNK_ARRAYS = ('action_counts', 'learning_curve', 'energy_store')
+
+# Worker-side view of the shared energy series, set by _attach.
+_shared = {}
+
+
+def expand_runs(grid, repeats=1, base_seed=0, defaults=DEFAULTS):
+    """
+    Lists every run of a parameter grid with its own deterministic seed.
+
+    Seeds are spawned from one SeedSequence, so run i always gets the same seed
+    no matter how runs are scheduled across processes.
+
+    Args:
+        grid (dict): Parameter name to list of values; see DEFAULTS for names.
+            'actions' takes a list of action lists.
+        repeats (int): Number of seeds per parameter combination.
+        base_seed (int): Root seed of the sweep.
+        defaults (dict): Parameter defaults, DEFAULTS or CHAIN_DEFAULTS.
+
+    Returns:
+        list: One dict of parameters (including 'run' and 'seed') per run.
+    """
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    names = list(defaults)
+    values = [grid.get(name, [defaults[name]]) for name in names]
+    combos = [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    runs = [dict(combo, repeat=r) for combo in combos for r in range(repeats)]
+    children = np.random.SeedSequence(base_seed).spawn(len(runs))
+    for i, (run, child) in enumerate(zip(runs, children)):
+        if 'actions' in run:
+            run['actions'] = tuple(run['actions'])
+        run['run'] = i
+        run['seed'] = int(child.generate_state(1)[0])
+    return runs
+
+
+def _attach(name, shape):
+    memory = shared_memory.SharedMemory(name=name)
+    energy = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+    energy.flags.writeable = False
+    _shared['memory'] = memory
+    _shared['energy'] = energy
+
+
+def _train_chunk(runs):
+    """Trains one chunk of runs that share episodes, actions and states in a single vectorised pass."""
+    first = runs[0]
+    column = lambda name: np.array([run[name] for run in runs])
+    result = train_double_q_batch(
+        generated_energy=_shared['energy'],
+        alpha=column('alpha'), gamma=column('gamma'), epsilon=column('epsilon'), seed=column('seed'),
+        episodes=first['num_episodes'], actions=first['actions'], num_states=first['num_states'],
+        Cstore=column('Cstore'), Vmax=column('Vmax'), Vout=column('Vout'),
+    )
+    rows = []
+    for i, run in enumerate(runs):
+        rows.append(dict(
+            run,
+            q_table1=result['q_table1'][i],
+            q_table2=result['q_table2'][i],
+            action_counts=result['action_counts'][i],
+            learning_curve=result['episode_reward'][i],
+            final_reward=result['episode_reward'][i, -1],
+            energy_store=result['energy_store'][i],
+        ))
+    return rows
+
+
+def _chunk_path(checkpoint_dir, index):
+    return os.path.join(checkpoint_dir, f"chunk_{index:05d}.npz")
+
+
+def _energy_digest(energy):
+    """Fingerprint of the shared energy series, so chunks trained on other data are not reused."""
+    return hashlib.sha256(np.ascontiguousarray(energy, dtype=np.float64).tobytes()).hexdigest()
+
+
+def _run_params(run):
+    """Everything that determines a run's result, in the form it takes after a JSON round trip."""
+    params = {name: run[name] for name in ('run', 'seed', *DEFAULTS)}
+    params['actions'] = list(params['actions'])
+    return params
+
+
+def _save_chunk(path, rows, energy_digest):
+    params = {'runs': [_run_params(row) for row in rows], 'energy_sha256': energy_digest}
+    arrays = {name: np.stack([row[name] for row in rows]) for name in _CHUNK_ARRAYS}
+    save_checkpoint(path, np.stack([row['q_table1'] for row in rows]), np.stack([row['q_table2'] for row in rows]),
+                    params=params, **arrays)
+
+
+def _load_chunk(path, chunk, energy_digest):
+    """
+    Returns the rows of a checkpointed chunk, or None if it is missing or was
+    trained with other parameters, seeds or temperature data.
+    """
+    if not os.path.exists(path):
+        return None
+    checkpoint = load_checkpoint(path)
+    params = checkpoint['params']
+    if params.get('energy_sha256') != energy_digest or params.get('runs') != [_run_params(run) for run in chunk]:
+        return None
+    rows = []
+    for i, run in enumerate(chunk):
+        rows.append(dict(
+            run,
+            q_table1=checkpoint['q_table1'][i],
+            q_table2=checkpoint['q_table2'][i],
+            action_counts=checkpoint['action_counts'][i],
+            learning_curve=checkpoint['learning_curve'][i],
+            final_reward=checkpoint['learning_curve'][i, -1],
+            energy_store=checkpoint['energy_store'][i],
+        ))
+    return rows
+
+
+def run_sweep(df, grid, air_col='air_temp', soil_col='soil_temp_6cm', repeats=1, base_seed=0,
+              processes=None, chunk_size=16, checkpoint_dir=None):
+    """
+    Runs a Double Q-learning parameter sweep across a process pool.
+
+    The harvested energy per hour is computed once from the temperature columns
+    and copied into shared memory, which every worker maps read-only instead of
+    receiving its own pickled copy. Runs with the
+    same episodes, actions and number of states are trained in chunks of up to
+    chunk_size environments with energy_dql.train_double_q_batch.
+
+    Args:
+        df (pandas.DataFrame): Hourly air and soil temperatures.
+        grid (dict): Parameter grid, see expand_runs.
+        air_col (str): Air temperature column.
+        soil_col (str): Soil temperature column.
+        repeats (int): Number of seeds per parameter combination.
+        base_seed (int): Root seed of the sweep.
+        processes (int, optional): Number of worker processes.
+        chunk_size (int): Maximum runs trained together in one worker call.
+        checkpoint_dir (str, optional): Directory where every chunk is saved as
+            soon as it finishes. Rerunning the same sweep with the same
+            directory loads the finished chunks instead of training them again,
+            so an interrupted sweep picks up where it stopped. A chunk is only
+            reused when its runs' parameters, seeds and the energy series all
+            match; anything else is trained again and overwritten.
+
+    Returns:
+        pandas.DataFrame: One row per run with its parameters, seed, final
+        Q-tables, action counts, per-episode learning curve and final reward.
+    """
+    runs = expand_runs(grid, repeats, base_seed)
+    groups = {}
+    for run in runs:
+        groups.setdefault((run['num_episodes'], run['actions'], run['num_states']), []).append(run)
+    chunks = [group[i:i + chunk_size] for group in groups.values() for i in range(0, len(group), chunk_size)]
+
+    energy = precompute_energy(df[air_col].to_numpy(dtype=np.float64), df[soil_col].to_numpy(dtype=np.float64))
+    energy_digest = _energy_digest(energy) if checkpoint_dir is not None else None
+    rows = []
+    pending = list(range(len(chunks)))
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        pending = []
+        for i, chunk in enumerate(chunks):
+            chunk_rows = _load_chunk(_chunk_path(checkpoint_dir, i), chunk, energy_digest)
+            if chunk_rows is None:
+                pending.append(i)
+            else:
+                rows.extend(chunk_rows)
+
+    if pending:
+        memory = shared_memory.SharedMemory(create=True, size=energy.nbytes)
+        try:
+            np.ndarray(energy.shape, dtype=np.float64, buffer=memory.buf)[:] = energy
+            with ProcessPoolExecutor(max_workers=processes, initializer=_attach, initargs=(memory.name, energy.shape)) as executor:
+                futures = {executor.submit(_train_chunk, chunks[i]): i for i in pending}
+                for future in as_completed(futures):
+                    chunk_rows = future.result()
+                    if checkpoint_dir is not None:
+                        _save_chunk(_chunk_path(checkpoint_dir, futures[future]), chunk_rows, energy_digest)
+                    rows.extend(chunk_rows)
+        finally:
+            memory.close()
+            memory.unlink()
+
+    return pd.DataFrame(rows).sort_values('run', ignore_index=True)
+
+
+def _train_chain(run):
+    env = ChainWalk(n_states=run['n_states'])
+    result = train(env, episodes=run['num_episodes'], alpha=run['alpha'], gamma=run['gamma'],
+                   epsilon=run['epsilon'], seed=run['seed'])
+    return dict(
+        run,
+        q_table1=result['q1'],
+        q_table2=result['q2'],
+        learning_curve=result['episode_steps'],
+        final_steps=result['episode_steps'][-1],
+    )
+
+
+def run_chain_sweep(grid, repeats=1, base_seed=0, processes=None):
+    """
+    Runs a sweep of the doubleQlearning chain-walk experiment across a process pool.
+
+    Args:
+        grid (dict): Parameter grid over the names in CHAIN_DEFAULTS.
+        repeats (int): Number of seeds per parameter combination.
+        base_seed (int): Root seed of the sweep.
+        processes (int, optional): Number of worker processes.
+
+    Returns:
+        pandas.DataFrame: One row per run with its parameters, seed, final
+        Q-tables and steps per episode as the learning curve.
+    """
+    runs = expand_runs(grid, repeats, base_seed, CHAIN_DEFAULTS)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        rows = list(executor.map(_train_chain, runs, chunksize=max(1, len(runs) // 32)))
+    return pd.DataFrame(rows)
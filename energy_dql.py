@@ -0,0 +1,233 @@
+import copy
+import itertools
+
+import numpy as np
+
+# --- Energy harvesting model (defaults from doubleQlearningpaper) ---
+
+CSTORE = 1.0
+VMAX = 5.0
+VOUT = 3.0
+ACTIONS = [720, 480, 240, 120, 60, 10]
+NUM_STATES = 6
+
+
+def energy_bounds(Cstore=CSTORE, Vmax=VMAX, Vout=VOUT):
+    """Returns (Emin, Emax) of the storage capacitor."""
+    Cstore = np.asarray(Cstore, dtype=np.float64)
+    Emax = 0.5 * Cstore * (np.asarray(Vmax, dtype=np.float64) ** 2)
+    Emin = 0.5 * Cstore * (np.asarray(Vout, dtype=np.float64) ** 2)
+    return Emin, Emax
+
+
+def calculate_soes(Estore, Emin, Emax):
+    """State of energy storage in [0, 1], element-wise."""
+    Estore = np.asarray(Estore, dtype=np.float64)
+    return np.where(Estore < Emin, 0.0, (Estore - Emin) / (Emax - Emin))
+
+
+_state_edges = {}
+
+
+def state_edges(num_states=NUM_STATES):
+    """
+    Returns the upper edges 1/n, 2/n, ... of the first num_states - 1 states.
+
+    The array is built once per num_states and shared, so it is read-only.
+    """
+    edges = _state_edges.get(num_states)
+    if edges is None:
+        edges = np.arange(1, num_states) / num_states
+        edges.flags.writeable = False
+        _state_edges[num_states] = edges
+    return edges
+
+
+def determine_state(soes, num_states=NUM_STATES):
+    """
+    Element-wise version of determine_state in doubleQlearningpaper.
+
+    State i covers [i / num_states, (i + 1) / num_states); anything the loop in
+    the script does not match (1.0 and above, NaN) ends up in the last state.
+    A binary search over the precomputed edges replaces the linear scan.
+    """
+    soes = np.asarray(soes, dtype=np.float64)
+    state = np.searchsorted(state_edges(num_states), soes, side='right')
+    return np.where((soes >= 0) & (soes < 1), state, num_states - 1)
+
+
+def generate_energy(air_temp, soil_temp):
+    """Harvested energy for one hour, element-wise."""
+    return np.abs(np.asarray(air_temp) - np.asarray(soil_temp)) * 0.1
+
+
+def precompute_energy(air_temp, soil_temp):
+    """
+    Computes the harvested energy of every hour of a series once.
+
+    The result does not depend on the controller, so it can be passed as
+    generated_energy to train_double_q_batch and reused across episodes and runs.
+    """
+    energy = generate_energy(np.asarray(air_temp, dtype=np.float64), np.asarray(soil_temp, dtype=np.float64))
+    energy.flags.writeable = False
+    return energy
+
+
+# --- Vectorised Double Q-learning ---
+
+def expand_grid(**params):
+    """
+    Expands lists of parameter values into flat arrays of every combination.
+
+    Example:
+        expand_grid(alpha=[0.1, 0.3], seed=range(4)) gives 8 alphas and 8 seeds,
+        ready to pass to train_double_q_batch.
+    """
+    names = list(params)
+    combos = list(itertools.product(*(list(params[name]) for name in names)))
+    return {name: np.array([combo[i] for combo in combos]) for i, name in enumerate(names)}
+
+
+def train_double_q_batch(air_temp=None, soil_temp=None, alpha=0.3, gamma=0.8, epsilon=0.02, seed=0,
+                         episodes=10, actions=ACTIONS, num_states=NUM_STATES,
+                         Cstore=CSTORE, Vmax=VMAX, Vout=VOUT, generated_energy=None, resume=None):
+    """
+    Trains N independent Double Q-learning controllers in lockstep.
+
+    Every environment runs the simulation of doubleQlearningpaper: the energy
+    store is carried across episodes, each hour an epsilon-greedy action on
+    Q1 + Q2 is taken and a coin flip decides whether Q1 or Q2 is updated. All
+    per-step work is done on arrays over the N environments.
+
+    The hyperparameters, seed and capacitor parameters can each be a scalar or
+    an array of length N; air_temp and soil_temp can be shared arrays of
+    shape (T,) or per-environment arrays of shape (N, T) for different sites.
+    Each environment draws its random numbers from its own generator, so a
+    result depends only on its own seed and parameters, not on N.
+
+    The harvested energy per hour is computed once before the first episode;
+    pass generated_energy from precompute_energy to skip even that when the
+    same series is trained on repeatedly.
+
+    Training continues from resume when given: a previous result or a
+    checkpoint from dql_checkpoint.load_checkpoint. Its Q-tables, energy store,
+    action counts and, if present, random number generators are picked up, so
+    running 5 episodes and resuming for 5 more gives the same tables as 10
+    episodes in one go; episode_reward covers only the new episodes. The
+    generators are copied, so resuming twice from the same state gives the
+    same result. Generators that are not one NumPy Generator per environment,
+    such as the random.Random of a doubleQlearningpaper checkpoint, cannot
+    continue these streams; the environments are then seeded from seed.
+
+    Args:
+        air_temp (array-like): Air temperatures per hour.
+        soil_temp (array-like): Soil temperatures per hour.
+        alpha, gamma, epsilon (float or array-like): Learning rate, discount
+            factor and exploration rate.
+        seed (int or array-like): Seed per environment.
+        episodes (int): Number of passes over the temperature series.
+        actions (list): Duty-cycle actions shared by all environments.
+        num_states (int): Number of state-of-energy bins.
+        Cstore, Vmax, Vout (float or array-like): Capacitor parameters.
+        generated_energy (array-like, optional): Precomputed energy per hour of
+            shape (T,) or (N, T), used instead of air_temp and soil_temp.
+        resume (dict, optional): State to continue training from.
+
+    Returns:
+        dict: q_table1 and q_table2 of shape (N, num_states, len(actions)),
+        action_counts (N, len(actions)), episode_reward (N, episodes) with the
+        summed reward of each episode, energy_store (N,) at the end,
+        policy (N, num_states) with the greedy action index per state and
+        rngs, the per-environment generators to resume from.
+    """
+    if generated_energy is None:
+        generated_energy = precompute_energy(air_temp, soil_temp)
+    generated_energy = np.asarray(generated_energy, dtype=np.float64)
+    n_steps = generated_energy.shape[-1]
+    params = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(alpha, dtype=np.float64)),
+        np.atleast_1d(np.asarray(gamma, dtype=np.float64)),
+        np.atleast_1d(np.asarray(epsilon, dtype=np.float64)),
+        np.atleast_1d(np.asarray(seed)),
+        np.atleast_1d(np.asarray(Cstore, dtype=np.float64)),
+        np.atleast_1d(np.asarray(Vmax, dtype=np.float64)),
+        np.atleast_1d(np.asarray(Vout, dtype=np.float64)),
+        np.zeros(generated_energy.shape[0] if generated_energy.ndim == 2 else 1),
+    )
+    alpha, gamma, epsilon, seed, Cstore, Vmax, Vout = params[:7]
+    n_envs = len(alpha)
+    # Indexing by step gives a scalar for a shared series or one value per environment.
+    energy_by_step = generated_energy.T
+
+    actions = np.asarray(actions, dtype=np.float64)
+    num_actions = len(actions)
+    max_action = actions.max()
+    Emin, Emax = energy_bounds(Cstore, Vmax, Vout)
+    env = np.arange(n_envs)
+
+    resume = resume or {}
+    rngs = resume.get('rngs')
+    if rngs and len(rngs) == n_envs and all(isinstance(rng, np.random.Generator) for rng in rngs):
+        rngs = [copy.deepcopy(rng) for rng in rngs]
+    else:
+        rngs = [np.random.default_rng(int(s)) for s in seed]
+    shape = (n_envs, num_states, num_actions)
+    q_table1 = np.array(np.broadcast_to(resume.get('q_table1', 0.0), shape), dtype=np.float64)
+    q_table2 = np.array(np.broadcast_to(resume.get('q_table2', 0.0), shape), dtype=np.float64)
+    action_counts = np.array(np.broadcast_to(resume.get('action_counts', 0), (n_envs, num_actions)), dtype=np.int64)
+    episode_reward = np.zeros((n_envs, episodes))
+
+    energy_store = resume.get('energy_store')
+    if energy_store is None:
+        energy_store = Emin + (Emax - Emin) / 2
+    energy_store = np.broadcast_to(np.asarray(energy_store, dtype=np.float64), (n_envs,))
+    previous_soes = calculate_soes(energy_store, Emin, Emax)
+    current_state = determine_state(previous_soes, num_states)
+
+    for episode in range(episodes):
+        # Draw this episode's random numbers per environment up front.
+        explore_draw = np.stack([rng.random(n_steps) for rng in rngs])
+        random_action = np.stack([rng.integers(0, num_actions, n_steps) for rng in rngs])
+        coin = np.stack([rng.random(n_steps) for rng in rngs]) < 0.5
+
+        for t in range(n_steps):
+            greedy = np.argmax(q_table1[env, current_state] + q_table2[env, current_state], axis=1)
+            action_index = np.where(explore_draw[:, t] < epsilon, random_action[:, t], greedy)
+            action = actions[action_index]
+
+            consumed_energy = 0.01 + 0.005 * action
+            energy_store = np.clip(energy_store + energy_by_step[t] - consumed_energy, Emin, Emax)
+            current_soes = calculate_soes(energy_store, Emin, Emax)
+            next_state = determine_state(current_soes, num_states)
+
+            reward = current_soes - previous_soes
+            reward = np.where(reward > 0, reward + 0.1 * (action / max_action), reward)
+
+            # Coin flip: update Q1 towards Q2's value of Q1's best next action, or vice versa.
+            update_first = coin[:, t]
+            learner = np.where(update_first[:, None], q_table1[env, next_state], q_table2[env, next_state])
+            critic = np.where(update_first[:, None], q_table2[env, next_state], q_table1[env, next_state])
+            a_prime = np.argmax(learner, axis=1)
+            target = reward + gamma * critic[env, a_prime]
+            first, second = env[update_first], env[~update_first]
+            q_table1[first, current_state[first], action_index[first]] += alpha[first] * (
+                target[first] - q_table1[first, current_state[first], action_index[first]]
+            )
+            q_table2[second, current_state[second], action_index[second]] += alpha[second] * (
+                target[second] - q_table2[second, current_state[second], action_index[second]]
+            )
+
+            action_counts[env, action_index] += 1
+            episode_reward[:, episode] += reward
+            current_state = next_state
+            previous_soes = current_soes
+
+    return {
+        'q_table1': q_table1,
+        'q_table2': q_table2,
+        'action_counts': action_counts,
+        'episode_reward': episode_reward,
+        'energy_store': energy_store,
+        'policy': np.argmax(q_table1 + q_table2, axis=2),
+        'rngs': rngs,
+    }
@@ -0,0 +1,148 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+def synthetic_hourly(latitude, start_date, end_date, temperature_variables):
+    """
+    Generates deterministic hourly temperatures shaped like Open-Meteo data.
+
+    Air temperature follows a daily and a yearly cycle; each further variable is
+    treated as a deeper soil layer with a damped, lagged copy of that cycle.
+    The noise depends only on the hour, so a sub-range returns exactly the
+    values of the same hours in a longer range.
+
+    Args:
+        latitude (float): Latitude of the location, used to shift the mean.
+        start_date (str): Start date in 'YYYY-MM-DD' format.
+        end_date (str): End date in 'YYYY-MM-DD' format.
+        temperature_variables (list): List of temperature variable names.
+
+    Returns:
+        tuple: (times, values) where times is a datetime64[h] array and values
+        maps each variable to a float64 array.
+    """
+    start = np.datetime64(start_date, 'h')
+    end = np.datetime64(end_date, 'D') + np.timedelta64(1, 'D')
+    times = np.arange(start, end.astype('datetime64[h]'), dtype='datetime64[h]')
+    hours = times.astype(np.int64).astype(np.float64)
+    mean = 30.0 - 0.4 * abs(latitude)
+    values = {}
+    for depth, var in enumerate(temperature_variables):
+        damping = 1.0 / (1 + depth)
+        lag = 3.0 * depth
+        daily = 6.0 * damping * np.sin(2 * np.pi * (hours - 9 - lag) / 24)
+        yearly = 8.0 * np.sin(2 * np.pi * (hours - 2500 - 24 * lag) / 8766)
+        noise = 0.6 * damping * ((np.sin(hours * 12.9898 + depth * 78.233 + latitude) * 43758.5453) % 1 - 0.5)
+        values[var] = np.round(mean + yearly + daily + noise, 1)
+    return times, values
+
+
+class StubMeteoServer:
+    """
+    Local HTTP server that answers Open-Meteo archive requests with synthetic data.
+
+    Use as a context manager and pass ``server.url`` as ``base_url`` to the fetch
+    functions. The first ``fail_first`` requests are answered with HTTP
+    ``fail_status`` so retry handling can be exercised. Hours from ``null_from`` on come back as
+    null, like the days the archive has not published yet; with ``malformed`` set
+    the response is cut off inside its last array. Both attributes can be
+    changed while the server runs.
+
+    Args:
+        port (int): Port to listen on, 0 picks a free one.
+        fail_first (int): Number of initial requests to fail.
+        fail_status (int): HTTP status of the failed requests.
+        delay (float): Seconds to wait before answering each request.
+        null_from (str, optional): First date or hour ('YYYY-MM-DD[THH]') answered with null values.
+        malformed (bool): Answer with truncated JSON.
+    """
+
+    def __init__(self, port=0, fail_first=0, fail_status=503, delay=0.0, null_from=None, malformed=False):
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.delay = delay
+        self.null_from = null_from
+        self.malformed = malformed
+        self.requests_served = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/archive"
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests_served += 1
+            failing = self.requests_served <= self.fail_first
+        if self.delay:
+            self._event.wait(self.delay)
+        if failing:
+            self._send(handler, self.fail_status, b'{"error": true, "reason": "stub failure"}')
+            return
+        query = parse_qs(urlparse(handler.path).query)
+        try:
+            latitude = float(query['latitude'][0])
+            longitude = float(query['longitude'][0])
+            variables = query['hourly'][0].split(',')
+            times, values = synthetic_hourly(latitude, query['start_date'][0], query['end_date'][0], variables)
+        except (KeyError, ValueError) as e:
+            self._send(handler, 400, json.dumps({'error': True, 'reason': str(e)}).encode())
+            return
+        hourly = {'time': [str(t)[:13] + ':00' for t in times.astype('datetime64[h]')]}
+        published = len(times) if self.null_from is None else np.searchsorted(times, np.datetime64(self.null_from, 'h'))
+        for var in variables:
+            hourly[var] = values[var][:published].tolist() + [None] * (len(times) - published)
+        body = json.dumps({
+            'latitude': latitude,
+            'longitude': longitude,
+            'hourly_units': {'time': 'iso8601', **{var: '°C' for var in variables}},
+            'hourly': hourly,
+        }).encode()
+        if self.malformed:
+            body = body[:body.rindex(b',')]
+        self._send(handler, 200, body)
+
+    def _send(self, handler, status, body):
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        with self._lock:
+            self.bytes_served += len(body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
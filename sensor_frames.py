@@ -0,0 +1,277 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from sensor_serial import DEFAULT_COLUMNS, RingBuffer
+
+# Binary frame sent by sketch_dec11b.ino with BINARY_FRAMES set to 1.
+FRAME_DTYPE = np.dtype([
+    ('sync', '<u2'),
+    ('millis', '<u4'),
+    ('centi', '<i2', (4,)),
+    ('faults', 'u1'),
+    ('crc', '<u2'),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+SYNC = 0x5AA5  # bytes 0xA5 0x5A read as little-endian uint16
+MISSING = -32768
+# The CRC covers millis, centi and faults.
+CRC_START = FRAME_DTYPE.fields['millis'][1]
+CRC_END = FRAME_DTYPE.fields['crc'][1]
+
+
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[i] = crc & 0xFFFF
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def crc16(rows):
+    """
+    CRC-16/CCITT-FALSE of every row of a 2-D uint8 array.
+
+    The loop runs over the byte positions only; each step is vectorised over
+    all rows at once.
+    """
+    rows = np.asarray(rows, dtype=np.uint8)
+    crc = np.full(rows.shape[0], 0xFFFF, dtype=np.uint16)
+    for i in range(rows.shape[1]):
+        crc = (crc << np.uint16(8)) ^ CRC_TABLE[(crc >> np.uint16(8)) ^ rows[:, i]]
+    return crc
+
+
+def encode_frames(millis, temperatures, faults=None):
+    """
+    Builds frames in the sketch's binary format, e.g. to create replay files.
+
+    Args:
+        millis (array-like): Sketch uptime in milliseconds per reading.
+        temperatures (array-like): Temperatures in °C of shape (n, 4), NaN for missing.
+        faults (array-like, optional): Fault bits per reading.
+
+    Returns:
+        bytes: The encoded frames.
+    """
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    frames = np.zeros(len(temperatures), dtype=FRAME_DTYPE)
+    frames['sync'] = SYNC
+    frames['millis'] = np.asarray(millis, dtype=np.int64) & 0xFFFFFFFF
+    centi = np.round(temperatures * 100)
+    frames['centi'] = np.where(np.isnan(centi) | (np.abs(centi) > 32700), MISSING, centi).astype(np.int16)
+    frames['faults'] = 0 if faults is None else faults
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)
+    frames['crc'] = crc16(raw[:, CRC_START:CRC_END])
+    return frames.tobytes()
+
+
+def decode_frames(buffer):
+    """
+    Decodes a byte buffer of frames into a structured NumPy array.
+
+    When the buffer starts on a frame boundary and holds only valid frames,
+    the result is a zero-copy view on the buffer. Otherwise the decoder finds
+    every sync marker, keeps the candidates whose CRC matches and copies those
+    frames out, skipping noise and corrupted frames.
+
+    Args:
+        buffer (bytes-like): Captured serial bytes.
+
+    Returns:
+        tuple: (frames, consumed) where frames has dtype FRAME_DTYPE and
+        consumed is the number of leading bytes that were fully processed; a
+        partial frame at the end starts at that offset.
+    """
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    n = len(raw) // FRAME_SIZE
+    if n:
+        aligned = raw[:n * FRAME_SIZE].reshape(n, FRAME_SIZE)
+        frames = aligned.reshape(-1).view(FRAME_DTYPE)
+        if np.all(frames['sync'] == SYNC) and np.all(frames['crc'] == crc16(aligned[:, CRC_START:CRC_END])):
+            return frames, n * FRAME_SIZE
+
+    # Resynchronise: test every sync marker that leaves room for a whole frame.
+    candidates = np.flatnonzero((raw[:-1] == 0xA5) & (raw[1:] == 0x5A))
+    candidates = candidates[candidates + FRAME_SIZE <= len(raw)]
+    gathered = raw[candidates[:, None] + np.arange(FRAME_SIZE)]
+    stored_crc = gathered[:, CRC_END].astype(np.uint16) | (gathered[:, CRC_END + 1].astype(np.uint16) << np.uint16(8))
+    valid = candidates[stored_crc == crc16(gathered[:, CRC_START:CRC_END])]
+
+    # Drop valid-looking frames that overlap an earlier accepted one. Only
+    # offsets closer than a frame to their predecessor can conflict, so the
+    # sequential rule runs over those alone.
+    accepted = np.ones(len(valid), dtype=bool)
+    last = None
+    for j in np.flatnonzero(np.diff(valid) < FRAME_SIZE) + 1:
+        if accepted[j - 1]:
+            last = valid[j - 1]
+        if valid[j] < last + FRAME_SIZE:
+            accepted[j] = False
+    keep = valid[accepted].astype(np.int64)
+    next_free = int(keep[-1]) + FRAME_SIZE if len(keep) else 0
+    frames = raw[keep[:, None] + np.arange(FRAME_SIZE)].reshape(-1).view(FRAME_DTYPE)
+
+    # Every start before the last FRAME_SIZE - 1 bytes has been examined; those
+    # last bytes may still be the beginning of a frame.
+    return frames, max(next_free, len(raw) - FRAME_SIZE + 1, 0)
+
+
+def frame_temperatures(frames):
+    """Returns the temperatures in °C as float32 of shape (n, 4), NaN for missing or faulted sensors."""
+    centi = frames['centi']
+    temperatures = centi.astype(np.float32) / np.float32(100)
+    fault_mask = (frames['faults'][:, None] >> np.arange(4)) & 1
+    temperatures[(centi == MISSING) | (fault_mask == 1)] = np.nan
+    return temperatures
+
+
+def unwrap_millis(millis, previous=None):
+    """
+    Unwraps the sketch's 32-bit millis() counter, which wraps after about 49.7 days.
+
+    Wraps are detected as drops in the counter.
+
+    Args:
+        millis (numpy.ndarray): Raw millis() values.
+        previous (int, optional): Last unwrapped value of the preceding block,
+            so wraps between blocks are caught too.
+
+    Returns:
+        numpy.ndarray: Unwrapped milliseconds as int64.
+    """
+    millis = np.asarray(millis).astype(np.int64)
+    if previous is None:
+        base = 0
+        drops = np.r_[False, np.diff(millis) < 0]
+    else:
+        base = previous - (previous & 0xFFFFFFFF)
+        drops = np.diff(np.r_[previous & 0xFFFFFFFF, millis]) < 0
+    return base + millis + (np.cumsum(drops) << 32)
+
+
+def frame_times(frames, start, previous=None):
+    """
+    Converts the sketch's millis() stamps to absolute times.
+
+    Args:
+        frames (numpy.ndarray): Decoded frames.
+        start (str or pandas.Timestamp): Time of millis() == 0, i.e. the boot time.
+        previous (int, optional): See unwrap_millis.
+
+    Returns:
+        numpy.ndarray: datetime64[ns] time of every frame.
+    """
+    return _millis_to_times(unwrap_millis(frames['millis'], previous), start)
+
+
+def _millis_to_times(millis, start):
+    return np.datetime64(pd.Timestamp(start).value, 'ns') + millis * np.timedelta64(1, 'ms')
+
+
+def frames_to_dataframe(frames, start, columns=DEFAULT_COLUMNS):
+    """
+    Builds a DataFrame in the fetch_meteo_data format from decoded frames.
+
+    Args:
+        frames (numpy.ndarray): Decoded frames.
+        start (str or pandas.Timestamp): Boot time of the sketch.
+        columns (list): Column name for each sensor, in sensor order.
+    """
+    df = pd.DataFrame(frame_temperatures(frames), columns=list(columns))
+    df.insert(0, 'time', frame_times(frames, start))
+    return df
+
+
+def decode_file(path, start, columns=DEFAULT_COLUMNS):
+    """Decodes a captured byte file, memory-mapped, into a DataFrame."""
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+    frames, _ = decode_frames(raw)
+    return frames_to_dataframe(frames, start, columns)
+
+
+class FrameReader:
+    """
+    Reads binary frames from a serial stream in a background thread.
+
+    Bytes are read in blocks, decoded a block at a time and appended to a ring
+    buffer in one step; a partial frame at the end of a block is carried over
+    to the next one. to_dataframe() works as in sensor_serial.SerialReader.
+
+    Args:
+        stream: Binary file-like object with read().
+        start (str or pandas.Timestamp): Boot time of the sketch.
+        columns (list): Column name for each sensor, in sensor order.
+        capacity (int): Number of readings the ring buffer holds.
+        block_size (int): Bytes requested per read.
+        stop_at_eof (bool): Stop when read() returns nothing, as for a replay file.
+        poll_interval (float): Seconds to wait before reading again after read()
+            returned nothing, as in sensor_serial.SerialReader.
+    """
+
+    def __init__(self, stream, start, columns=DEFAULT_COLUMNS, capacity=100000, block_size=FRAME_SIZE * 256, stop_at_eof=False, poll_interval=0.05):
+        self.stream = stream
+        self.start_time = start
+        self.columns = list(columns)
+        self.buffer = RingBuffer(capacity, len(self.columns))
+        self.block_size = block_size
+        self.stop_at_eof = stop_at_eof
+        self.poll_interval = poll_interval
+        self.frames_read = 0
+        self._carry = b''
+        self._last_millis = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def feed(self, data):
+        """Decodes a block of bytes; called by the reader thread, or directly for testing."""
+        data = self._carry + data
+        frames, consumed = decode_frames(data)
+        self._carry = data[consumed:]
+        if len(frames):
+            millis = unwrap_millis(frames['millis'], self._last_millis)
+            self._last_millis = int(millis[-1])
+            self.buffer.extend(_millis_to_times(millis, self.start_time), frame_temperatures(frames))
+            self.frames_read += len(frames)
+
+    def _run(self):
+        while not self._stop.is_set():
+            data = self.stream.read(self.block_size)
+            if not data:
+                if self.stop_at_eof:
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+            self.feed(data)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def to_dataframe(self):
+        times, values = self.buffer.drain()
+        df = pd.DataFrame(values, columns=self.columns)
+        df.insert(0, 'time', times)
+        return df
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
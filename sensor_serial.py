@@ -0,0 +1,236 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+# Column names given to sensors 1-4 of sketch_dec11b.ino, matching the
+# Open-Meteo variables used in input.ipynb.
+DEFAULT_COLUMNS = ["temperature_2m", "soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm", "soil_temperature_28_to_100cm"]
+
+# "Temperature 1: 23.45 °C" as printed by the sketch; NAN covers failed reads.
+LINE_PATTERN = re.compile(rb"Temperature (\d+): (-?\d+(?:\.\d*)?|-?nan|-?inf)", re.IGNORECASE)
+
+
+def parse_line(line):
+    """
+    Parses one line of the sketch's serial output.
+
+    Returns:
+        tuple: (sensor number, temperature) or None for any other line.
+    """
+    match = LINE_PATTERN.search(line)
+    if match is None:
+        return None
+    return int(match.group(1)), float(match.group(2))
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of timestamped readings backed by preallocated arrays.
+
+    When full, the oldest readings are overwritten and counted in dropped.
+
+    Args:
+        capacity (int): Maximum number of readings held.
+        n_channels (int): Values per reading.
+    """
+
+    def __init__(self, capacity, n_channels):
+        self.times = np.zeros(capacity, dtype='datetime64[ns]')
+        self.values = np.full((capacity, n_channels), np.nan)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, values):
+        with self._lock:
+            end = (self.start + self.size) % self.capacity
+            self.times[end] = timestamp
+            self.values[end] = values
+            if self.size < self.capacity:
+                self.size += 1
+            else:
+                self.start = (self.start + 1) % self.capacity
+                self.dropped += 1
+
+    def extend(self, timestamps, values):
+        """Appends many readings at once; only the newest capacity readings are kept."""
+        timestamps = np.asarray(timestamps)
+        values = np.asarray(values)
+        count = len(timestamps)
+        with self._lock:
+            if count > self.capacity:
+                self.dropped += count - self.capacity
+                timestamps, values = timestamps[-self.capacity:], values[-self.capacity:]
+                count = self.capacity
+            slots = (self.start + self.size + np.arange(count)) % self.capacity
+            self.times[slots] = timestamps
+            self.values[slots] = values
+            overflow = max(0, self.size + count - self.capacity)
+            self.size = min(self.capacity, self.size + count)
+            self.start = (self.start + overflow) % self.capacity
+            self.dropped += overflow
+
+    def drain(self):
+        """Returns (times, values) of all held readings in order and empties the buffer."""
+        with self._lock:
+            order = (self.start + np.arange(self.size)) % self.capacity
+            times, values = self.times[order], self.values[order]
+            self.start = 0
+            self.size = 0
+        return times, values
+
+    def __len__(self):
+        return self.size
+
+
+def open_serial(port, baudrate=115200, timeout=1.0):
+    """
+    Opens a serial port with pyserial, or a pty/device path directly when
+    pyserial is not installed.
+    """
+    if serial is not None:
+        return serial.Serial(port, baudrate=baudrate, timeout=timeout)
+    return os.fdopen(os.open(port, os.O_RDONLY | os.O_NOCTTY), 'rb', buffering=0)
+
+
+class SerialReader:
+    """
+    Reads the sketch's serial output in a background thread.
+
+    Lines are parsed as they arrive and every complete set of sensor readings
+    is stored in a ring buffer with the time its first line was received.
+    to_dataframe() turns everything buffered so far into one DataFrame in the
+    fetch_meteo_data format in a single step.
+
+    Args:
+        stream: Binary file-like object with readline(), e.g. from open_serial()
+            or open(path, 'rb') to replay a captured log.
+        columns (list): Column name for each sensor, in sensor order.
+        capacity (int): Number of readings the ring buffer holds.
+        stop_at_eof (bool): Stop when readline() returns nothing, as for a replay file.
+        clock (callable): Returns the current time in nanoseconds.
+        poll_interval (float): Seconds to wait before reading again after
+            readline() returned nothing, so a quiet or non-blocking stream
+            does not keep a core busy.
+    """
+
+    def __init__(self, stream, columns=DEFAULT_COLUMNS, capacity=100000, stop_at_eof=False, clock=time.time_ns, poll_interval=0.05):
+        self.stream = stream
+        self.columns = list(columns)
+        self.buffer = RingBuffer(capacity, len(self.columns))
+        self.stop_at_eof = stop_at_eof
+        self.clock = clock
+        self.poll_interval = poll_interval
+        self.lines_read = 0
+        self.lines_skipped = 0
+        self._pending = np.full(len(self.columns), np.nan)
+        self._pending_time = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def feed(self, line, timestamp=None):
+        """Parses one line; called by the reader thread, or directly for testing."""
+        self.lines_read += 1
+        parsed = parse_line(line)
+        if parsed is None or not 1 <= parsed[0] <= len(self.columns):
+            self.lines_skipped += 1
+            return
+        sensor, value = parsed
+        if sensor == 1 or self._pending_time is None:
+            if self._pending_time is not None:
+                # A set cut short by a lost line is still stored, with NaN gaps.
+                self._flush()
+            self._pending_time = self.clock() if timestamp is None else timestamp
+        self._pending[sensor - 1] = value
+        if sensor == len(self.columns):
+            self._flush()
+
+    def _flush(self):
+        self.buffer.append(np.datetime64(self._pending_time, 'ns'), self._pending)
+        self._pending = np.full(len(self.columns), np.nan)
+        self._pending_time = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            line = self.stream.readline()
+            if not line:
+                if self.stop_at_eof:
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+            self.feed(line)
+        if self._pending_time is not None:
+            self._flush()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def join(self, timeout=None):
+        """Waits for the reader thread, e.g. until a replay file is exhausted."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def to_dataframe(self):
+        """
+        Drains the buffered readings into a DataFrame.
+
+        Returns:
+            pandas.DataFrame: A time column plus one column per sensor, like
+            fetch_meteo_data, so it can go through the weather.py diff functions.
+        """
+        times, values = self.buffer.drain()
+        df = pd.DataFrame(values, columns=self.columns)
+        df.insert(0, 'time', times)
+        return df
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def read_log(path, columns=DEFAULT_COLUMNS, start=None, interval='1s'):
+    """
+    Replays a captured serial log in one go.
+
+    The sketch does not print timestamps, so readings are spaced by the
+    sketch's one-second loop delay from start onwards.
+
+    Args:
+        path (str): File holding the captured serial output.
+        columns (list): Column name for each sensor, in sensor order.
+        start (str, optional): Time of the first reading, defaults to now.
+        interval (str): Time between readings.
+
+    Returns:
+        pandas.DataFrame: DataFrame in the fetch_meteo_data format.
+    """
+    origin = pd.Timestamp(start) if start is not None else pd.Timestamp.now()
+    step = pd.Timedelta(interval).value
+    counter = iter(range(1 << 62))
+    # Each reading takes well over 40 bytes of text, so this never overwrites.
+    capacity = os.path.getsize(path) // 40 + 1
+    with open(path, 'rb') as f:
+        reader = SerialReader(f, columns, capacity=capacity, stop_at_eof=True, clock=lambda: origin.value + next(counter) * step)
+        reader.start()
+        reader.join()
+    return reader.to_dataframe()
@@ -2,6 +2,13 @@
  * This Arduino Sketch reads temperature data from four Adafruit MAX31865 RTD Sensors
  * Breakout connected to an ESP32-C3 microcontroller via SPI. The temperature data
  * is then printed to the Serial Monitor.
+ *
+ * Set BINARY_FRAMES to 1 to send compact binary frames instead of text, for
+ * higher sample rates. Each frame is 17 bytes, little-endian:
+ *   0xA5 0x5A | uint32 millis | 4 x int16 temperature in 0.01 °C |
+ *   uint8 fault bits (bit i = sensor i+1) | uint16 CRC-16/CCITT-FALSE
+ * The CRC covers the 13 bytes from millis to the fault bits. A failed read is
+ * sent as -32768. sensor_frames.py decodes this format.
  */
 
 #include <SPI.h>
@@ -16,12 +23,68 @@
 #define MAX31865_MISO 9
 #define MAX31865_SCK 8
 
+// 0 = human-readable text, 1 = binary frames
+#define BINARY_FRAMES 0
+// Time between readings in milliseconds
+#define SAMPLE_INTERVAL_MS 1000
+
+#define FRAME_SYNC1 0xA5
+#define FRAME_SYNC2 0x5A
+#define FRAME_MISSING INT16_MIN
+
+struct __attribute__((packed)) SensorFrame {
+  uint8_t sync[2];
+  uint32_t millis;
+  int16_t centi[4];
+  uint8_t faults;
+  uint16_t crc;
+};
+
 // Create instances of the Adafruit_MAX31865 class for each sensor
 Adafruit_MAX31865 max31865_1 = Adafruit_MAX31865(MAX31865_CS1, MAX31865_MOSI, MAX31865_MISO, MAX31865_SCK);
 Adafruit_MAX31865 max31865_2 = Adafruit_MAX31865(MAX31865_CS2, MAX31865_MOSI, MAX31865_MISO, MAX31865_SCK);
 Adafruit_MAX31865 max31865_3 = Adafruit_MAX31865(MAX31865_CS3, MAX31865_MOSI, MAX31865_MISO, MAX31865_SCK);
 Adafruit_MAX31865 max31865_4 = Adafruit_MAX31865(MAX31865_CS4, MAX31865_MOSI, MAX31865_MISO, MAX31865_SCK);
 
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)
+uint16_t crc16(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+int16_t toCenti(float temperature) {
+  if (isnan(temperature) || temperature > 327.0 || temperature < -327.0) {
+    return FRAME_MISSING;
+  }
+  return (int16_t)lroundf(temperature * 100.0);
+}
+
+void sendFrame(Adafruit_MAX31865 *sensors[4]) {
+  SensorFrame frame;
+  frame.sync[0] = FRAME_SYNC1;
+  frame.sync[1] = FRAME_SYNC2;
+  frame.millis = millis();
+  frame.faults = 0;
+  for (uint8_t i = 0; i < 4; i++) {
+    float temperature = sensors[i]->temperature(100, 430);
+    if (sensors[i]->readFault()) {
+      frame.faults |= 1 << i;
+      sensors[i]->clearFault();
+      frame.centi[i] = FRAME_MISSING;
+    } else {
+      frame.centi[i] = toCenti(temperature);
+    }
+  }
+  frame.crc = crc16((const uint8_t *)&frame.millis, offsetof(SensorFrame, crc) - offsetof(SensorFrame, millis));
+  Serial.write((const uint8_t *)&frame, sizeof(frame));
+}
+
 void setup() {
   // Initialize Serial communication
   Serial.begin(115200);
@@ -47,6 +110,11 @@ void setup() {
 }
 
 void loop() {
+#if BINARY_FRAMES
+  static Adafruit_MAX31865 *sensors[4] = {&max31865_1, &max31865_2, &max31865_3, &max31865_4};
+  sendFrame(sensors);
+  delay(SAMPLE_INTERVAL_MS);
+#else
   // Read the temperature from each MAX31865 sensor
   float temperature1 = max31865_1.temperature(100, 430);
   float temperature2 = max31865_2.temperature(100, 430);
@@ -70,6 +138,7 @@ void loop() {
   Serial.print(temperature4);
   Serial.println(" °C");
 
-  // Wait for 1 second before reading again
-  delay(1000);
+  // Wait before reading again
+  delay(SAMPLE_INTERVAL_MS);
+#endif
 }
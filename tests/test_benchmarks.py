@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import benchmarks
+
+
+@pytest.fixture(scope='module')
+def results():
+    return benchmarks.run_benchmarks(sizes=['month'], depths=[1], repeat=1, log=lambda line: None)
+
+
+def test_every_benchmark_runs(results):
+    assert [result['name'] for result in results['results']] == list(benchmarks.BENCHMARKS)
+    for result in results['results']:
+        assert (result['size'], result['depths'], result['rows']) == ('month', 1, 31 * 24)
+        assert result['wall_s'] > 0 and len(result['wall_runs']) == 1
+        assert result['peak_bytes'] > 0 and result['response_bytes'] > 0
+    assert set(results['environment']) >= {'python', 'numpy', 'pandas', 'timestamp'}
+
+
+def test_compare_flags_regressions(results):
+    baseline = json.loads(json.dumps(results))
+    slower = json.loads(json.dumps(results))
+    slower['results'][0]['wall_s'] *= 2
+    slower['results'].append(dict(slower['results'][1], size='year'))
+    comparison = benchmarks.compare(slower, baseline, threshold=1.5)
+    assert len(comparison) == len(results['results'])
+    assert comparison['regression'].tolist() == [True] + [False] * (len(comparison) - 1)
+    assert comparison['time_ratio'].iloc[0] == pytest.approx(2.0)
+
+
+def test_main_writes_results_and_fails_on_regression(results, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(benchmarks, 'run_benchmarks', lambda *args: results)
+    baseline = json.loads(json.dumps(results))
+    for result in baseline['results']:
+        result['wall_s'] /= 10
+    baseline_path = tmp_path / 'baseline.json'
+    baseline_path.write_text(json.dumps(baseline))
+    output = tmp_path / 'new.json'
+
+    assert benchmarks.main(['--output', str(output)]) == 0
+    assert json.loads(output.read_text())['results'] == json.loads(json.dumps(results))['results']
+    assert benchmarks.main(['--output', str(output), '--baseline', str(baseline_path)]) == 0
+    assert benchmarks.main(['--output', str(output), '--baseline', str(baseline_path), '--fail-on-regression']) == 1
+    assert 'time_ratio' in capsys.readouterr().out
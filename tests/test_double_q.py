@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+
+from double_q import ChainWalk, SamplingTracer, epsilon_greedy, print_tracer, train
+
+# Line prefixes the original doubleQlearning script printed for every step.
+STEP_LINES = ['greedy: number ', 'action ', 'next state', 'reward is', 'random ', ' state, action', '[state, action]', 'table Q']
+
+
+def _steps(output):
+    """Splits traced output into the printed lines of each step."""
+    lines = [line for line in output.splitlines() if not line.startswith('episode')]
+    steps, current = [], []
+    for line in lines:
+        if line.startswith('greedy') and current:
+            steps.append(current)
+            current = []
+        current.append(line)
+    return steps + [current]
+
+
+def test_print_tracer_matches_original_lines(capsys):
+    result = train(ChainWalk(), episodes=2, seed=3, trace=print_tracer)
+    steps = _steps(capsys.readouterr().out)
+    assert len(steps) == result['episode_steps'].sum()
+    for lines in steps:
+        labels = lines[:len(STEP_LINES)]
+        assert all(expected in line for expected, line in zip(STEP_LINES, labels))
+        assert lines[0] in ('greedy: number less than 0.9', 'greedy: number greater than 0.9')
+        assert lines[4] in ('random less than 0.5', 'random greater than 0.5')
+        table = 'Q1' if lines[4] == 'random less than 0.5' else 'Q2'
+        assert lines[5].startswith(table) and lines[7] == f'table {table}'
+        # The table printout follows: one row per state.
+        assert len(lines) == len(STEP_LINES) + 5
+
+
+def test_tracing_does_not_change_training(capsys):
+    quiet = train(ChainWalk(), episodes=30, seed=8)
+    traced = train(ChainWalk(), episodes=30, seed=8, trace=print_tracer)
+    sampled = train(ChainWalk(), episodes=30, seed=8, trace=SamplingTracer(every=50))
+    for result in (traced, sampled):
+        np.testing.assert_array_equal(result['q1'], quiet['q1'])
+        np.testing.assert_array_equal(result['q2'], quiet['q2'])
+        np.testing.assert_array_equal(result['episode_steps'], quiet['episode_steps'])
+    output = capsys.readouterr().out
+    # Every step of the traced run plus every 50th step of the sampled one.
+    total = quiet['episode_steps'].sum()
+    assert output.count('greedy: number') == total + total // 50
+
+
+def test_greedy_policy_learns_to_walk_right():
+    result = train(ChainWalk(), episodes=300, seed=1)
+    q1, q2 = result['q1'], result['q2']
+    assert all(epsilon_greedy(q1, q2, state, 0.0, random.Random(0)) == 1 for state in range(4))
+    assert result['episode_return'][-1] == -(result['episode_steps'][-1] - 1) + 1
@@ -0,0 +1,162 @@
+import os
+import random
+import runpy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dql_sweep
+from dql_checkpoint import load_checkpoint, restore_rng, resume_kwargs, rng_state, save_checkpoint, save_result
+from dql_controller import PolicyController
+from double_q import ChainWalk, train
+from energy_dql import ACTIONS, train_double_q_batch
+from meteo_stub import synthetic_hourly
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'doubleQlearningpaper')
+
+SEEDS = [1, 2, 3]
+ALPHAS = [0.1, 0.3, 0.5]
+RESULT_KEYS = ('q_table1', 'q_table2', 'action_counts', 'energy_store')
+
+
+@pytest.fixture(scope='module')
+def temperatures():
+    _, values = synthetic_hourly(52.0, '2023-01-01', '2023-01-14', ['temperature_2m', 'soil_temperature_6cm'])
+    return values['temperature_2m'], values['soil_temperature_6cm']
+
+
+def test_rng_state_round_trip():
+    for rng in (random.Random(5), np.random.default_rng(5)):
+        restored = restore_rng(rng_state(rng))
+        draw = rng.random()
+        assert restored.random() == draw
+
+
+def test_batch_resume_equals_one_run(temperatures, tmp_path):
+    air, soil = temperatures
+    full = train_double_q_batch(air, soil, episodes=6, seed=SEEDS, alpha=ALPHAS)
+    half = train_double_q_batch(air, soil, episodes=3, seed=SEEDS, alpha=ALPHAS)
+    checkpoint = load_checkpoint(save_result(str(tmp_path / 'half.npz'), half, {'actions': ACTIONS}))
+    rest = train_double_q_batch(air, soil, episodes=3, seed=SEEDS, alpha=ALPHAS, resume=checkpoint)
+    for key in RESULT_KEYS:
+        np.testing.assert_array_equal(rest[key], full[key])
+    np.testing.assert_array_equal(rest['episode_reward'], full['episode_reward'][:, 3:])
+
+
+def test_resuming_twice_from_one_result_is_repeatable(temperatures):
+    air, soil = temperatures
+    half = train_double_q_batch(air, soil, episodes=2, seed=SEEDS, alpha=ALPHAS)
+    first = train_double_q_batch(air, soil, episodes=2, seed=SEEDS, alpha=ALPHAS, resume=half)
+    second = train_double_q_batch(air, soil, episodes=2, seed=SEEDS, alpha=ALPHAS, resume=half)
+    for key in RESULT_KEYS:
+        np.testing.assert_array_equal(first[key], second[key])
+
+
+def test_batch_resume_from_script_checkpoint(temperatures, tmp_path):
+    # doubleQlearningpaper saves a random.Random; batch training reseeds instead.
+    air, soil = temperatures
+    path = save_checkpoint(str(tmp_path / 'script.npz'), np.ones((6, 6)), np.ones((6, 6)), {'actions': ACTIONS},
+                           [random.Random(3)], energy_store=10.0, action_counts=np.zeros(6, dtype=np.int64))
+    result = train_double_q_batch(air, soil, episodes=1, seed=7, resume=load_checkpoint(path))
+    assert result['q_table1'].shape == (1, 6, 6)
+
+
+class _ForecastResponse:
+    def __init__(self, air, soil):
+        times = np.datetime64('2025-02-04T00', 'h') + np.arange(len(air))
+        self._data = {'hourly': {'time': [str(t) + ':00' for t in times],
+                                 'temperature_2m': air.tolist(), 'soil_temperature_6cm': soil.tolist()}}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+def _run_script(temperatures, checkpoint_path, tmp_path, monkeypatch):
+    """Runs doubleQlearningpaper on the synthetic series with checkpoint_path set."""
+    import requests
+    monkeypatch.setattr(requests, 'get', lambda url: _ForecastResponse(*temperatures))
+    with open(SCRIPT) as f:
+        source = f.read().replace('checkpoint_path = None', f'checkpoint_path = {checkpoint_path!r}')
+    script = tmp_path / 'doubleQlearningpaper.py'
+    script.write_text(source)
+    return runpy.run_path(str(script))
+
+
+def test_script_resumes_from_batch_checkpoint(temperatures, tmp_path, monkeypatch):
+    air, soil = temperatures
+    result = train_double_q_batch(air, soil, episodes=1, seed=SEEDS)
+    path = save_result(str(tmp_path / 'batch.npz'), result, {'actions': ACTIONS})
+    script = _run_script(temperatures, path, tmp_path, monkeypatch)
+    assert script['q_table1'].shape == (6, 6)
+    # The script continues the first environment and writes a single-controller checkpoint back.
+    assert sum(script['action_counts']) == result['action_counts'][0].sum() + 10 * len(air)
+    saved = load_checkpoint(path)
+    assert saved['q_table1'].shape == (6, 6)
+    assert isinstance(saved['rngs'][0], random.Random)
+    # Its own checkpoint resumes it again.
+    again = _run_script(temperatures, path, tmp_path, monkeypatch)
+    assert sum(again['action_counts']) == sum(script['action_counts']) + 10 * len(air)
+
+
+def test_script_rejects_other_table_shapes(temperatures, tmp_path, monkeypatch):
+    path = save_checkpoint(str(tmp_path / 'chain.npz'), np.zeros((5, 2)), np.zeros((5, 2)),
+                           energy_store=10.0, action_counts=np.zeros(2, dtype=np.int64))
+    with pytest.raises(ValueError, match='shape'):
+        _run_script(temperatures, path, tmp_path, monkeypatch)
+
+
+def test_chain_resume_equals_one_run(tmp_path):
+    env = ChainWalk()
+    full = train(env, episodes=40, seed=5)
+    half = train(env, episodes=20, seed=5)
+    checkpoint = load_checkpoint(save_result(str(tmp_path / 'chain.npz'), half))
+    rest = train(env, episodes=20, **resume_kwargs(checkpoint))
+    np.testing.assert_array_equal(rest['q1'], full['q1'])
+    np.testing.assert_array_equal(rest['q2'], full['q2'])
+
+
+def test_controller_from_checkpoint(temperatures, tmp_path):
+    air, soil = temperatures
+    result = train_double_q_batch(air, soil, episodes=1, seed=SEEDS)
+    path = save_result(str(tmp_path / 'batch.npz'), result, {'actions': ACTIONS})
+    controller = PolicyController.from_file(path, index=2)
+    assert controller.energy_store == pytest.approx(result['energy_store'][2])
+    np.testing.assert_array_equal(controller.q_table1, result['q_table1'][2])
+    saved = controller.save(str(tmp_path / 'controller.npz'))
+    assert PolicyController.from_file(saved).energy_store == controller.energy_store
+
+
+def _frame(air, soil):
+    return pd.DataFrame({'air_temp': air, 'soil_temp_6cm': soil})
+
+
+def _assert_same_runs(a, b):
+    assert list(a.columns) == list(b.columns)
+    for key in ('q_table1', 'q_table2', 'action_counts', 'learning_curve', 'energy_store'):
+        np.testing.assert_array_equal(np.stack(a[key]), np.stack(b[key]))
+
+
+def test_sweep_resumes_from_chunks(temperatures, tmp_path):
+    df = _frame(*temperatures)
+    grid = {'alpha': [0.1, 0.3, 0.5], 'num_episodes': [2]}
+    fresh = dql_sweep.run_sweep(df, grid, repeats=2, chunk_size=2, processes=2)
+    directory = str(tmp_path / 'sweep')
+    dql_sweep.run_sweep(df, grid, repeats=2, chunk_size=2, processes=2, checkpoint_dir=directory)
+    os.remove(os.path.join(directory, 'chunk_00001.npz'))
+    resumed = dql_sweep.run_sweep(df, grid, repeats=2, chunk_size=2, processes=2, checkpoint_dir=directory)
+    _assert_same_runs(resumed, fresh)
+
+
+def test_sweep_ignores_chunks_of_other_runs(temperatures, tmp_path):
+    air, soil = temperatures
+    directory = str(tmp_path / 'sweep')
+    dql_sweep.run_sweep(_frame(air, soil), {'alpha': [0.1, 0.3], 'num_episodes': [2]}, checkpoint_dir=directory, processes=2)
+    # Same run positions and seeds, other parameters and other data.
+    for df, grid in [(_frame(air, soil), {'alpha': [0.9, 0.95], 'num_episodes': [2]}),
+                     (_frame(air + 1, soil), {'alpha': [0.9, 0.95], 'num_episodes': [2]})]:
+        resumed = dql_sweep.run_sweep(df, grid, checkpoint_dir=directory, processes=2)
+        _assert_same_runs(resumed, dql_sweep.run_sweep(df, grid, processes=2))
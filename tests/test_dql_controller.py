@@ -0,0 +1,151 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from dql_checkpoint import save_result
+from dql_controller import ControllerService, PolicyController, load_q_tables, run_simulation, simulated_feed
+from energy_dql import ACTIONS, train_double_q_batch
+from meteo_stub import synthetic_hourly
+
+NUM_STATES = 6
+EMIN, EMAX = 0.5 * 1.0 * 3.0 ** 2, 0.5 * 1.0 * 5.0 ** 2
+
+
+@pytest.fixture(scope='module')
+def temperatures():
+    _, values = synthetic_hourly(13.7, '2024-01-01', '2024-01-03', ['temperature_2m', 'soil_temperature_6cm'])
+    return values['temperature_2m'], values['soil_temperature_6cm']
+
+
+def _tables():
+    # State i prefers action i, and a little randomness breaks the ties for learning.
+    rng = np.random.default_rng(4)
+    q_table1 = np.eye(NUM_STATES, len(ACTIONS)) + rng.uniform(0, 0.1, (NUM_STATES, len(ACTIONS)))
+    return q_table1, rng.uniform(0, 0.1, (NUM_STATES, len(ACTIONS)))
+
+
+def _reference(q_table1, q_table2, air, soil, energy=(EMIN + EMAX) / 2):
+    """The energy store simulation of doubleQlearningpaper with greedy actions and no learning."""
+
+    def soes(value):
+        return 0 if value < EMIN else (value - EMIN) / (EMAX - EMIN)
+
+    def state(value):
+        for i in range(NUM_STATES):
+            if i / NUM_STATES <= value < (i + 1) / NUM_STATES:
+                return i
+        return NUM_STATES - 1
+
+    actions, transitions = [], []
+    current = soes(energy)
+    for a, s in zip(air, soil):
+        s0 = state(current)
+        action_index = int(np.argmax(q_table1[s0] + q_table2[s0]))
+        action = ACTIONS[action_index]
+        energy = min(max(energy + abs(a - s) * 0.1 - (0.01 + 0.005 * action), EMIN), EMAX)
+        reward = soes(energy) - current
+        if reward > 0:
+            reward += 0.1 * action / max(ACTIONS)
+        current = soes(energy)
+        actions.append(action)
+        transitions.append((s0, action_index, reward, state(current)))
+    return actions, transitions
+
+
+def _service(controller, **kwargs):
+    decided = []
+    service = ControllerService(controller, asyncio.Queue(maxsize=16),
+                                on_decision=lambda air, soil, action: decided.append(action), **kwargs)
+    return service, decided
+
+
+def test_run_simulation_follows_the_q_tables(temperatures):
+    air, soil = temperatures
+    q_table1, q_table2 = _tables()
+    service, decided = _service(PolicyController(q_table1, q_table2))
+    summary = asyncio.run(run_simulation(service, air, soil))
+
+    expected, _ = _reference(q_table1, q_table2, air, soil)
+    assert decided == [float(action) for action in expected]
+    assert len(set(decided)) > 1
+    assert summary['decisions'] == len(air) and summary['updates'] == 0 and summary['queue_depth'] == 0
+    assert summary['lag_max_ms'] >= summary['lag_mean_ms'] >= 0
+
+
+def test_learn_batch_applies_queued_updates(temperatures):
+    air, soil = temperatures
+    q_table1, q_table2 = _tables()
+    controller = PolicyController(q_table1, q_table2, learn=True, max_batch=10, seed=3)
+    for a, s in zip(air[:25], soil[:25]):
+        controller.step(a, s)
+    _, transitions = _reference(q_table1, q_table2, air[:25], soil[:25])
+    assert controller.pending == pytest.approx(transitions)
+
+    expected1, expected2 = q_table1.copy(), q_table2.copy()
+    coins = random.Random(3)
+    for state, action_index, reward, next_state in transitions[:10]:
+        learner, critic = (expected1, expected2) if coins.random() < 0.5 else (expected2, expected1)
+        best = np.argmax(learner[next_state])
+        learner[state, action_index] += 0.3 * (reward + 0.8 * critic[next_state, best] - learner[state, action_index])
+
+    assert controller.learn_batch() == 10
+    assert len(controller.pending) == 15 and controller.updates == 10
+    np.testing.assert_allclose(controller.q_table1, expected1)
+    np.testing.assert_allclose(controller.q_table2, expected2)
+    assert controller.policy == np.argmax(expected1 + expected2, axis=1).tolist()
+    assert controller.learn_batch() == 10 and controller.learn_batch() == 5 and controller.learn_batch() == 0
+
+
+def test_service_learns_every_decision(temperatures):
+    air, soil = temperatures
+    q_table1, q_table2 = _tables()
+    controller = PolicyController(q_table1, q_table2, learn=True, max_batch=4, seed=0)
+    service, decided = _service(controller, learn_every=8)
+    summary = asyncio.run(run_simulation(service, air, soil))
+    assert summary['decisions'] == summary['updates'] == controller.updates == len(air)
+    assert not controller.pending and len(decided) == len(air)
+    assert not np.allclose(controller.q_table1 + controller.q_table2, q_table1 + q_table2)
+
+
+def test_save_and_reload_continue_identically(temperatures, tmp_path):
+    air, soil = temperatures
+    controller = PolicyController(*_tables(), learn=True, seed=1)
+    for a, s in zip(air[:30], soil[:30]):
+        controller.step(a, s)
+    controller.learn_batch()
+    path = controller.save(str(tmp_path / 'controller.npz'))
+
+    reloaded = PolicyController.from_file(path)
+    np.testing.assert_array_equal(reloaded.q_table1, controller.q_table1)
+    np.testing.assert_array_equal(reloaded.q_table2, controller.q_table2)
+    assert reloaded.actions == controller.actions and reloaded.policy == controller.policy
+    assert (reloaded.energy_store, reloaded.state) == (controller.energy_store, controller.state)
+    controller.learn = False
+    assert [reloaded.step(a, s) for a, s in zip(air[30:], soil[30:])] == [controller.step(a, s) for a, s in zip(air[30:], soil[30:])]
+
+
+def test_from_batch_result(temperatures, tmp_path):
+    air, soil = temperatures
+    result = train_double_q_batch(air, soil, seed=[0, 1], episodes=2)
+    path = save_result(str(tmp_path / 'batch.npz'), result, {'actions': ACTIONS})
+    q_table1, q_table2, actions, energy_store = load_q_tables(path, index=1)
+    np.testing.assert_array_equal(q_table1, result['q_table1'][1])
+    np.testing.assert_array_equal(q_table2, result['q_table2'][1])
+    assert actions.tolist() == ACTIONS and energy_store == result['energy_store'][1]
+    controller = PolicyController.from_file(path, index=1)
+    assert controller.policy == result['policy'][1].tolist()
+    assert controller.energy_store == energy_store
+
+
+def test_simulated_feed_ends_with_none():
+    async def collect():
+        queue = asyncio.Queue()
+        await simulated_feed(queue, [1, 2.5], np.array([0.5, 1.0], dtype=np.float32), rate=1000)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    items = asyncio.run(collect())
+    assert items[-1] is None and len(items) == 3
+    assert [item[1:] for item in items[:2]] == [(1.0, 0.5), (2.5, 1.0)]
+    assert items[0][0] <= items[1][0]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dql_sweep import expand_runs, run_sweep
+from energy_dql import ACTIONS, train_double_q_batch
+from meteo_stub import synthetic_hourly
+
+GRID = {'alpha': [0.1, 0.5], 'epsilon': [0.02, 0.3], 'num_episodes': [1, 2]}
+
+
+@pytest.fixture(scope='module')
+def df():
+    _, values = synthetic_hourly(40.4, '2024-06-01', '2024-06-08', ['temperature_2m', 'soil_temperature_6cm'])
+    return pd.DataFrame({'air_temp': values['temperature_2m'], 'soil_temp_6cm': values['soil_temperature_6cm']})
+
+
+def test_expand_runs():
+    runs = expand_runs(GRID, repeats=3, base_seed=5)
+    assert len(runs) == 2 * 2 * 2 * 3
+    assert [run['run'] for run in runs] == list(range(len(runs)))
+    assert len({run['seed'] for run in runs}) == len(runs)
+    assert [run['seed'] for run in runs] == [run['seed'] for run in expand_runs(GRID, repeats=3, base_seed=5)]
+    assert [run['seed'] for run in runs] != [run['seed'] for run in expand_runs(GRID, repeats=3, base_seed=6)]
+    # Parameters the grid leaves out keep the paper's settings.
+    assert all(run['gamma'] == 0.8 and run['actions'] == tuple(ACTIONS) for run in runs)
+    assert [run['repeat'] for run in runs[:3]] == [0, 1, 2]
+    assert expand_runs({'actions': [[1, 2]]})[0]['actions'] == (1, 2)
+    with pytest.raises(ValueError, match='learning_rate'):
+        expand_runs({'learning_rate': [0.1]})
+
+
+def test_sweep_does_not_depend_on_scheduling(df):
+    serial = run_sweep(df, GRID, repeats=2, processes=1, chunk_size=1)
+    parallel = run_sweep(df, GRID, repeats=2, processes=2, chunk_size=3)
+    assert serial['run'].tolist() == list(range(16))
+    for column in ('seed', 'alpha', 'epsilon', 'num_episodes', 'final_reward', 'energy_store'):
+        assert serial[column].tolist() == parallel[column].tolist()
+    for column in ('q_table1', 'q_table2', 'action_counts', 'learning_curve'):
+        for a, b in zip(serial[column], parallel[column]):
+            np.testing.assert_array_equal(a, b)
+
+
+def test_sweep_matches_batch_training(df):
+    result = run_sweep(df, {'alpha': [0.1, 0.3, 0.5], 'num_episodes': [2]}, processes=2)
+    direct = train_double_q_batch(df['air_temp'].to_numpy(), df['soil_temp_6cm'].to_numpy(),
+                                  alpha=result['alpha'].to_numpy(), seed=result['seed'].to_numpy(), episodes=2)
+    for i, row in result.iterrows():
+        np.testing.assert_array_equal(row['q_table1'], direct['q_table1'][i])
+        np.testing.assert_array_equal(row['q_table2'], direct['q_table2'][i])
+        np.testing.assert_array_equal(row['learning_curve'], direct['episode_reward'][i])
+        assert row['final_reward'] == direct['episode_reward'][i, -1]
+        assert len(row['learning_curve']) == 2
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from energy_dql import ACTIONS, determine_state, expand_grid, precompute_energy, state_edges, train_double_q_batch
+from meteo_stub import synthetic_hourly
+
+EPISODES = 3
+
+
+@pytest.fixture(scope='module')
+def temperatures():
+    _, values = synthetic_hourly(13.7, '2024-01-01', '2024-01-21', ['temperature_2m', 'soil_temperature_6cm'])
+    return values['temperature_2m'], values['soil_temperature_6cm']
+
+
+def _reference(air, soil, alpha, gamma, epsilon, seed, episodes=EPISODES):
+    """The loop of doubleQlearningpaper for one controller, drawing random numbers like train_double_q_batch."""
+    Emin, Emax = 0.5 * 1.0 * 3.0 ** 2, 0.5 * 1.0 * 5.0 ** 2
+    num_states, num_actions = 6, len(ACTIONS)
+
+    def soes(energy):
+        return 0 if energy < Emin else (energy - Emin) / (Emax - Emin)
+
+    def state(value):
+        for i in range(num_states):
+            if i / num_states <= value < (i + 1) / num_states:
+                return i
+        return num_states - 1
+
+    q1 = np.zeros((num_states, num_actions))
+    q2 = np.zeros((num_states, num_actions))
+    counts = np.zeros(num_actions, dtype=np.int64)
+    energy = Emin + (Emax - Emin) / 2
+    previous = soes(energy)
+    current = state(previous)
+    rng = np.random.default_rng(seed)
+    for _ in range(episodes):
+        explore = rng.random(len(air))
+        random_action = rng.integers(0, num_actions, len(air))
+        coin = rng.random(len(air)) < 0.5
+        for t in range(len(air)):
+            index = random_action[t] if explore[t] < epsilon else np.argmax(q1[current] + q2[current])
+            action = ACTIONS[index]
+            energy = min(max(energy + abs(air[t] - soil[t]) * 0.1 - (0.01 + 0.005 * action), Emin), Emax)
+            value = soes(energy)
+            following = state(value)
+            reward = value - previous
+            if reward > 0:
+                reward += 0.1 * (action / max(ACTIONS))
+            if coin[t]:
+                best = np.argmax(q1[following])
+                q1[current, index] += alpha * (reward + gamma * q2[following, best] - q1[current, index])
+            else:
+                best = np.argmax(q2[following])
+                q2[current, index] += alpha * (reward + gamma * q1[following, best] - q2[current, index])
+            counts[index] += 1
+            current, previous = following, value
+    return q1, q2, counts, energy
+
+
+def test_expand_grid():
+    grid = expand_grid(alpha=[0.1, 0.3], seed=range(3), epsilon=[0.02])
+    assert list(grid) == ['alpha', 'seed', 'epsilon']
+    assert grid['alpha'].tolist() == [0.1] * 3 + [0.3] * 3
+    assert grid['seed'].tolist() == [0, 1, 2] * 2
+    assert grid['epsilon'].tolist() == [0.02] * 6
+
+
+def test_batch_matches_scalar_loop(temperatures):
+    air, soil = temperatures
+    grid = expand_grid(alpha=[0.1, 0.3], gamma=[0.8, 0.95], epsilon=[0.02, 0.5], seed=[1])
+    result = train_double_q_batch(air, soil, episodes=EPISODES, **grid)
+    for i in range(len(grid['seed'])):
+        q1, q2, counts, energy = _reference(air, soil, grid['alpha'][i], grid['gamma'][i], grid['epsilon'][i], grid['seed'][i])
+        np.testing.assert_allclose(result['q_table1'][i], q1, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(result['q_table2'][i], q2, rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(result['action_counts'][i], counts)
+        assert result['energy_store'][i] == pytest.approx(energy)
+
+
+def test_result_does_not_depend_on_batch_size(temperatures):
+    air, soil = temperatures
+    batch = train_double_q_batch(air, soil, alpha=[0.1, 0.2, 0.3], seed=[4, 5, 6], episodes=2)
+    alone = train_double_q_batch(air, soil, alpha=0.2, seed=5, episodes=2)
+    np.testing.assert_array_equal(batch['q_table1'][1], alone['q_table1'][0])
+    np.testing.assert_array_equal(batch['q_table2'][1], alone['q_table2'][0])
+
+
+def test_per_site_energy(temperatures):
+    air, soil = temperatures
+    energy = np.stack([precompute_energy(air, soil), precompute_energy(air + 2, soil)])
+    both = train_double_q_batch(generated_energy=energy, seed=[1, 1], episodes=2)
+    second = train_double_q_batch(air + 2, soil, seed=1, episodes=2)
+    np.testing.assert_array_equal(both['q_table1'][1], second['q_table1'][0])
+
+
+@pytest.mark.parametrize('num_states', [1, 6, 120])
+def test_determine_state_matches_linear_scan(num_states):
+    def scan(value):
+        for i in range(num_states):
+            if i / num_states <= value < (i + 1) / num_states:
+                return i
+        return num_states - 1
+
+    edges = np.arange(num_states + 1) / num_states
+    soes = np.r_[edges, edges[1:] - 1e-12, np.linspace(-0.5, 1.5, 1001), np.nan]
+    np.testing.assert_array_equal(determine_state(soes, num_states), [scan(value) for value in soes])
+
+
+def test_state_edges_are_shared_and_read_only():
+    edges = state_edges(6)
+    assert state_edges(6) is edges
+    np.testing.assert_allclose(edges, [1 / 6, 2 / 6, 3 / 6, 4 / 6, 5 / 6])
+    assert len(state_edges(1)) == 0
+    with pytest.raises(ValueError):
+        edges[0] = 0.5
+
+
+def test_precompute_energy(temperatures):
+    air, soil = temperatures
+    energy = precompute_energy(air, soil)
+    np.testing.assert_array_equal(energy, np.abs(air - soil) * 0.1)
+    assert not energy.flags.writeable
+    given = train_double_q_batch(generated_energy=energy, seed=[2, 3], episodes=2)
+    computed = train_double_q_batch(air, soil, seed=[2, 3], episodes=2)
+    np.testing.assert_array_equal(given['q_table1'], computed['q_table1'])
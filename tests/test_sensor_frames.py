@@ -0,0 +1,145 @@
+import io
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sensor_frames import FRAME_SIZE, FrameReader, decode_file, decode_frames, encode_frames, frame_temperatures, unwrap_millis
+
+# capture.bin holds 200 readings one second apart, starting 50 s before the
+# 32-bit millis() counter wraps. Reading i has temperatures
+# (20 + 0.01 i, 15 + 0.02 i, 10 - 0.01 i, 5); reading 7 has no third sensor
+# value and reading 9 flags a fault on the second sensor. After reading 120
+# the capture holds noise, a stray sync marker and a frame with a corrupted
+# byte before the remaining readings follow.
+CAPTURE = os.path.join(os.path.dirname(__file__), 'data', 'capture.bin')
+N_READINGS = 200
+CLEAN_PREFIX = 121
+WRAP_AT = 50
+
+
+def _capture():
+    with open(CAPTURE, 'rb') as f:
+        return f.read()
+
+
+def _expected_millis():
+    return 2**32 - 50_000 + np.arange(N_READINGS, dtype=np.int64) * 1000
+
+
+def _expected_temperatures():
+    i = np.arange(N_READINGS)
+    temperatures = np.column_stack([20 + 0.01 * i, 15 + 0.02 * i, 10 - 0.01 * i, np.full(N_READINGS, 5.0)])
+    temperatures[7, 2] = np.nan
+    temperatures[9, 1] = np.nan
+    return temperatures
+
+
+def test_clean_prefix_is_a_zero_copy_view():
+    raw = np.frombuffer(_capture(), dtype=np.uint8)[:CLEAN_PREFIX * FRAME_SIZE]
+    frames, consumed = decode_frames(raw)
+    assert consumed == CLEAN_PREFIX * FRAME_SIZE
+    assert len(frames) == CLEAN_PREFIX
+    assert np.shares_memory(frames, raw)
+    np.testing.assert_allclose(frame_temperatures(frames), _expected_temperatures()[:CLEAN_PREFIX], atol=1e-5)
+
+
+def test_encode_round_trip():
+    millis = np.arange(5) * 250
+    temperatures = np.array([[1.5, -2.25, np.nan, 40.0]] * 5)
+    frames, consumed = decode_frames(encode_frames(millis, temperatures))
+    assert consumed == 5 * FRAME_SIZE
+    np.testing.assert_array_equal(frames['millis'], millis)
+    np.testing.assert_allclose(frame_temperatures(frames), temperatures, atol=1e-5)
+
+
+def test_resync_skips_noise_and_corrupted_frame():
+    frames, consumed = decode_frames(_capture())
+    assert consumed == len(_capture())
+    assert len(frames) == N_READINGS
+    np.testing.assert_array_equal(frames['millis'], _expected_millis() & 0xFFFFFFFF)
+    np.testing.assert_allclose(frame_temperatures(frames), _expected_temperatures(), atol=1e-5)
+
+
+def test_resync_keeps_trailing_partial_frame():
+    data = _capture()[:-5]
+    frames, consumed = decode_frames(data)
+    assert len(frames) == N_READINGS - 1
+    assert len(data) - consumed == FRAME_SIZE - 5
+
+
+def test_overlapping_valid_frames_keep_the_first():
+    frame = encode_frames([1], [[1, 2, 3, 4]])
+    # A sync marker inside a valid frame must not start a second frame.
+    data = b'\x00' + frame + frame
+    frames, _ = decode_frames(data)
+    assert len(frames) == 2
+
+
+def test_unwrap_millis_across_blocks():
+    millis = _expected_millis() & 0xFFFFFFFF
+    whole = unwrap_millis(millis)
+    first = unwrap_millis(millis[:WRAP_AT - 1])
+    second = unwrap_millis(millis[WRAP_AT - 1:], previous=int(first[-1]))
+    np.testing.assert_array_equal(np.r_[first, second], whole)
+    np.testing.assert_array_equal(whole - whole[0], np.arange(N_READINGS) * 1000)
+
+
+@pytest.mark.parametrize('block_size', [1, 7, FRAME_SIZE, 3 * FRAME_SIZE + 5, 4096])
+def test_frame_reader_blocks(block_size):
+    # Every block size splits frames differently and puts the wrap in a
+    # different block; the result must equal decoding the whole capture.
+    reader = FrameReader(io.BytesIO(_capture()), '2024-01-01', block_size=block_size, stop_at_eof=True)
+    reader.start()
+    reader.join(10)
+    df = reader.to_dataframe()
+    expected = decode_file(CAPTURE, '2024-01-01')
+    assert reader.frames_read == N_READINGS
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    steps = np.diff(df['time'].to_numpy()).astype('timedelta64[ms]').astype(np.int64)
+    np.testing.assert_array_equal(steps, 1000)
+
+
+def test_frame_reader_carries_partial_frames():
+    data = _capture()
+    reader = FrameReader(io.BytesIO(), '2024-01-01')
+    split = CLEAN_PREFIX * FRAME_SIZE - 3
+    reader.feed(data[:split])
+    assert reader.frames_read == CLEAN_PREFIX - 1
+    assert len(reader._carry) == FRAME_SIZE - 3
+    reader.feed(data[split:])
+    assert reader.frames_read == N_READINGS
+
+
+class _QuietStream:
+    """A non-blocking stream: read() returns nothing until data is put into it."""
+
+    def __init__(self):
+        self.data = b''
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def read(self, size):
+        with self._lock:
+            self.calls += 1
+            data, self.data = self.data[:size], self.data[size:]
+        return data
+
+    def put(self, data):
+        with self._lock:
+            self.data += data
+
+
+def test_frame_reader_polls_a_quiet_stream():
+    stream = _QuietStream()
+    with FrameReader(stream, '2024-01-01', poll_interval=0.05) as reader:
+        time.sleep(0.3)
+        assert stream.calls < 20
+        stream.put(_capture()[:CLEAN_PREFIX * FRAME_SIZE])
+        deadline = time.time() + 5
+        while reader.frames_read < CLEAN_PREFIX and time.time() < deadline:
+            time.sleep(0.01)
+    assert len(reader.to_dataframe()) == CLEAN_PREFIX
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sensor_serial import DEFAULT_COLUMNS, RingBuffer, SerialReader, parse_line, read_log
+
+
+def _log_lines(readings):
+    lines = [b'Failed to initialize MAX31865 sensor 3!\r\n']
+    for values in readings:
+        for sensor, value in enumerate(values, start=1):
+            text = 'nan' if np.isnan(value) else f'{value:.2f}'
+            lines.append(f'Temperature {sensor}: {text} °C\r\n'.encode())
+        lines.append(b'\r\n')
+    return lines
+
+
+@pytest.fixture
+def readings():
+    rng = np.random.default_rng(3)
+    values = np.round(rng.normal(12, 4, (50, 4)), 2)
+    values[7, 2] = np.nan
+    return values
+
+
+@pytest.fixture
+def log_file(tmp_path, readings):
+    path = tmp_path / 'capture.log'
+    path.write_bytes(b''.join(_log_lines(readings)))
+    return path
+
+
+def test_parse_line():
+    assert parse_line(b'Temperature 2: -3.25 \xc2\xb0C\r\n') == (2, -3.25)
+    sensor, value = parse_line(b'Temperature 4: NAN \xc2\xb0C')
+    assert sensor == 4 and np.isnan(value)
+    assert parse_line(b'Failed to initialize MAX31865 sensor 1!') is None
+
+
+def test_read_log_replays_file(log_file, readings):
+    df = read_log(str(log_file), start='2024-05-01 12:00')
+    assert list(df.columns) == ['time'] + DEFAULT_COLUMNS
+    np.testing.assert_array_equal(df['time'].to_numpy(), pd.date_range('2024-05-01 12:00', periods=len(readings), freq='1s').to_numpy())
+    np.testing.assert_allclose(df[DEFAULT_COLUMNS].to_numpy(), readings)
+
+
+def test_serial_reader_replays_file(log_file, readings):
+    clock = iter(range(0, 10 ** 12, 10 ** 9))
+    with open(log_file, 'rb') as f:
+        reader = SerialReader(f, stop_at_eof=True, clock=lambda: next(clock)).start()
+        reader.join(5)
+    assert reader.lines_read == len(_log_lines(readings))
+    assert reader.lines_skipped == 1 + len(readings)
+    df = reader.to_dataframe()
+    np.testing.assert_allclose(df[DEFAULT_COLUMNS].to_numpy(), readings)
+    assert len(reader.to_dataframe()) == 0
+
+
+def test_lost_line_keeps_partial_set():
+    reader = SerialReader(None, clock=iter(range(10)).__next__)
+    for line in [b'Temperature 1: 1.0', b'Temperature 2: 2.0', b'Temperature 1: 5.0', b'Temperature 2: 6.0',
+                 b'Temperature 3: 7.0', b'Temperature 4: 8.0', b'Temperature 9: 1.0']:
+        reader.feed(line)
+    np.testing.assert_allclose(reader.to_dataframe()[DEFAULT_COLUMNS].to_numpy(), [[1, 2, np.nan, np.nan], [5, 6, 7, 8]])
+    assert reader.lines_skipped == 1
+
+
+class _CountingStream:
+    """A stream that stays quiet until lines are put into it."""
+
+    def __init__(self):
+        self.lines = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def readline(self):
+        with self._lock:
+            self.calls += 1
+            return self.lines.pop(0) if self.lines else b''
+
+    def put(self, lines):
+        with self._lock:
+            self.lines.extend(lines)
+
+
+def test_quiet_stream_is_polled_not_spun(readings):
+    stream = _CountingStream()
+    with SerialReader(stream, poll_interval=0.05) as reader:
+        time.sleep(0.3)
+        assert stream.calls < 20
+        stream.put(_log_lines(readings[:3]))
+        deadline = time.time() + 5
+        while len(reader.buffer) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+    np.testing.assert_allclose(reader.to_dataframe()[DEFAULT_COLUMNS].to_numpy(), readings[:3])
+
+
+def test_ring_buffer_overwrites_oldest():
+    buffer = RingBuffer(4, 1)
+    for i in range(3):
+        buffer.append(np.datetime64(i, 's'), [i])
+    buffer.extend(np.arange(3, 6).astype('datetime64[s]'), np.arange(3, 6)[:, None])
+    assert buffer.dropped == 2
+    times, values = buffer.drain()
+    np.testing.assert_array_equal(values[:, 0], [2, 3, 4, 5])
+    np.testing.assert_array_equal(times, np.arange(2, 6).astype('datetime64[s]'))
+    buffer.extend(np.arange(10).astype('datetime64[s]'), np.arange(10)[:, None])
+    assert buffer.dropped == 8
+    np.testing.assert_array_equal(buffer.drain()[1][:, 0], [6, 7, 8, 9])
+
+
+def test_ring_buffer_counts_drops_under_concurrency():
+    buffer = RingBuffer(16, 1)
+    block = (np.zeros(40, dtype='datetime64[ns]'), np.zeros((40, 1)))
+    drained = []
+
+    def writer():
+        for _ in range(200):
+            buffer.extend(*block)
+            buffer.append(np.datetime64(0, 'ns'), [0.0])
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        drained.append(len(buffer.drain()[0]))
+    for thread in threads:
+        thread.join()
+    drained.append(len(buffer.drain()[0]))
+    # Every reading is either drained or counted as dropped.
+    assert sum(drained) + buffer.dropped == 4 * 200 * 41
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from weather_align import align_series, asof_join, make_grid, resample_series
+
+
+@pytest.fixture
+def sensor():
+    # Ten-minute readings with a gap from 02:00 to 04:00.
+    times = pd.date_range('2024-01-01 00:00', '2024-01-01 05:50', freq='10min')
+    df = pd.DataFrame({'time': times, 'temperature': np.arange(len(times), dtype=float)})
+    return df[(df['time'] < '2024-01-01 02:00') | (df['time'] >= '2024-01-01 04:00')].reset_index(drop=True)
+
+
+def test_make_grid():
+    grid = make_grid('2024-01-01 00:20', '2024-01-01 03:10')
+    assert grid.dtype == np.dtype('datetime64[ns]')
+    np.testing.assert_array_equal(grid, pd.date_range('2024-01-01', periods=4, freq='h').to_numpy())
+
+
+def test_resample_mean_and_last(sensor):
+    grid = make_grid('2024-01-01 00:00', '2024-01-01 05:00')
+    mean = resample_series(sensor, grid, 'mean')
+    last = resample_series(sensor, grid, 'last')
+    np.testing.assert_array_equal(mean['time'].to_numpy(), grid)
+    np.testing.assert_allclose(mean['temperature'], [2.5, 8.5, np.nan, np.nan, 26.5, 32.5])
+    np.testing.assert_allclose(last['temperature'], [5, 11, np.nan, np.nan, 29, 35])
+
+
+def test_resample_interpolate_tolerance(sensor):
+    grid = make_grid('2024-01-01 00:00', '2024-01-01 05:00')
+    unlimited = resample_series(sensor, grid, 'interpolate')
+    limited = resample_series(sensor, grid, 'interpolate', tolerance='30min')
+    # The gap runs from 01:50 (11) to 04:00 (24), so the line bridges it exactly.
+    np.testing.assert_allclose(unlimited['temperature'], [0, 6, 12, 18, 24, 30])
+    # 02:00 and 03:00 are 10 and 70 minutes from a sample: 03:00 is cut off.
+    np.testing.assert_allclose(limited['temperature'].to_numpy()[[0, 1, 4, 5]], [0, 6, 24, 30])
+    assert np.isnan(limited['temperature'].iloc[3])
+    assert not np.isnan(limited['temperature'].iloc[2])
+
+
+def test_resample_tolerance_per_column():
+    times = pd.date_range('2024-01-01', periods=6, freq='h')
+    df = pd.DataFrame({'time': times, 'a': np.arange(6.0), 'b': [0, np.nan, np.nan, np.nan, np.nan, 5.0]})
+    out = resample_series(df, make_grid(times[0], times[-1], '30min'), 'interpolate', tolerance='1h')
+    assert not out['a'].isna().any()
+    # b's own samples are five hours apart, whatever column a holds.
+    np.testing.assert_allclose(out['b'], [0, 0.5, 1] + [np.nan] * 5 + [4, 4.5, 5])
+
+
+def test_resample_rejects_unknown_method(sensor):
+    with pytest.raises(ValueError):
+        resample_series(sensor, make_grid('2024-01-01', '2024-01-01 01:00'), 'median')
+
+
+def test_align_inner_and_outer(sensor):
+    meteo = pd.DataFrame({
+        'time': pd.date_range('2024-01-01 03:00', periods=6, freq='h'),
+        'temperature': np.arange(6.0),
+    })
+    inner = align_series({'sensor': sensor, 'meteo': meteo})
+    outer = align_series({'sensor': sensor, 'meteo': meteo}, join='outer')
+    assert list(inner.columns) == ['time', 'sensor_temperature', 'meteo_temperature']
+    np.testing.assert_array_equal(inner['time'].to_numpy(), make_grid('2024-01-01 03:00', '2024-01-01 05:00'))
+    np.testing.assert_array_equal(outer['time'].to_numpy(), make_grid('2024-01-01 00:00', '2024-01-01 08:00'))
+    np.testing.assert_allclose(inner['meteo_temperature'], [0, 1, 2])
+    assert outer['sensor_temperature'].iloc[6:].isna().all()
+    with pytest.raises(ValueError):
+        align_series({'sensor': sensor, 'meteo': meteo}, join='left')
+
+
+@pytest.mark.parametrize('how', ['mean', 'last', 'interpolate'])
+def test_align_disjoint_sources(sensor, how):
+    later = sensor.assign(time=sensor['time'] + pd.Timedelta(days=30))
+    inner = align_series({'a': sensor, 'b': later}, how=how)
+    assert list(inner.columns) == ['time', 'a_temperature', 'b_temperature']
+    assert len(inner) == 0
+    outer = align_series({'a': sensor, 'b': later}, how=how, join='outer')
+    assert outer['a_temperature'].notna().sum() > 0
+    assert outer['b_temperature'].notna().sum() > 0
+
+
+def test_resample_empty_frame():
+    grid = make_grid('2024-01-01', '2024-01-01 03:00')
+    empty = pd.DataFrame({'time': pd.Series([], dtype='datetime64[ns]'), 'x': pd.Series([], dtype=float)})
+    for how in ('mean', 'last', 'interpolate'):
+        out = resample_series(empty, grid, how, tolerance='1h')
+        assert len(out) == len(grid) and out['x'].isna().all()
+
+
+def test_asof_join(sensor):
+    meteo = pd.DataFrame({
+        'time': pd.date_range('2024-01-01 00:00', periods=6, freq='h'),
+        'temperature': np.arange(6.0) * 10,
+    })
+    shifted = sensor.assign(time=sensor['time'] + pd.Timedelta(minutes=4))
+    joined = asof_join(meteo, shifted, tolerance='5min')
+    assert list(joined.columns) == ['time', 'temperature', 'temperature_right']
+    np.testing.assert_allclose(joined['temperature_right'], [0, 6, np.nan, np.nan, 24, 30])
+    backward = asof_join(meteo, shifted, tolerance='5min', direction='backward')
+    assert backward['temperature_right'].isna().all()
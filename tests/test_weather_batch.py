@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+import weather_batch
+from meteo_stub import StubMeteoServer, synthetic_hourly
+from weather_batch import _fetch_with_retry, fetch_meteo_batch, make_session
+from weather_cache import MeteoCache
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm']
+JOB = (52.52, 13.41, '2024-01-01', '2024-01-03')
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waited = []
+    monkeypatch.setattr(weather_batch.time, 'sleep', waited.append)
+    return waited
+
+
+def _closed_url():
+    with StubMeteoServer() as server:
+        return server.url
+
+
+class CountingSession(requests.Session):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+        self.closed = False
+
+    def get(self, *args, **kwargs):
+        self.gets += 1
+        return super().get(*args, **kwargs)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_retries_with_doubling_backoff(sleeps, status):
+    with StubMeteoServer(fail_first=2, fail_status=status) as server, make_session() as session:
+        df = _fetch_with_retry(JOB, VARIABLES, session, None, server.url, retries=3, backoff=0.5)
+    assert server.requests_served == 3
+    assert sleeps == [0.5, 1.0]
+    assert len(df) == 3 * 24 and list(df.columns) == ['time'] + VARIABLES
+
+
+def test_gives_up_after_retries(sleeps, capsys):
+    with StubMeteoServer(fail_first=10, fail_status=429) as server, make_session() as session:
+        assert _fetch_with_retry(JOB, VARIABLES, session, None, server.url, retries=2, backoff=0.25) is None
+    assert server.requests_served == 3
+    assert sleeps == [0.25, 0.5]
+    assert 'Error fetching data' in capsys.readouterr().out
+
+
+def test_retries_connection_errors(sleeps):
+    with make_session() as session:
+        assert _fetch_with_retry(JOB, VARIABLES, session, None, _closed_url(), retries=2, backoff=0.1) is None
+    assert sleeps == [0.1, 0.2]
+
+
+@pytest.mark.parametrize('fail_status, malformed', [(404, False), (400, False), (503, True)])
+def test_client_errors_and_malformed_responses_are_not_retried(sleeps, capsys, fail_status, malformed):
+    with StubMeteoServer(fail_first=0 if malformed else 1, fail_status=fail_status, malformed=malformed) as server:
+        with make_session() as session:
+            assert _fetch_with_retry(JOB, VARIABLES, session, None, server.url, retries=3, backoff=0.5) is None
+    assert server.requests_served == 1 and sleeps == []
+    assert 'Error' in capsys.readouterr().out
+
+
+def test_batch_is_long_format_and_sorted(sleeps):
+    jobs = [
+        (47.37, 8.54, '2024-01-03', '2024-01-04'),
+        (52.52, 13.41, '2024-01-01', '2024-01-02'),
+        # Overlaps the previous job by a day.
+        (52.52, 13.41, '2024-01-02', '2024-01-03'),
+    ]
+    with StubMeteoServer(fail_first=1) as server:
+        result = fetch_meteo_batch(jobs, VARIABLES, max_workers=3, base_url=server.url)
+    assert list(result.columns) == ['latitude', 'longitude', 'time', 'variable', 'value']
+    assert len(sleeps) == 1
+
+    for latitude, longitude, start_date, end_date in [jobs[0], (52.52, 13.41, '2024-01-01', '2024-01-03')]:
+        times, values = synthetic_hourly(latitude, start_date, end_date, VARIABLES)
+        location = result[(result['latitude'] == latitude) & (result['longitude'] == longitude)]
+        assert list(location['variable'].unique()) == sorted(VARIABLES)
+        for var in VARIABLES:
+            rows = location[location['variable'] == var]
+            np.testing.assert_array_equal(rows['time'], times.astype('datetime64[ns]'))
+            np.testing.assert_allclose(rows['value'], values[var])
+    assert len(result) == (2 + 3) * 24 * len(VARIABLES)
+    assert list(result['latitude'].unique()) == [47.37, 52.52]
+
+
+def test_failed_jobs_are_left_out(sleeps, capsys):
+    jobs = [JOB, (52.52, 13.41, 'not-a-date', '2024-01-03')]
+    with StubMeteoServer() as server:
+        result = fetch_meteo_batch(jobs, VARIABLES, base_url=server.url)
+    assert len(result) == 3 * 24 * len(VARIABLES)
+    assert 'not-a-date' in capsys.readouterr().out
+
+    empty = fetch_meteo_batch([JOB], VARIABLES, retries=0, base_url=_closed_url())
+    assert empty.empty and list(empty.columns) == ['latitude', 'longitude', 'time', 'variable', 'value']
+
+
+def test_session_is_shared_and_closed_only_when_owned(sleeps, monkeypatch):
+    jobs = [(52.52, 13.41, f'2024-01-0{day}', f'2024-01-0{day}') for day in range(1, 7)]
+    with StubMeteoServer() as server:
+        session = CountingSession()
+        fetch_meteo_batch(jobs, VARIABLES, max_workers=3, session=session, base_url=server.url)
+        assert session.gets == len(jobs) and not session.closed
+
+        created = []
+
+        def counting_session(pool_size):
+            created.append(CountingSession())
+            return created[-1]
+
+        monkeypatch.setattr(weather_batch, 'make_session', counting_session)
+        fetch_meteo_batch(jobs, VARIABLES, max_workers=3, base_url=server.url)
+    assert len(created) == 1 and created[0].gets == len(jobs) and created[0].closed
+
+
+def test_batch_fills_a_shared_cache(sleeps, tmp_path):
+    cache = MeteoCache(str(tmp_path))
+    jobs = [JOB, (47.37, 8.54, '2024-01-01', '2024-01-03')]
+    with StubMeteoServer() as server:
+        first = fetch_meteo_batch(jobs, VARIABLES, cache=cache, base_url=server.url)
+        served = server.requests_served
+    second = fetch_meteo_batch(jobs, VARIABLES, cache=cache, base_url=_closed_url())
+    assert served == 2
+    pd.testing.assert_frame_equal(second, first)
@@ -0,0 +1,148 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import weather_cache
+from meteo_stub import StubMeteoServer, synthetic_hourly
+from weather import fetch_meteo_data
+from weather_cache import MeteoCache
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm']
+LAT, LON = 52.52, 13.41
+
+
+def _hours(date_string):
+    return int(np.datetime64(date_string, 'h').astype(np.int64))
+
+
+def _frame(start_date, end_date, variables=VARIABLES, latitude=LAT):
+    times, values = synthetic_hourly(latitude, start_date, end_date, variables)
+    return pd.DataFrame({'time': times.astype('datetime64[ns]'), **values})
+
+
+@pytest.fixture
+def server():
+    with StubMeteoServer() as server:
+        yield server
+
+
+def test_coverage_and_missing_ranges(tmp_path):
+    cache = MeteoCache(str(tmp_path))
+    assert cache.missing_ranges(LAT, LON, VARIABLES, '2024-01-01', '2024-01-10') == [('2024-01-01', '2024-01-10')]
+    cache.store(LAT, LON, _frame('2024-01-03', '2024-01-04'), VARIABLES)
+    cache.store(LAT, LON, _frame('2024-01-08', '2024-01-08'), VARIABLES)
+    np.testing.assert_array_equal(cache.coverage(LAT, LON, VARIABLES[0]), [
+        [_hours('2024-01-03T00'), _hours('2024-01-05T00')],
+        [_hours('2024-01-08T00'), _hours('2024-01-09T00')],
+    ])
+    assert cache.missing_ranges(LAT, LON, VARIABLES, '2024-01-01', '2024-01-10') == [
+        ('2024-01-01', '2024-01-02'), ('2024-01-05', '2024-01-07'), ('2024-01-09', '2024-01-10'),
+    ]
+    # A variable cached for fewer days widens the gaps of the combined request.
+    cache.store(LAT, LON, _frame('2024-01-01', '2024-01-02', VARIABLES[1:]), VARIABLES[1:])
+    assert cache.missing_ranges(LAT, LON, VARIABLES, '2024-01-01', '2024-01-04') == [('2024-01-01', '2024-01-02')]
+    assert cache.missing_ranges(LAT, LON, VARIABLES[1:], '2024-01-01', '2024-01-04') == []
+
+
+def test_load_fills_uncached_hours_with_nan(tmp_path):
+    cache = MeteoCache(str(tmp_path))
+    cache.store(LAT, LON, _frame('2024-01-02', '2024-01-02'), VARIABLES)
+    df = cache.load(LAT, LON, '2024-01-01', '2024-01-03', VARIABLES)
+    assert len(df) == 72 and df['time'].dtype == np.dtype('datetime64[ns]')
+    assert df[VARIABLES].iloc[24:48].notna().all().all()
+    assert df[VARIABLES].iloc[:24].isna().all().all() and df[VARIABLES].iloc[48:].isna().all().all()
+
+
+def test_second_call_is_served_offline(tmp_path, server):
+    cache = MeteoCache(str(tmp_path))
+    first = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-20', VARIABLES, cache=cache, base_url=server.url, chunk_days=7)
+    assert server.requests_served == 3
+    server.stop()
+    second = fetch_meteo_data(LAT, LON, '2024-01-05', '2024-01-12', VARIABLES, cache=cache, base_url=server.url)
+    pd.testing.assert_frame_equal(second, first.iloc[4 * 24:12 * 24].reset_index(drop=True))
+    assert 'fetch_error' not in second.attrs
+    assert server.requests_served == 3
+
+
+def test_only_missing_days_are_requested(tmp_path, server):
+    cache = MeteoCache(str(tmp_path))
+    fetch_meteo_data(LAT, LON, '2024-01-05', '2024-01-06', VARIABLES, cache=cache, base_url=server.url)
+    df = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-10', VARIABLES, cache=cache, base_url=server.url)
+    assert server.requests_served == 3
+    pd.testing.assert_frame_equal(df, _frame('2024-01-01', '2024-01-10'))
+
+
+def test_partial_result_is_flagged_when_offline(tmp_path, server, capsys):
+    cache = MeteoCache(str(tmp_path))
+    fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-02', VARIABLES, cache=cache, base_url=server.url)
+    server.stop()
+    df = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-04', VARIABLES, cache=cache, base_url=server.url)
+    assert 'fetch_error' in df.attrs
+    assert df[VARIABLES].iloc[:48].notna().all().all() and df[VARIABLES].iloc[48:].isna().all().all()
+    assert 'returning cached hours only' in capsys.readouterr().out
+    # Nothing cached for the range: the error path of an uncached fetch.
+    assert fetch_meteo_data(LAT, LON, '2024-02-01', '2024-02-02', VARIABLES, cache=cache, base_url=server.url) is None
+
+
+def test_missing_values_expire_after_null_ttl(tmp_path, server, monkeypatch):
+    cache = MeteoCache(str(tmp_path), null_ttl=3600)
+    server.null_from = '2024-01-03'
+    first = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-04', VARIABLES, cache=cache, base_url=server.url)
+    assert first[VARIABLES].iloc[48:].isna().all().all()
+    # Null hours count as fetched while they are fresh.
+    fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-04', VARIABLES, cache=cache, base_url=server.url)
+    assert server.requests_served == 1
+
+    server.null_from = None
+    now = time.time()
+    monkeypatch.setattr(weather_cache.time, 'time', lambda: now + 7200)
+    assert cache.missing_ranges(LAT, LON, VARIABLES, '2024-01-01', '2024-01-04') == [('2024-01-03', '2024-01-04')]
+    refreshed = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-04', VARIABLES, cache=cache, base_url=server.url)
+    assert server.requests_served == 2
+    pd.testing.assert_frame_equal(refreshed, _frame('2024-01-01', '2024-01-04'))
+
+
+def test_null_values_kept_without_ttl(tmp_path, monkeypatch):
+    cache = MeteoCache(str(tmp_path), null_ttl=None)
+    df = _frame('2024-01-01', '2024-01-01')
+    df.loc[12:, VARIABLES] = np.nan
+    cache.store(LAT, LON, df, VARIABLES)
+    now = time.time()
+    monkeypatch.setattr(weather_cache.time, 'time', lambda: now + 10 ** 7)
+    assert cache.missing_ranges(LAT, LON, VARIABLES, '2024-01-01', '2024-01-01') == []
+
+
+def _store_site(cache, latitude):
+    cache.store(latitude, LON, _frame('2024-01-01', '2024-01-31', latitude=latitude), VARIABLES)
+
+
+def _cached_sites(cache, latitudes):
+    return [lat for lat in latitudes if len(cache.coverage(lat, LON, VARIABLES[0]))]
+
+
+def test_lru_eviction_by_entries(tmp_path):
+    cache = MeteoCache(str(tmp_path), max_entries=4)
+    _store_site(cache, 10.0)
+    _store_site(cache, 20.0)
+    # Reading the first site makes the second the least recently used.
+    cache.load(10.0, LON, '2024-01-01', '2024-01-02', VARIABLES)
+    _store_site(cache, 30.0)
+    assert _cached_sites(cache, [10.0, 20.0, 30.0]) == [10.0, 30.0]
+
+
+def test_lru_eviction_by_bytes(tmp_path):
+    probe = MeteoCache(str(tmp_path / 'probe'))
+    _store_site(probe, 10.0)
+    entry_bytes = max(entry['bytes'] for entry in probe._read_index().values())
+
+    # Room for two sites of two variables each.
+    budget = 4 * entry_bytes + entry_bytes // 2
+    cache = MeteoCache(str(tmp_path / 'cache'), max_bytes=budget)
+    for latitude in (10.0, 20.0, 30.0):
+        _store_site(cache, latitude)
+    assert _cached_sites(cache, [10.0, 20.0, 30.0]) == [20.0, 30.0]
+    index = cache._read_index()
+    assert sum(entry['bytes'] for entry in index.values()) <= budget
+    assert len(list((tmp_path / 'cache').glob('*.npz'))) == len(index) == 4
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from meteo_stub import StubMeteoServer
+from weather import _split_date_range, _stitch_chunks, fetch_meteo_data
+from weather_cache import MeteoCache
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm']
+LAT, LON = 52.52, 13.41
+
+
+@pytest.mark.parametrize('start_date, end_date, chunk_days, expected', [
+    ('2024-01-01', '2024-01-10', 4, [('2024-01-01', '2024-01-04'), ('2024-01-05', '2024-01-08'), ('2024-01-09', '2024-01-10')]),
+    ('2024-01-01', '2024-01-09', 3, [('2024-01-01', '2024-01-03'), ('2024-01-04', '2024-01-06'), ('2024-01-07', '2024-01-09')]),
+    ('2024-02-27', '2024-03-02', 2, [('2024-02-27', '2024-02-28'), ('2024-02-29', '2024-03-01'), ('2024-03-02', '2024-03-02')]),
+    ('2024-01-05', '2024-01-05', 30, [('2024-01-05', '2024-01-05')]),
+    ('2024-01-01', '2024-01-10', 30, [('2024-01-01', '2024-01-10')]),
+])
+def test_split_date_range(start_date, end_date, chunk_days, expected):
+    assert _split_date_range(start_date, end_date, chunk_days) == expected
+
+
+def test_stitch_chunks_orders_and_drops_repeated_hours():
+    times = pd.date_range('2024-01-01', periods=6, freq='h')
+    first = pd.DataFrame({'time': times[:4], 'x': [0.0, 1.0, 2.0, 3.0]})
+    second = pd.DataFrame({'time': times[3:], 'x': [30.0, 4.0, 5.0]})
+    stitched = _stitch_chunks([second, first])
+    assert list(stitched['time']) == list(times)
+    # The repeated hour keeps the value of the later frame.
+    assert stitched['x'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert list(stitched.index) == list(range(6))
+
+
+def test_chunked_fetch_matches_single_request():
+    with StubMeteoServer() as server:
+        single = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-02-15', VARIABLES, base_url=server.url)
+        served = server.requests_served
+        chunked = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-02-15', VARIABLES, base_url=server.url, chunk_days=7, max_workers=3)
+    assert served == 1 and server.requests_served == 1 + 7
+    assert len(chunked) == 46 * 24 and chunked['time'].is_unique
+    pd.testing.assert_frame_equal(chunked, single)
+
+
+def test_failed_chunk_is_the_only_one_requested_again(tmp_path):
+    cache = MeteoCache(str(tmp_path))
+    with StubMeteoServer(fail_first=1) as server:
+        fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-09', VARIABLES, cache=cache, base_url=server.url, chunk_days=3)
+        assert server.requests_served == 3
+        df = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-09', VARIABLES, cache=cache, base_url=server.url, chunk_days=3)
+        assert server.requests_served == 4
+        expected = fetch_meteo_data(LAT, LON, '2024-01-01', '2024-01-09', VARIABLES, base_url=server.url)
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
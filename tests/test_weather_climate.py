@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_stub import synthetic_hourly
+from weather_climate import ClimateSummary, climatology
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm']
+COLUMNS = ['count', 'mean', 'std', 'min', 'max']
+
+
+@pytest.fixture(scope='module')
+def frame():
+    times, values = synthetic_hourly(52.0, '2021-01-01', '2022-12-31', VARIABLES)
+    df = pd.DataFrame({'time': times.astype('datetime64[ns]'), **values})
+    df.loc[500:529, VARIABLES[1]] = np.nan
+    return df
+
+
+def _diff(df):
+    return df[VARIABLES[1]] - df[VARIABLES[0]]
+
+
+def _rolling(df, windows=('24h', '7D')):
+    series = pd.Series(_diff(df).to_numpy(), index=pd.DatetimeIndex(df['time']))
+    return np.column_stack([
+        series.rolling(window, min_periods=1).agg(statistic).to_numpy()
+        for window in windows for statistic in ('mean', 'std', 'min', 'max')
+    ])
+
+
+def _assert_summary(summary, df):
+    times = df['time'].dt
+    expected = _diff(df).groupby([times.month, times.hour]).agg(COLUMNS).to_numpy(float)
+    np.testing.assert_allclose(summary.month_hour()[COLUMNS].to_numpy(float), expected)
+    np.testing.assert_allclose(summary.rolling.iloc[:, 1:].to_numpy(float), _rolling(df), atol=1e-9, equal_nan=True)
+
+
+def test_climatology_matches_pandas(frame):
+    hour_of_day, month_of_year = climatology(frame, *VARIABLES)
+    times = frame['time'].dt
+    np.testing.assert_allclose(hour_of_day.to_numpy(float), _diff(frame).groupby(times.hour).agg(COLUMNS).to_numpy(float))
+    np.testing.assert_allclose(month_of_year.to_numpy(float), _diff(frame).groupby(times.month).agg(COLUMNS).to_numpy(float))
+
+
+def test_overlapping_updates_match_one_shot(frame):
+    summary = ClimateSummary(*VARIABLES)
+    cuts = [0, 24, 25, 1000, 5000, len(frame)]
+    for start, end in zip(cuts, cuts[1:]):
+        # Every chunk repeats the last two days of the previous one.
+        summary.update(frame.iloc[max(0, start - 48):end])
+    assert len(summary.rolling) == len(frame)
+    _assert_summary(summary, frame)
+
+
+def test_trailing_missing_hours_are_held_back(frame):
+    unpublished = frame.copy()
+    unpublished.loc[len(frame) - 30:, VARIABLES[1]] = np.nan
+    summary = ClimateSummary(*VARIABLES)
+    assert summary.update(unpublished) == len(frame) - 30
+    assert summary.update(frame) == 30
+    _assert_summary(summary, frame)
+
+
+def test_save_and_load(frame, tmp_path):
+    summary = ClimateSummary(*VARIABLES)
+    summary.update(frame.iloc[:8000])
+    path = summary.save(str(tmp_path / 'summary.npz'))
+    loaded = ClimateSummary.load(path)
+    loaded.update(frame)
+    _assert_summary(loaded, frame)
+    assert loaded.rolling_between('2022-06-01', '2022-06-01 03:00')['time'].tolist() == list(pd.date_range('2022-06-01', periods=4, freq='h'))
+
+
+def test_merge_pools_sites(frame):
+    first, second = ClimateSummary(*VARIABLES), ClimateSummary(*VARIABLES)
+    first.update(frame.iloc[:9000])
+    second.update(frame.iloc[9000:])
+    first.merge(second)
+    times = frame['time'].dt
+    expected = _diff(frame).groupby(times.hour).agg(COLUMNS).to_numpy(float)
+    np.testing.assert_allclose(first.hour_of_day().to_numpy(float), expected)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_stub import StubMeteoServer
+from weather import _decode_hourly, fetch_meteo_data
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm', 'soil_temperature_28_to_100cm']
+
+
+def _fetch(server, **kwargs):
+    return fetch_meteo_data(48.1, 11.6, '2024-03-01', '2024-03-10', VARIABLES, base_url=server.url, **kwargs)
+
+
+@pytest.mark.parametrize('null_from', [None, '2024-03-07T13'])
+def test_fast_decode_matches_compat(null_from):
+    with StubMeteoServer(null_from=null_from) as server:
+        fast = _fetch(server)
+        compat = _fetch(server, compat=True)
+    pd.testing.assert_frame_equal(fast, compat)
+    assert fast['time'].dtype == np.dtype('datetime64[ns]')
+    assert fast[VARIABLES].isna().sum().sum() == (0 if null_from is None else 3 * (3 * 24 + 11))
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'dtype': np.float32},
+    {'nullable': True},
+    {'dtype': np.float32, 'nullable': True},
+])
+def test_fast_decode_matches_compat_with_dtypes(kwargs):
+    with StubMeteoServer(null_from='2024-03-09') as server:
+        fast = _fetch(server, **kwargs)
+        compat = _fetch(server, compat=True, **kwargs)
+    pd.testing.assert_frame_equal(fast, compat)
+
+
+@pytest.mark.parametrize('compat', [False, True])
+def test_malformed_response_takes_the_error_path(compat, capsys):
+    with StubMeteoServer(malformed=True) as server:
+        assert _fetch(server, compat=compat) is None
+    assert 'Error fetching data' in capsys.readouterr().out
+
+
+def test_decode_hourly_rejects_malformed_arrays():
+    head = b'{"hourly": {"time": ["2024-01-01T00:00", "2024-01-01T01:00"], "t": '
+    assert _decode_hourly(head + b'[1.5, null]}}', ['t'])[1]['t'].tolist()[0] == 1.5
+    for segment in (b'[1.5, nul]}}', b'[1.5, "x"]}}', b'[1.5, '):
+        with pytest.raises(ValueError):
+            _decode_hourly(head + segment, ['t'])
+    with pytest.raises(KeyError):
+        _decode_hourly(head + b'[1.5, null]}}', ['u'])
+    # A count or time step the fast path cannot vouch for goes to the compatibility decode.
+    assert _decode_hourly(head + b'[1.5]}}', ['t']) is None
@@ -0,0 +1,97 @@
+import warnings
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from weather_fit import fit_groups, group_moments, pdf, plot_fits
+
+N = 20000
+
+
+@pytest.fixture(scope='module')
+def samples():
+    rng = np.random.default_rng(11)
+    values = np.concatenate([
+        stats.norm.rvs(2.0, 1.5, size=N, random_state=rng),
+        stats.gamma.rvs(4.0, loc=1.0, scale=2.0, size=N, random_state=rng),
+        stats.skewnorm.rvs(3.0, loc=-1.0, scale=2.0, size=N, random_state=rng),
+    ])
+    groups = np.repeat(np.arange(3), N)
+    return values, groups
+
+
+def test_group_moments(samples):
+    values, groups = samples
+    count, mean, std, skew = group_moments(values, groups, 4)
+    np.testing.assert_array_equal(count, [N, N, N, 0])
+    for g in range(3):
+        sample = values[groups == g]
+        assert mean[g] == pytest.approx(sample.mean())
+        assert std[g] == pytest.approx(sample.std(ddof=1))
+        assert skew[g] == pytest.approx(stats.skew(sample))
+    assert np.isnan(mean[3]) and np.isnan(std[3]) and np.isnan(skew[3])
+
+
+def test_mle_matches_scipy_fit(samples):
+    values, groups = samples
+    fits = fit_groups(values, groups, 3, families=('norm', 'gamma', 'skewnorm'), method='mle')
+    for g in range(3):
+        sample = values[groups == g]
+        loc, scale = stats.norm.fit(sample)
+        assert fits.loc[(g, 'norm'), ['loc', 'scale']].tolist() == pytest.approx([loc, scale])
+    for family, g in (('gamma', 1), ('skewnorm', 2)):
+        expected = getattr(stats, family).fit(values[groups == g])
+        assert fits.loc[(g, family), ['shape', 'loc', 'scale']].tolist() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('family, group, true', [
+    ('norm', 0, (np.nan, 2.0, 1.5)),
+    ('gamma', 1, (4.0, 1.0, 2.0)),
+    ('skewnorm', 2, (3.0, -1.0, 2.0)),
+])
+def test_moments_recover_parameters(samples, family, group, true):
+    values, groups = samples
+    fits = fit_groups(values, groups, 3, families=(family,))
+    row = fits.loc[(group, family)]
+    sample = values[groups == group]
+    if family == 'norm':
+        # Sample standard deviation, where scipy's fit divides by n.
+        assert row['loc'] == pytest.approx(stats.norm.fit(sample)[0])
+        assert row['scale'] == pytest.approx(sample.std(ddof=1))
+    else:
+        mle = getattr(stats, family).fit(sample)
+        assert [row['shape'], row['loc'], row['scale']] == pytest.approx(mle, rel=0.15)
+        assert [row['shape'], row['loc'], row['scale']] == pytest.approx(true, rel=0.15, abs=0.1)
+
+
+def test_goodness_of_fit_matches_scipy(samples):
+    values, groups = samples
+    fits = fit_groups(values, groups, 3, families=('norm', 'gamma'), method='mle')
+    for g in range(3):
+        sample = values[groups == g]
+        for family in ('norm', 'gamma'):
+            row = fits.loc[(g, family)]
+            args = (row['loc'], row['scale']) if family == 'norm' else (row['shape'], row['loc'], row['scale'])
+            ks = stats.kstest(sample, family, args=args)
+            assert row['ks_stat'] == pytest.approx(ks.statistic)
+            assert row['ks_pvalue'] == pytest.approx(ks.pvalue, abs=1e-9)
+            assert row['loglik'] == pytest.approx(getattr(stats, family).logpdf(sample, *args).sum())
+    assert fits.loc[(1, 'gamma'), 'aic'] < fits.loc[(1, 'norm'), 'aic']
+
+
+def test_degenerate_groups_give_nan_without_warnings(tmp_path):
+    # Group 0 has no spread, group 1 a single value, group 2 nothing.
+    values = np.array([3.0, 3.0, 3.0, 5.0, 1.0, 2.0, 4.0])
+    groups = np.array([0, 0, 0, 1, 3, 3, 3])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        fits = fit_groups(values, groups, 4, families=('norm', 'skewnorm', 'gamma'))
+        x = np.linspace(2, 4, 5)
+        for g in range(3):
+            for family in ('norm', 'skewnorm', 'gamma'):
+                assert np.isnan(pdf(fits, g, family, x)).all()
+        assert np.isfinite(pdf(fits, 3, 'norm', x)).all()
+        assert plot_fits(values, groups, fits, ['a', 'b', 'c', 'd'], 'x', output_path=str(tmp_path / 'fits.png'))
+    assert fits.loc[(0, 'norm'), 'scale'] == 0
+    assert fits.loc[(1, 'norm'), ['loc', 'scale']].isna().all()
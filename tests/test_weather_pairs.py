@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_stub import synthetic_hourly
+from weather_pairs import difference_cube, pair_index, pair_statistics, site_pair_statistics
+from weather_stats import assign_bins, bin_statistics, run_length_statistics, run_lengths, transition_matrix
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm', 'soil_temperature_7_to_28cm', 'soil_temperature_28_to_100cm']
+EDGES = [-1.5, 0, 1.5]
+RIGHT_CLOSED = [True, False, False]
+COLUMNS = ['count', 'mean', 'std', 'min', 'max']
+
+
+@pytest.fixture(scope='module')
+def frame():
+    times, values = synthetic_hourly(52.0, '2022-01-01', '2022-12-31', VARIABLES)
+    df = pd.DataFrame({'time': times.astype('datetime64[ns]'), **values})
+    df.loc[100:110, VARIABLES[1]] = np.nan
+    return df
+
+
+def test_difference_cube(frame):
+    cube = difference_cube(frame, VARIABLES)
+    for i, j in zip(*pair_index(VARIABLES)):
+        np.testing.assert_allclose(cube[:, i, j], frame[VARIABLES[j]] - frame[VARIABLES[i]])
+        np.testing.assert_allclose(cube[:, j, i], frame[VARIABLES[i]] - frame[VARIABLES[j]])
+
+
+def test_pairs_match_per_pair_statistics(frame):
+    before = frame.copy()
+    bins, runs, transitions = pair_statistics(frame, VARIABLES, EDGES, RIGHT_CLOSED)
+    pd.testing.assert_frame_equal(frame, before)
+    n_states = len(EDGES) + 1
+    for p, (i, j) in enumerate(zip(*pair_index(VARIABLES))):
+        rows = slice(p * n_states, (p + 1) * n_states)
+        assert bins.index[rows.start][:2] == (VARIABLES[i], VARIABLES[j])
+        diff = (frame[VARIABLES[j]] - frame[VARIABLES[i]]).to_numpy()
+        stats, _, _ = bin_statistics(diff, EDGES, RIGHT_CLOSED)
+        np.testing.assert_allclose(bins.iloc[rows][COLUMNS].to_numpy(float), stats[COLUMNS].to_numpy(float))
+        states = assign_bins(diff, EDGES, RIGHT_CLOSED)
+        _, lengths, values = run_lengths(states)
+        expected = run_length_statistics(lengths, values, n_states)
+        np.testing.assert_allclose(runs.iloc[rows].to_numpy(float), expected.to_numpy(float))
+        np.testing.assert_allclose(transitions[p], transition_matrix(states, n_states))
+
+
+def test_site_pair_statistics(frame):
+    bins, runs = site_pair_statistics({'a': frame, 'b': frame.head(500)}, VARIABLES[:2], [0])
+    single, _, _ = pair_statistics(frame.head(500), VARIABLES[:2], [0])
+    assert list(bins.index.get_level_values('site').unique()) == ['a', 'b']
+    pd.testing.assert_frame_equal(bins.loc['b'], single)
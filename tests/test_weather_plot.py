@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import weather
+from meteo_stub import synthetic_hourly
+from weather_plot import MAX_POINTS, downsample, lttb_indices, minmax_indices, render_figures
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm']
+
+
+@pytest.fixture(scope='module')
+def series():
+    times, values = synthetic_hourly(52.0, '2020-01-01', '2022-12-31', VARIABLES[:1])
+    return times.astype('datetime64[ns]'), values[VARIABLES[0]]
+
+
+@pytest.mark.parametrize('n_out', [3, 10, 500, 4999])
+def test_lttb_keeps_endpoints_and_budget(series, n_out):
+    x, y = series
+    keep = lttb_indices(x, y, n_out)
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_lttb_keeps_spikes(series):
+    x, y = series
+    y = y.copy()
+    y[1234], y[20000] = 80.0, -60.0
+    keep = lttb_indices(x, y, 200)
+    assert 1234 in keep and 20000 in keep
+
+
+def test_lttb_short_series_unchanged():
+    np.testing.assert_array_equal(lttb_indices(np.arange(5), np.arange(5.0), 10), np.arange(5))
+
+
+def test_lttb_skips_nan(series):
+    x, y = series
+    y = y.copy()
+    y[5000:5003] = np.nan
+    y[10000:12000] = np.nan
+    keep = lttb_indices(x, y, 300)
+    assert len(keep) == 300
+    # Every bucket with data picks a real value; gaps keep a NaN point to break the line.
+    assert np.isnan(y[keep]).sum() == np.count_nonzero((keep >= 10000) & (keep < 12000))
+    assert np.isnan(y[keep]).any()
+
+
+def test_minmax_keeps_extremes(series):
+    _, y = series
+    keep = minmax_indices(y, 100)
+    assert len(keep) <= 200
+    assert np.argmax(y) in keep and np.argmin(y) in keep
+    bucket = np.arange(len(y)) * 100 // len(y)
+    for b in range(100):
+        inside = keep[bucket[keep] == b]
+        assert y[inside].max() == y[bucket == b].max() and y[inside].min() == y[bucket == b].min()
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_budget(series, method):
+    x, y = series
+    dx, dy = downsample(x, y, 1000, method)
+    assert len(dx) <= 1000 and len(dx) == len(dy)
+    if method == 'lttb':
+        assert dx[0] == x[0] and dx[-1] == x[-1]
+    else:
+        assert dy.max() == y.max() and dy.min() == y.min()
+    full_x, full_y = downsample(x, y, None)
+    assert len(full_x) == len(x)
+    with pytest.raises(ValueError):
+        downsample(x, y, 1000, 'median')
+
+
+def test_plots_use_default_budget(series, tmp_path, monkeypatch):
+    x, y = series
+    df = pd.DataFrame({'time': x, VARIABLES[0]: y, VARIABLES[1]: y - 1})
+    drawn = []
+
+    def recording(x, y, max_points, method='lttb'):
+        result = downsample(x, y, max_points, method)
+        drawn.append(len(result[0]))
+        return result
+
+    monkeypatch.setattr(weather, 'downsample', recording)
+    weather.plot_temperature_data(df, VARIABLES, output_path=str(tmp_path / 'temperatures.png'))
+    weather.calculate_and_plot_graph_hourly_diffs(df, *VARIABLES, output_path=str(tmp_path / 'diffs.png'))
+    weather.plot_temperature_data(df.iloc[:100], VARIABLES, output_path=str(tmp_path / 'short.png'))
+    weather.plot_temperature_data(df, VARIABLES, output_path=str(tmp_path / 'full.png'), max_points=None)
+    assert drawn == [MAX_POINTS] * 3 + [100, 100] + [len(df)] * 2
+    assert all(os.path.getsize(tmp_path / name) > 0 for name in ('temperatures.png', 'diffs.png', 'short.png', 'full.png'))
+
+
+def test_render_figures(series, tmp_path):
+    x, y = series
+    df = pd.DataFrame({'time': x[:2000], VARIABLES[0]: y[:2000], VARIABLES[1]: y[:2000] - 1})
+    paths = [str(tmp_path / f'{i}.svg') for i in range(3)]
+    jobs = [(weather.plot_temperature_data, (df, VARIABLES), {'output_path': path}) for path in paths]
+    assert render_figures(jobs, processes=2) == paths
+    assert all(os.path.getsize(path) > 0 for path in paths)
+    with pytest.raises(ValueError):
+        render_figures([(weather.plot_temperature_data, (df, VARIABLES), {})])
@@ -0,0 +1,104 @@
+import json
+import threading
+
+import pandas as pd
+
+import weather_profile
+from weather_profile import Profiler, profiled, profiling, stage
+
+
+@profiled()
+def _double(df):
+    return pd.concat([df, df])
+
+
+@profiled('custom.name')
+def _total(df):
+    return df['x'].sum()
+
+
+def test_disabled_stage_gives_a_fresh_dict():
+    assert weather_profile.active() is None
+    with stage('a') as first:
+        first['rows'] = 10
+    with stage('b') as second:
+        assert second == {}
+    assert first is not second
+
+
+def test_stage_records_fields_and_nesting():
+    profiler = Profiler()
+    with profiler.stage('outer', rows=3) as outer:
+        outer['bytes'] = 12
+        with profiler.stage('inner'):
+            pass
+    inner, outer = profiler.records
+    assert (inner['name'], inner['depth']) == ('inner', 1)
+    assert (outer['name'], outer['depth'], outer['rows'], outer['bytes']) == ('outer', 0, 3, 12)
+    assert outer['start_ns'] <= inner['start_ns']
+    assert outer['duration_ns'] >= inner['duration_ns']
+    assert inner['thread'] == outer['thread'] == threading.get_ident()
+
+
+def test_stage_is_recorded_when_the_block_raises():
+    profiler = Profiler()
+    try:
+        with profiler.stage('failing'):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert [record['name'] for record in profiler.records] == ['failing']
+
+
+def test_track_allocations():
+    with profiling(track_allocations=True) as profiler:
+        with stage('outer'):
+            with stage('alloc'):
+                kept = bytearray(1_000_000)
+            del kept
+    alloc, outer = profiler.records
+    assert alloc['alloc_bytes'] >= 1_000_000 and alloc['peak_bytes'] >= 1_000_000
+    # The inner peak counts towards the outer stage even though it was freed.
+    assert outer['peak_bytes'] >= 1_000_000 and outer['alloc_bytes'] < 1_000_000
+
+
+def test_profiling_enables_and_disables():
+    with profiling() as profiler:
+        assert weather_profile.active() is profiler
+        with stage('on'):
+            pass
+    assert weather_profile.active() is None
+    with stage('off'):
+        pass
+    assert [record['name'] for record in profiler.records] == ['on']
+
+
+def test_profiled_counts_rows():
+    df = pd.DataFrame({'x': [1.0, 2.0, 3.0]})
+    assert _total(df) == 6.0
+    with profiling() as profiler:
+        assert len(_double(df)) == 6
+        assert _total(df) == 6.0
+    double, total = profiler.records
+    assert double['name'] == f'{__name__}._double' and double['rows'] == 6
+    assert total['name'] == 'custom.name' and total['rows'] == 3
+    assert _double.__name__ == '_double'
+
+
+def test_summary_and_chrome_trace(tmp_path):
+    with profiling() as profiler:
+        for rows in (2, 5):
+            with stage('load.part', rows=rows):
+                pass
+        with stage('plot'):
+            pass
+    summary = profiler.summary()
+    assert summary.loc['load.part', 'calls'] == 2 and summary.loc['load.part', 'rows'] == 7
+    assert summary.loc['plot', 'calls'] == 1
+    assert Profiler().summary().empty
+
+    path = profiler.write_chrome_trace(str(tmp_path / 'trace.json'))
+    with open(path) as f:
+        events = json.load(f)['traceEvents']
+    assert [event['name'] for event in events] == ['load.part', 'load.part', 'plot']
+    assert events[0]['cat'] == 'load' and events[0]['ph'] == 'X' and events[0]['args'] == {'rows': 2}
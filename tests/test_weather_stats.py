@@ -0,0 +1,190 @@
+import statistics
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+
+matplotlib.use('Agg')
+
+import weather
+from weather_stats import assign_bins, bin_labels, bin_statistics, run_length_statistics, run_lengths, transition_matrix
+
+# The if/elif chains of the original grouped functions, highest group first.
+OLD_GROUPS = {
+    'calculate_and_print_hourly_diffs_grouped': ('°C', [
+        ("Above or Equal to 0 °C", lambda d: d >= 0),
+        ("Below 0 °C", lambda d: d < 0),
+    ]),
+    'calculate_and_print_hourly_diffs_3grouped': ('', [
+        ("Above or Equal to 1.5 °C", lambda d: d >= 1.5),
+        ("Between 1.5 and -1.5 °C", lambda d: -1.5 < d < 1.5),
+        ("Below or Equal to -1.5 °C", lambda d: d <= -1.5),
+    ]),
+    'calculate_and_print_hourly_diffs_4grouped': ('', [
+        ("Above or Equal to 1.5 °C", lambda d: d >= 1.5),
+        ("Between equal 0 and -1.50 °C", lambda d: 0 <= d < 1.5),
+        ("Between -1.5 and 0 °C", lambda d: -1.5 < d < 0),
+        ("Below or Equal to -1.5 °C", lambda d: d <= -1.5),
+    ]),
+}
+EDGES = {
+    'calculate_and_print_hourly_diffs_grouped': ([0], [False]),
+    'calculate_and_print_hourly_diffs_3grouped': ([-1.5, 1.5], [True, False]),
+    'calculate_and_print_hourly_diffs_4grouped': ([-1.5, 0, 1.5], [True, False, False]),
+}
+
+
+@pytest.fixture
+def diffs():
+    # Half-degree steps, so plenty of values sit exactly on the edges.
+    rng = np.random.default_rng(7)
+    values = np.round(rng.normal(0, 2, 2000) * 2) / 2
+    values[::97] = np.nan
+    return values
+
+
+def _old_output(values, name, var1='air', var2='soil'):
+    unit, groups = OLD_GROUPS[name]
+    lines = [f"Hourly Temperature Differences {var1} and {var2} (Grouped):"]
+    for heading, condition in groups:
+        group = [d for d in values if condition(d)]
+        if group:
+            lines += ["", f"{heading}:", f"Mean: {sum(group) / len(group):.2f} {unit}", f"Standard Deviation: {statistics.stdev(group):.2f} {unit}"]
+    return lines
+
+
+def test_assign_bins():
+    values = [-2.0, -1.5, 0.0, 0.7, 1.5, np.nan, 3.0]
+    np.testing.assert_array_equal(assign_bins(values, [0]), [0, 0, 1, 1, 1, -1, 1])
+    np.testing.assert_array_equal(assign_bins(values, [-1.5, 1.5]), [0, 1, 1, 1, 2, -1, 2])
+    np.testing.assert_array_equal(assign_bins(values, [-1.5, 1.5], right_closed=[True, False]), [0, 0, 1, 1, 2, -1, 2])
+    np.testing.assert_array_equal(assign_bins(values, [-1.5, 0, 1.5], right_closed=[True, True, True]), [0, 0, 1, 2, 2, -1, 3])
+    assert assign_bins([], [0]).shape == (0,)
+
+
+def test_bin_labels():
+    assert bin_labels([0]) == ['< 0', '>= 0']
+    assert bin_labels([-1.5, 1.5], [True, False]) == ['<= -1.5', '(-1.5, 1.5)', '>= 1.5']
+    assert bin_labels([-1.5, 0, 1.5], [True, False, True]) == ['<= -1.5', '(-1.5, 0)', '[0, 1.5]', '> 1.5']
+
+
+@pytest.mark.parametrize('name', list(OLD_GROUPS))
+def test_bin_statistics_match_the_old_groups(diffs, name):
+    edges, right_closed = EDGES[name]
+    stats, hist_counts, hist_edges = bin_statistics(diffs, edges, right_closed)
+    # Lowest bin first, where the old groups were listed highest first.
+    for i, (_, condition) in enumerate(reversed(OLD_GROUPS[name][1])):
+        group = np.array([d for d in diffs if condition(d)])
+        assert stats.at[i, 'count'] == len(group)
+        assert stats.at[i, 'mean'] == pytest.approx(group.mean())
+        assert stats.at[i, 'std'] == pytest.approx(statistics.stdev(group))
+        assert (stats.at[i, 'min'], stats.at[i, 'max']) == (group.min(), group.max())
+        counts, bucket_edges = np.histogram(group, bins=10)
+        np.testing.assert_array_equal(hist_counts[i], counts)
+        np.testing.assert_allclose(hist_edges[i], bucket_edges)
+    assert stats['count'].sum() == np.count_nonzero(~np.isnan(diffs))
+
+
+def test_bin_statistics_empty_and_flat_bins():
+    stats, hist_counts, hist_edges = bin_statistics([2.0, 2.0, 2.0, np.nan], [-1.5, 1.5])
+    assert stats['count'].tolist() == [0, 0, 3]
+    assert stats.loc[:1, 'mean'].isna().all()
+    # A bin without spread gets plt.hist's range of one around its value.
+    np.testing.assert_allclose(hist_edges[2, [0, -1]], [1.5, 2.5])
+    assert hist_counts[2].sum() == 3
+
+
+@pytest.mark.parametrize('name', list(OLD_GROUPS))
+def test_grouped_output_matches_the_old_loops(diffs, capsys, name):
+    df = pd.DataFrame({'time': pd.date_range('2024-01-01', periods=len(diffs), freq='h'), 'air': 0.0, 'soil': diffs})
+    getattr(weather, name)(df, 'air', 'soil')
+    printed = capsys.readouterr().out.splitlines()
+    assert printed == _old_output(diffs, name)
+
+
+def _old_runs(states):
+    """The grouping loop of the original find_Hmm_2group: (state, length) of every run."""
+    groups, current = [], [states[0]]
+    for value in states[1:]:
+        if value == current[-1]:
+            current.append(value)
+        else:
+            groups.append(current)
+            current = [value]
+    groups.append(current)
+    return [(group[0], len(group)) for group in groups]
+
+
+def test_run_lengths():
+    starts, lengths, values = run_lengths([1, 1, 0, 0, 0, 2, 1, 1])
+    assert starts.tolist() == [0, 2, 5, 6]
+    assert lengths.tolist() == [2, 3, 1, 2]
+    assert values.tolist() == [1, 0, 2, 1]
+    starts, lengths, values = run_lengths([])
+    assert len(starts) == len(lengths) == len(values) == 0
+
+
+def test_run_length_statistics_skip_missing_runs():
+    _, lengths, values = run_lengths([0, 0, -1, 0, 1, 1, 1, -1, -1, 0, 0, 0])
+    stats = run_length_statistics(lengths, values, 3)
+    assert stats['runs'].tolist() == [3, 1, 0]
+    assert stats.at[0, 'mean'] == 2 and stats.at[0, 'std'] == pytest.approx(statistics.stdev([2, 1, 3]))
+    assert (stats.at[0, 'min'], stats.at[0, 'max']) == (1, 3)
+    assert stats.at[1, 'mean'] == 3 and np.isnan(stats.at[1, 'std'])
+    assert stats.loc[2, ['mean', 'std', 'min', 'max']].isna().all()
+
+
+def test_transition_matrix():
+    states = [0, 0, 1, -1, 1, 2, 2, 0]
+    counts = transition_matrix(states, 3, normalize=False)
+    np.testing.assert_array_equal(counts, [[1, 1, 0], [0, 0, 1], [1, 0, 1]])
+    np.testing.assert_allclose(transition_matrix(states, 3), [[0.5, 0.5, 0], [0, 0, 1], [0.5, 0, 0.5]])
+    # A state that is never left has a row of zeros.
+    np.testing.assert_array_equal(transition_matrix([0, 0, 1], 3)[1:], np.zeros((2, 3)))
+
+
+@pytest.mark.parametrize('edges, right_closed, conditions', [
+    ([1], None, [lambda d: d < 1, lambda d: d >= 1]),
+    ([-1.5, 1.5], [True, False], [lambda d: d <= -1.5, lambda d: -1.5 < d < 1.5, lambda d: d >= 1.5]),
+    ([-1.5, 0, 1.5], [True, False, False], [lambda d: d <= -1.5, lambda d: -1.5 < d < 0, lambda d: 0 <= d < 1.5, lambda d: d >= 1.5]),
+])
+def test_find_Hmm_groups_match_the_old_loop(diffs, capsys, edges, right_closed, conditions):
+    diffs = diffs[~np.isnan(diffs)]
+    time = pd.date_range('2024-01-01', periods=len(diffs), freq='h')
+    df = pd.DataFrame({'time': time, 'air': 0.0, 'soil': diffs})
+    runs, stats, transitions = weather.find_Hmm_groups(df, 'air', 'soil', edges, right_closed, plot=False)
+
+    states = [next(s for s, condition in enumerate(conditions) if condition(d)) for d in diffs]
+    old = _old_runs(states)
+    assert list(zip(runs['state'], runs['length'])) == old
+    assert runs['start'].tolist() == time[np.r_[0, np.cumsum([length for _, length in old])[:-1]]].tolist()
+    printed = capsys.readouterr().out.splitlines()
+    n_states = len(edges) + 1
+    for state in range(n_states):
+        lengths = [length for s, length in old if s == state]
+        assert stats.at[state, 'runs'] == len(lengths)
+        assert stats.at[state, 'mean'] == pytest.approx(sum(lengths) / len(lengths))
+        assert stats.at[state, 'std'] == pytest.approx(statistics.stdev(lengths))
+        mean_line = printed[n_states - 1 - state]
+        std_line = printed[2 * n_states - 1 - state]
+        assert mean_line.startswith(f"Mean Group {state} Lengths: ")
+        assert float(mean_line.split(': ')[1]) == pytest.approx(sum(lengths) / len(lengths))
+        assert std_line.startswith(f"Standard Deviation Group {state} Lengths: ")
+        assert float(std_line.split(': ')[1]) == pytest.approx(statistics.stdev(lengths))
+    expected = np.zeros((n_states, n_states))
+    np.add.at(expected, (states[:-1], states[1:]), 1)
+    np.testing.assert_allclose(transitions, expected / expected.sum(axis=1, keepdims=True))
+
+
+def test_find_Hmm_groups_nan_breaks_runs(capsys):
+    df = pd.DataFrame({
+        'time': pd.date_range('2024-01-01', periods=7, freq='h'),
+        'air': 0.0,
+        'soil': [2.0, 2.0, np.nan, 2.0, 0.0, 0.0, 3.0],
+    })
+    runs, stats, _ = weather.find_Hmm_groups(df, 'air', 'soil', [1], plot=False)
+    assert list(zip(runs['state'], runs['length'])) == [(1, 2), (-1, 1), (1, 1), (0, 2), (1, 1)]
+    assert stats['runs'].tolist() == [1, 3]
+    assert weather.find_Hmm_groups(df.iloc[:0], 'air', 'soil', [1], plot=False) is None
+    assert capsys.readouterr().out.endswith("Empty binary list.\n")
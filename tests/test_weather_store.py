@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from meteo_stub import synthetic_hourly
+from weather_store import list_partitions, location_dir, read_series, write_series
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm']
+LAT, LON = 47.37, 8.54
+
+
+def _frame(start_date, end_date, variables=VARIABLES):
+    times, values = synthetic_hourly(LAT, start_date, end_date, variables)
+    return pd.DataFrame({'time': times.astype('datetime64[ns]'), **values})
+
+
+def _expected(df, variables=VARIABLES):
+    return df[['time'] + variables].astype({var: np.float32 for var in variables}).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_round_trip_is_float32_and_monthly(tmp_path, fmt):
+    df = _frame('2024-01-20', '2024-03-05')
+    df['temperature_2m_diff_to_soil'] = 1.0
+    written = write_series(str(tmp_path), LAT, LON, df, VARIABLES, fmt)
+    assert [os.path.basename(path) for path in written] == [f'2024-0{m}.{fmt}' for m in (1, 2, 3)]
+    assert [month for month, _ in list_partitions(str(tmp_path), LAT, LON)] == ['2024-01', '2024-02', '2024-03']
+
+    back = read_series(str(tmp_path), LAT, LON)
+    assert back['time'].dtype == np.dtype('datetime64[ns]')
+    assert (back[VARIABLES].dtypes == np.float32).all()
+    assert 'temperature_2m_diff_to_soil' not in back.columns
+    pd.testing.assert_frame_equal(back, _expected(df))
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_read_window_and_columns(tmp_path, fmt):
+    df = _frame('2024-01-20', '2024-03-05')
+    write_series(str(tmp_path), LAT, LON, df, VARIABLES, fmt)
+    window = read_series(str(tmp_path), LAT, LON, start='2024-02-10', end='2024-02-12', columns=VARIABLES[1:])
+    assert list(window.columns) == ['time'] + VARIABLES[1:]
+    inside = (df['time'] >= '2024-02-10') & (df['time'] < '2024-02-12')
+    pd.testing.assert_frame_equal(window, _expected(df[inside], VARIABLES[1:]))
+    assert read_series(str(tmp_path), LAT, LON, start='2025-01-01') is None
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_overlapping_writes_merge(tmp_path, fmt):
+    first = _frame('2024-01-01', '2024-01-10')
+    write_series(str(tmp_path), LAT, LON, first, VARIABLES, fmt)
+    # Overlaps the last five days, with new values for one variable only.
+    second = _frame('2024-01-06', '2024-01-15', VARIABLES[:1])
+    second[VARIABLES[0]] += 100
+    write_series(str(tmp_path), LAT, LON, second, VARIABLES[:1], fmt)
+
+    back = read_series(str(tmp_path), LAT, LON)
+    assert len(back) == 15 * 24 and back['time'].is_unique
+    new = back['time'] >= '2024-01-06'
+    np.testing.assert_allclose(back.loc[new, VARIABLES[0]], second[VARIABLES[0]].astype(np.float32))
+    np.testing.assert_allclose(back.loc[~new, VARIABLES[0]], first[VARIABLES[0]].iloc[:5 * 24].astype(np.float32))
+    # The other variable keeps its stored hours and is NaN where it was never written.
+    np.testing.assert_allclose(back[VARIABLES[1]].iloc[:10 * 24], first[VARIABLES[1]].astype(np.float32))
+    assert back[VARIABLES[1]].iloc[10 * 24:].isna().all()
+
+
+def test_partitions_with_different_variables(tmp_path):
+    write_series(str(tmp_path), LAT, LON, _frame('2024-01-30', '2024-01-31'), VARIABLES, 'feather')
+    write_series(str(tmp_path), LAT, LON, _frame('2024-02-01', '2024-02-02', VARIABLES[:1]), VARIABLES[:1])
+    back = read_series(str(tmp_path), LAT, LON, columns=VARIABLES)
+    assert list(back.columns) == ['time'] + VARIABLES and len(back) == 4 * 24
+    assert back[VARIABLES[1]].iloc[48:].isna().all() and back[VARIABLES[1]].iloc[:48].notna().all()
+
+
+def test_switching_format_keeps_one_partition_per_month(tmp_path):
+    df = _frame('2024-01-01', '2024-01-31')
+    write_series(str(tmp_path), LAT, LON, df, VARIABLES, 'feather')
+    write_series(str(tmp_path), LAT, LON, df.iloc[:24], VARIABLES, 'parquet')
+    assert sorted(os.listdir(location_dir(str(tmp_path), LAT, LON))) == ['2024-01.parquet']
+    pd.testing.assert_frame_equal(read_series(str(tmp_path), LAT, LON), _expected(df))
+
+
+def test_month_in_both_formats_is_read_once(tmp_path):
+    # A store written before write_series removed the other format.
+    df = _frame('2024-01-01', '2024-01-05')
+    newer = df.assign(**{VARIABLES[0]: df[VARIABLES[0]] + 1})
+    write_series(str(tmp_path / 'a'), LAT, LON, df, VARIABLES, 'parquet')
+    write_series(str(tmp_path / 'b'), LAT, LON, newer, VARIABLES, 'feather')
+    directory = location_dir(str(tmp_path), LAT, LON)
+    os.makedirs(directory)
+    for name in ('a', 'b'):
+        for file in os.listdir(location_dir(str(tmp_path / name), LAT, LON)):
+            os.replace(os.path.join(location_dir(str(tmp_path / name), LAT, LON), file), os.path.join(directory, file))
+    os.utime(os.path.join(directory, '2024-01.parquet'), (1, 1))
+    assert list_partitions(str(tmp_path), LAT, LON) == [('2024-01', os.path.join(directory, '2024-01.feather'))]
+    pd.testing.assert_frame_equal(read_series(str(tmp_path), LAT, LON), _expected(newer))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_stub import synthetic_hourly
+from weather_stats import assign_bins, bin_statistics, run_length_statistics, run_lengths, transition_matrix
+from weather_stream import HourlyDiffAccumulator
+
+VARIABLES = ['temperature_2m', 'soil_temperature_0_to_7cm']
+EDGES = [-1.5, 0, 1.5]
+RIGHT_CLOSED = [True, False, False]
+
+
+@pytest.fixture(scope='module')
+def frame():
+    times, values = synthetic_hourly(52.5, '2023-01-01', '2023-03-31', VARIABLES)
+    df = pd.DataFrame({'time': times.astype('datetime64[ns]'), **values})
+    # Missing hours break runs and must be skipped like in the batch functions.
+    df.loc[100:130, VARIABLES[1]] = np.nan
+    df.loc[700, VARIABLES[0]] = np.nan
+    return df
+
+
+def _batch(df):
+    diff = (df[VARIABLES[1]] - df[VARIABLES[0]]).to_numpy()
+    stats, _, _ = bin_statistics(diff, EDGES, RIGHT_CLOSED)
+    states = assign_bins(diff, EDGES, RIGHT_CLOSED)
+    _, lengths, values = run_lengths(states)
+    n_states = len(EDGES) + 1
+    return stats, run_length_statistics(lengths, values, n_states), transition_matrix(states, n_states)
+
+
+def _assert_matches(accumulator, df):
+    stats, runs, transitions = _batch(df)
+    pd.testing.assert_frame_equal(accumulator.bin_statistics(), stats, check_dtype=False, atol=1e-9)
+    pd.testing.assert_frame_equal(accumulator.run_statistics(), runs, check_dtype=False, atol=1e-9)
+    np.testing.assert_allclose(accumulator.transition_matrix(), transitions)
+
+
+@pytest.mark.parametrize('cuts', [
+    [],
+    [1, 2, 3],
+    [24 * k for k in range(1, 90)],
+    [5, 101, 102, 131, 699, 700, 701, 2000],
+])
+def test_chunked_updates_match_batch(frame, cuts):
+    accumulator = HourlyDiffAccumulator(*VARIABLES, EDGES, RIGHT_CLOSED)
+    bounds = [0, *cuts, len(frame)]
+    for start, end in zip(bounds, bounds[1:]):
+        accumulator.update(frame.iloc[start:end])
+    _assert_matches(accumulator, frame)
+
+
+def test_merged_segments_match_batch(frame):
+    bounds = [0, 400, 401, 1500, len(frame)]
+    segments = [HourlyDiffAccumulator(*VARIABLES, EDGES, RIGHT_CLOSED).update(frame.iloc[a:b]) for a, b in zip(bounds, bounds[1:])]
+    merged = segments[0]
+    for segment in segments[1:]:
+        merged.merge(segment)
+    _assert_matches(merged, frame)
+
+
+def test_histogram_counts_every_value(frame):
+    accumulator = HourlyDiffAccumulator(*VARIABLES, EDGES, RIGHT_CLOSED)
+    accumulator.update(frame.iloc[:1000]).update(frame.iloc[1000:])
+    histogram = accumulator.histogram
+    totals = histogram.counts.sum(axis=1) + histogram.underflow + histogram.overflow
+    np.testing.assert_array_equal(totals, accumulator.bin_statistics()['count'])
+
+
+def test_input_frame_is_not_modified(frame):
+    before = frame.copy()
+    HourlyDiffAccumulator(*VARIABLES, EDGES, RIGHT_CLOSED).update(frame)
+    pd.testing.assert_frame_equal(frame, before)
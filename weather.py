@@ -1,13 +1,230 @@
 
+import json
+import re
 import requests
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import statistics
 import numpy as np
-from scipy.stats import norm
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from weather_fit import fit_groups, plot_fits
+from weather_profile import profiled, stage
+from weather_plot import MARKER_LIMIT, MAX_POINTS, configure_time_axis, downsample, finish_figure, new_figure
+from weather_stats import assign_bins, bin_statistics, run_lengths, run_length_statistics, transition_matrix
 
-def fetch_meteo_data(latitude, longitude, start_date, end_date, temperature_variables):
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+def _decode_json(body, temperature_variables):
+    """
+    Compatibility decode: the full JSON document through Python lists, times parsed from the ISO strings.
+
+    Raises:
+        requests.exceptions.JSONDecodeError: If the body is not valid JSON, as response.json() does.
+    """
+    with stage('fetch.json'):
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos)
+    with stage('fetch.dataframe') as record:
+        time_data = data['hourly']['time']
+        df = pd.DataFrame({'time': time_data})
+        for var in temperature_variables:
+            df[var] = data['hourly'][var]
+        # Same resolution as the fast decode, whatever pandas infers from the strings.
+        df['time'] = pd.to_datetime(df['time']).astype('datetime64[ns]')
+        record['rows'] = len(df)
+    return df
+
+def _array_segment(body, key, offset):
+    """Returns the bytes between the brackets of the JSON array stored under key, searching from offset."""
+    match = re.compile(rb'"' + re.escape(key.encode()) + rb'"\s*:\s*\[').search(body, offset)
+    if match is None:
+        raise KeyError(key)
+    end = body.index(b']', match.end())
+    return body[match.end():end]
+
+def _decode_hourly(body, temperature_variables, dtype=np.float64):
+    """
+    Decodes an archive response straight into NumPy arrays.
+
+    Each variable's array is cut out of the raw bytes and parsed in one
+    np.fromstring call, with null read as NaN. The time axis is built from
+    the first timestamp and the number of values; if the last timestamp does
+    not match an hourly step, None is returned so the caller can fall back to
+    the compatibility decode.
+
+    Returns:
+        tuple: (times, columns) with datetime64[ns] times and one array per
+        variable, or None.
+
+    Raises:
+        KeyError: If the response has no hourly block or lacks a variable.
+        ValueError: If an array is truncated or holds something other than numbers and null.
+    """
+    hourly = body.find(b'"hourly"')
+    if hourly < 0:
+        raise KeyError('hourly')
+    time_segment = _array_segment(body, 'time', hourly)
+    count = time_segment.count(b',') + 1 if time_segment.strip() else 0
+    if count == 0:
+        return np.empty(0, dtype='datetime64[ns]'), {var: np.empty(0, dtype=dtype) for var in temperature_variables}
+    first = time_segment[:time_segment.index(b',') if count > 1 else len(time_segment)].strip().strip(b'"')
+    last = time_segment[time_segment.rfind(b',') + 1:].strip().strip(b'"')
+    start = np.datetime64(first.decode(), 'ns')
+    times = start + np.arange(count) * np.timedelta64(1, 'h')
+    if times[-1] != np.datetime64(last.decode(), 'ns'):
+        return None
+
+    columns = {}
+    for var in temperature_variables:
+        segment = _array_segment(body, var, hourly)
+        values = np.fromstring(segment.replace(b'null', b'nan'), dtype=dtype, sep=',') if segment.strip() else np.empty(0, dtype=dtype)
+        if len(values) != count:
+            return None
+        columns[var] = values
+    return times, columns
+
+def _convert_columns(df, temperature_variables, dtype=np.float64, nullable=False):
+    """Casts the temperature columns to dtype, or to the matching nullable pandas dtype with NaN as missing."""
+    for var in temperature_variables:
+        values = df[var].to_numpy(dtype=dtype, na_value=np.nan)
+        # float32 -> Float32, float64 -> Float64
+        df[var] = pd.array(values, dtype=values.dtype.name.capitalize()) if nullable else values
+    return df
+
+def _request_hourly(latitude, longitude, start_date, end_date, temperature_variables, session=None, base_url=ARCHIVE_URL, dtype=np.float64, nullable=False, compat=False):
+    """
+    Requests one date range from the Open-Meteo archive API.
+
+    A requests.Session can be passed to reuse pooled connections, and base_url
+    can point at a stub server. The response is decoded with _decode_hourly
+    unless compat is set or the fast decode cannot handle it; dtype and
+    nullable are applied to the temperature columns on both paths.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails.
+        KeyError: If the response does not contain the requested variables.
+    """
+    variables_string = ",".join(temperature_variables)
+    #url = f"https://api.open-meteo.com/v1/archive?latitude={latitude}&longitude={longitude}&hourly={variables_string}&start_date={start_date}&end_date={end_date}"
+    url = f"{base_url}?latitude={latitude}&longitude={longitude}&start_date={start_date}&end_date={end_date}&hourly={variables_string}"
+
+    with stage('fetch.http') as record:
+        response = (session or requests).get(url)
+        response.raise_for_status()
+        body = response.content
+        record['bytes'] = len(body)
+
+    decoded = None
+    if not compat:
+        with stage('fetch.decode') as record:
+            try:
+                decoded = _decode_hourly(body, temperature_variables, dtype)
+            except ValueError:
+                # Malformed arrays: the compatibility decode either reads them or reports the error.
+                decoded = None
+            record['rows'] = 0 if decoded is None else len(decoded[0])
+    if decoded is None:
+        df = _decode_json(body, temperature_variables)
+    else:
+        times, columns = decoded
+        df = pd.DataFrame({'time': times, **columns}, copy=False)
+    if (compat and dtype == np.float64 or decoded is not None) and not nullable:
+        return df
+    return _convert_columns(df, temperature_variables, dtype, nullable)
+
+def _split_date_range(start_date, end_date, chunk_days):
+    """
+    Splits an inclusive date range into consecutive ranges of at most chunk_days days.
+
+    Returns:
+        list: (start_date, end_date) string pairs in time order.
+    """
+    start = np.datetime64(start_date, 'D')
+    end = np.datetime64(end_date, 'D')
+    chunk_starts = np.arange(start, end + 1, chunk_days)
+    chunk_ends = np.minimum(chunk_starts + (chunk_days - 1), end)
+    return [(str(s), str(e)) for s, e in zip(chunk_starts, chunk_ends)]
+
+def _stitch_chunks(frames):
+    """Concatenates chunk DataFrames in time order, dropping hours repeated at chunk boundaries."""
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values('time', kind='stable').drop_duplicates(subset='time', keep='last')
+    return df.reset_index(drop=True)
+
+def _request_chunked(latitude, longitude, start_date, end_date, temperature_variables, session=None, base_url=ARCHIVE_URL, chunk_days=None, max_workers=4, on_chunk=None, decode=None):
+    """
+    Requests a date range as concurrent chunks of chunk_days days.
+
+    on_chunk is called with every chunk DataFrame as soon as it arrives. If a
+    chunk fails, the remaining chunks still finish before the first error is
+    raised, so on_chunk has seen every chunk that did complete. decode holds
+    keyword arguments for _request_hourly (dtype, nullable, compat).
+    """
+    decode = decode or {}
+    if not chunk_days:
+        df = _request_hourly(latitude, longitude, start_date, end_date, temperature_variables, session, base_url, **decode)
+        if on_chunk is not None:
+            on_chunk(df)
+        return df
+
+    chunks = _split_date_range(start_date, end_date, chunk_days)
+    frames = [None] * len(chunks)
+    error = None
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        futures = {
+            executor.submit(_request_hourly, latitude, longitude, chunk_start, chunk_end, temperature_variables, session, base_url, **decode): i
+            for i, (chunk_start, chunk_end) in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            try:
+                frames[futures[future]] = future.result()
+            except (requests.exceptions.RequestException, KeyError) as e:
+                error = error or e
+                continue
+            if on_chunk is not None:
+                on_chunk(frames[futures[future]])
+    if error is not None:
+        raise error
+    return _stitch_chunks(frames)
+
+def _fetch_hourly(latitude, longitude, start_date, end_date, temperature_variables, cache=None, session=None, base_url=ARCHIVE_URL, chunk_days=None, max_workers=4, decode=None):
+    """
+    Fetches a date range, going through the cache when one is given.
+
+    With a cache every completed chunk is stored straight away, so after a
+    failure the next call only requests the chunks that are still missing.
+    If requesting the missing days fails but the cache holds some of the
+    range, the cached hours are returned with the rest left as NaN and the
+    error message stored in df.attrs['fetch_error'], so offline partial
+    results can be told apart from complete ones.
+    Raises the same exceptions as _request_hourly.
+    """
+    if cache is None:
+        return _request_chunked(latitude, longitude, start_date, end_date, temperature_variables, session, base_url, chunk_days, max_workers, decode=decode)
+
+    def store(chunk_df):
+        cache.store(latitude, longitude, chunk_df, temperature_variables)
+
+    error = None
+    for gap_start, gap_end in cache.missing_ranges(latitude, longitude, temperature_variables, start_date, end_date):
+        try:
+            _request_chunked(latitude, longitude, gap_start, gap_end, temperature_variables, session, base_url, chunk_days, max_workers, on_chunk=store, decode=decode)
+        except (requests.exceptions.RequestException, KeyError) as e:
+            error = error or e
+    df = cache.load(latitude, longitude, start_date, end_date, temperature_variables)
+    if error is not None:
+        if df[temperature_variables].isna().all().all():
+            raise error
+        print(f"Error fetching data: {error}; returning cached hours only")
+    decode = decode or {}
+    if decode.get('dtype', np.float64) != np.float64 or decode.get('nullable'):
+        df = _convert_columns(df, temperature_variables, decode.get('dtype', np.float64), decode.get('nullable', False))
+    if error is not None:
+        df.attrs['fetch_error'] = str(error)
+    return df
+
+@profiled()
+def fetch_meteo_data(latitude, longitude, start_date, end_date, temperature_variables, cache=None, session=None, base_url=ARCHIVE_URL, chunk_days=None, max_workers=4, dtype=np.float64, nullable=False, compat=False):
     """
     Fetches temperature data from the Open-Meteo API.
 
@@ -17,24 +234,30 @@ def fetch_meteo_data(latitude, longitude, start_date, end_date, temperature_vari
         start_date (str): Start date in 'YYYY-MM-DD' format.
         end_date (str): End date in 'YYYY-MM-DD' format.
         temperature_variables (list): List of temperature variable names.
+        cache (weather_cache.MeteoCache, optional): On-disk cache. Only the days it
+            does not already hold are requested, so a fully cached range is served
+            without touching the network.
+        session (requests.Session, optional): Session used to reuse pooled connections.
+        base_url (str, optional): Archive endpoint, e.g. a local stub server.
+        chunk_days (int, optional): Split the range into chunks of this many days
+            and download them concurrently. Combined with a cache, a failed
+            download resumes from the chunks that already completed.
+        max_workers (int): Maximum number of chunks downloaded at once.
+        dtype (numpy dtype): Temperature column type, e.g. np.float32 to halve memory.
+        nullable (bool): Use the nullable pandas Float64/Float32 dtype, with
+            missing hours as <NA> instead of NaN.
+        compat (bool): Decode through response.json() and pd.to_datetime as
+            before, instead of parsing the raw response into NumPy arrays.
 
     Returns:
         pandas.DataFrame: DataFrame containing time and temperature data, or None on error.
+        When a cache is given and the request fails after part of the range was
+        cached, the cached hours are returned with the rest as NaN and the
+        error message in df.attrs['fetch_error']; complete results have no such key.
     """
-    variables_string = ",".join(temperature_variables)
-    #url = f"https://api.open-meteo.com/v1/archive?latitude={latitude}&longitude={longitude}&hourly={variables_string}&start_date={start_date}&end_date={end_date}"
-    url = f"https://archive-api.open-meteo.com/v1/archive?latitude={latitude}&longitude={longitude}&start_date={start_date}&end_date={end_date}&hourly={variables_string}"
-
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        time_data = data['hourly']['time']
-        df = pd.DataFrame({'time': time_data})
-        for var in temperature_variables:
-            df[var] = data['hourly'][var]
-        df['time'] = pd.to_datetime(df['time'])
-        return df
+        decode = {'dtype': dtype, 'nullable': nullable, 'compat': compat}
+        return _fetch_hourly(latitude, longitude, start_date, end_date, temperature_variables, cache, session, base_url, chunk_days, max_workers, decode)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data: {e}")
         return None
@@ -42,36 +265,41 @@ def fetch_meteo_data(latitude, longitude, start_date, end_date, temperature_vari
         print(f"Error processing data: {e}")
         return None
 
-def plot_temperature_data(df, temperature_variables):
+@profiled()
+def plot_temperature_data(df, temperature_variables, output_path=None, max_points=MAX_POINTS):
     """
     Plots temperature data from a DataFrame.
 
     Args:
         df (pandas.DataFrame): DataFrame containing time and temperature data.
         temperature_variables (list): List of temperature variable names.
+        output_path (str, optional): Write the figure to this PNG/SVG file through
+            the Agg backend instead of showing it.
+        max_points (int, optional): Downsample each series to this many points
+            with LTTB before drawing; weather_plot.MAX_POINTS by default, None
+            draws every point.
     """
     if df is None:
         print("No Dataframe to plot")
         return
 
-    plt.figure(figsize=(14, 8))
+    fig, ax = new_figure((14, 8), output_path)
     for var in temperature_variables:
         label = var.replace("_", " ").title() + " (°C)"
-        plt.plot(df['time'], df[var], label=label, marker='o', linestyle='-')
+        times, values = downsample(df['time'].to_numpy(), df[var].to_numpy(), max_points)
+        ax.plot(times, values, label=label, marker='o' if len(times) <= MARKER_LIMIT else None, linestyle='-')
 
-    plt.title('Temperature at Different Depths')
-    plt.xlabel('Time')
-    plt.ylabel('Temperature (°C)')
-    plt.legend()
-    plt.grid(True)
+    ax.set_title('Temperature at Different Depths')
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Temperature (°C)')
+    ax.legend()
+    ax.grid(True)
 
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-    plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=1))
-    plt.xticks(rotation=45, ha='right')
+    configure_time_axis(ax, df['time'])
 
-    plt.tight_layout()
-    plt.show()
+    return finish_figure(fig, output_path)
 
+@profiled()
 def calculate_and_print_hourly_diffs(df, var1, var2):
 
     if df is None:
@@ -82,11 +310,40 @@ def calculate_and_print_hourly_diffs(df, var1, var2):
     df[diff_var] = df[var2] - df[var1]
 
     print("Hourly Temperature Differences",var1," and ",var2)
-    for index, row in df.iterrows():
-        print(f"{row['time']}: {row[diff_var]:.2f} °C")
+    with stage('diffs.print', rows=len(df)):
+        for index, row in df.iterrows():
+            print(f"{row['time']}: {row[diff_var]:.2f} °C")
+
+def _plot_diff_series(df, var1, var2, hlines, legend, output_path=None, max_points=MAX_POINTS):
+    """
+    Shared body of the calculate_and_plot_graph_hourly_diffs functions.
 
-def calculate_and_plot_graph_hourly_diffs(df, var1, var2):
- 
+    Args:
+        hlines (list): (y, color, label) tuples of horizontal reference lines.
+        legend (bool): Whether to draw a legend for the reference lines.
+    """
+    diff_var = f"{var2}_diff_to_{var1}"
+    fig, ax = new_figure((10, 6), output_path)
+    times, values = downsample(df['time'].to_numpy(), df[diff_var].to_numpy(), max_points)
+    ax.plot(times, values, marker='o' if len(times) <= MARKER_LIMIT else None, linestyle='-')
+    ax.set_title(f"Hourly Temperature Difference: {var2} - {var1}")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Temperature Difference (°C)")
+    ax.grid(True)
+    configure_time_axis(ax, df['time'])
+    for y, color, label in hlines:
+        ax.axhline(y, color=color, linestyle='--', label=label)
+    if legend:
+        ax.legend()
+    return finish_figure(fig, output_path)
+
+@profiled()
+def calculate_and_plot_graph_hourly_diffs(df, var1, var2, output_path=None, max_points=MAX_POINTS):
+    """
+    Calculates and plots hourly temperature differences with a line at 0 °C.
+
+    output_path and max_points work as in plot_temperature_data.
+    """
     if df is None:
         print("No Dataframe to plot differences")
         return
@@ -94,138 +351,112 @@ def calculate_and_plot_graph_hourly_diffs(df, var1, var2):
     diff_var = f"{var2}_diff_to_{var1}"
     df[diff_var] = df[var2] - df[var1]
     print(df[diff_var])
-    plt.figure(figsize=(10, 6))
-    plt.plot(df['time'], df[diff_var], marker='o', linestyle='-')
-    plt.title(f"Hourly Temperature Difference: {var2} - {var1}")
-    plt.xlabel("Time")
-    plt.ylabel("Temperature Difference (°C)")
-    plt.grid(True)
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-    plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=1))
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
     # Add horizontal line at y=0
-    plt.axhline(0, color='red', linestyle='--')
-    plt.show()
+    return _plot_diff_series(df, var1, var2, [(0, 'red', None)], False, output_path, max_points)
 
 
 
-def find_Hmm_2group(df, var1, var2):
+@profiled()
+def find_Hmm_groups(df, var1, var2, edges, right_closed=None, plot=True, output_path=None):
     """
-    Calculates the hourly difference between two variables, creates a binary list,
-    groups consecutive 1s and 0s, and plots the difference.
+    Calculates the hourly difference between two variables, turns it into states
+    using threshold bins, and analyses how long each state lasts.
+
+    States are the bin numbers of weather_stats.assign_bins, lowest first. Hours
+    with a missing difference break runs and are left out of the statistics.
 
     Args:
         df (pd.DataFrame): The DataFrame containing the data.
         var1 (str): The name of the first variable.
         var2 (str): The name of the second variable.
-    """
+        edges (list): Increasing state thresholds, e.g. [1] for two states.
+        right_closed (list, optional): Edge closure flags, see weather_stats.assign_bins.
+        plot (bool): Whether to plot the run length distribution of every state,
+            all states in one figure with weather_fit.plot_fits.
+        output_path (str, optional): Write that figure to this file instead of showing it.
 
+    Returns:
+        tuple: (runs, stats, transitions) where runs is a DataFrame with the start
+        time, length and state of every run, stats is the per-state run length
+        summary from weather_stats.run_length_statistics and transitions is the
+        row-normalised hourly state-transition matrix. None if there is no data.
+    """
     if df is None:
         print("No Dataframe to plot differences")
-        return
+        return None
 
     diff_var = f"{var2}_diff_to_{var1}"
     df[diff_var] = df[var2] - df[var1]
 
-    # Create the binary list
-    binary_list = [1 if diff >= 1 else 0 for diff in df[diff_var]]
-    #print(f"Binary List: {binary_list}")
+    with stage('stats.runs', rows=len(df)):
+        states = assign_bins(df[diff_var].to_numpy(dtype=np.float64, na_value=np.nan), edges, right_closed)
+        if len(states) == 0:
+            print("Empty binary list.")
+            return None
+
+        n_states = len(edges) + 1
+        starts, lengths, values = run_lengths(states)
+        stats = run_length_statistics(lengths, values, n_states)
+        transitions = transition_matrix(states, n_states)
+    runs = pd.DataFrame({'start': df['time'].to_numpy()[starts], 'length': lengths, 'state': values})
+
+    means = stats['mean'].fillna(0)
+    std_devs = stats['std'].fillna(0)
+    for state in reversed(range(n_states)):
+        print(f"Mean Group {state} Lengths: {means[state]}")
+    for state in reversed(range(n_states)):
+        print(f"Standard Deviation Group {state} Lengths: {std_devs[state]}")
+
+    if plot:
+        fits = fit_groups(lengths, values, n_states)
+        titles = [f"Normal Distribution (Group {state} Lengths)" for state in range(n_states)]
+        plot_fits(lengths, values, fits, titles, "Length", order=reversed(range(n_states)), output_path=output_path)
+
+    return runs, stats, transitions
+
+@profiled()
+def find_Hmm_2group(df, var1, var2):
+    """
+    Calculates the hourly difference between two variables, creates a binary list,
+    groups consecutive 1s and 0s, and plots the difference.
+
+    Group 1 holds the hours where the difference is at least 1 °C.
 
-    if not binary_list:
-        print("Empty binary list.")
-        return
+    Args:
+        df (pd.DataFrame): The DataFrame containing the data.
+        var1 (str): The name of the first variable.
+        var2 (str): The name of the second variable.
 
-    groups = []
-    current_group = []
-    current_value = binary_list[0]
-
-    for value in binary_list:
-        if value == current_value:
-            current_group.append(value)
-        else:
-            groups.append(current_group)
-            current_group = [value]
-            current_value = value
-
-    groups.append(current_group)  # Add the last group
-
-    group_lengths = [len(group) for group in groups]
-
-    group_1_lengths = []
-    group_0_lengths = []
-
-    for i in range(len(groups)):
-        if groups[i][0] == 1:
-            group_1_lengths.append(group_lengths[i])
-        else:
-            group_0_lengths.append(group_lengths[i])
-
-    # print(f"Group 1 Lengths: {group_1_lengths}")
-    # print(f"Group 0 Lengths: {group_0_lengths}")
-
-    # Calculate the means
-    mean_group_1 = sum(group_1_lengths) / len(group_1_lengths) if group_1_lengths else 0
-    mean_group_0 = sum(group_0_lengths) / len(group_0_lengths) if group_0_lengths else 0
-    std_dev_group_1 = statistics.stdev(group_1_lengths) if len(group_1_lengths) > 1 else 0
-    std_dev_group_0 = statistics.stdev(group_0_lengths) if len(group_0_lengths) > 1 else 0
-
-
-    print(f"Mean Group 1 Lengths: {mean_group_1}")
-    print(f"Mean Group 0 Lengths: {mean_group_0}")
-    print(f"Standard Deviation Group 1 Lengths: {std_dev_group_1}")
-    print(f"Standard Deviation Group 0 Lengths: {std_dev_group_0}")
-
-    # plt.figure(figsize=(10, 6))
-    # plt.plot(df['time'], df[diff_var], marker='o', linestyle='-')
-    # plt.title(f"Hourly Temperature Difference: {var2} - {var1}")
-    # plt.xlabel("Time")
-    # plt.ylabel("Temperature Difference (°C)")
-    # plt.grid(True)
-    # plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-    # plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=1))
-    # plt.xticks(rotation=45, ha='right')
-    # plt.tight_layout()
-    # # Add horizontal line at y=0
-    # plt.axhline(0, color='red', linestyle='--')
-    # plt.show()
-
-    # Plotting Normal Distribution for group_1_lengths
-    if len(group_1_lengths) > 1:
-        plt.figure(figsize=(8, 6))
-        x = np.linspace(min(group_1_lengths), max(group_1_lengths), 100)
-        plt.plot(x, norm.pdf(x, mean_group_1, std_dev_group_1), 'r-')
-        plt.hist(group_1_lengths, density=True, alpha=0.6, color='skyblue')
-        plt.title(f"Normal Distribution (Group 1 Lengths)")
-        plt.xlabel("Length")
-        plt.ylabel("Probability Density")
-        plt.tight_layout()
-        plt.show()
-
-    # Plotting Normal Distribution for group_0_lengths
-    if len(group_0_lengths) > 1:
-        plt.figure(figsize=(8, 6))
-        x = np.linspace(min(group_0_lengths), max(group_0_lengths), 100)
-        plt.plot(x, norm.pdf(x, mean_group_0, std_dev_group_0), 'r-')
-        plt.hist(group_0_lengths, density=True, alpha=0.6, color='skyblue')
-        plt.title(f"Normal Distribution (Group 0 Lengths)")
-        plt.xlabel("Length")
-        plt.ylabel("Probability Density")
-        plt.tight_layout()
-        plt.show()
+    Returns:
+        tuple: The (runs, stats, transitions) of find_Hmm_groups, or None if there is no data.
+    """
+    return find_Hmm_groups(df, var1, var2, edges=[1])
 
 
 
     
-def calculate_and_print_hourly_diffs_grouped(df, var1, var2):
+def _report_binned_diffs(df, var1, var2, edges, right_closed, headings, titles, unit="", legend=False, plot=True, output_path=None):
     """
-    Calculates hourly temperature differences, groups them into above/equal and below 0, and calculates the mean and standard deviation for each group.
-    Also plots the normal distribution graph for each group.
+    Shared body of the grouped diff functions: bins the differences with
+    weather_stats.bin_statistics and prints each non-empty group from the
+    highest bin down, then fits a normal distribution to every group with
+    weather_fit and draws all groups as subplots of one figure.
 
     Args:
         df (pandas.DataFrame): DataFrame containing time and temperature data.
         var1 (str): name of the air temperature column
         var2 (str): name of the soil temperature column
+        edges (list): Increasing bin edges.
+        right_closed (list): Edge closure flags, see weather_stats.assign_bins.
+        headings (list): Printed heading per bin, lowest bin first.
+        titles (list): Plot title suffix per bin, lowest bin first.
+        unit (str): Unit appended to the printed mean and standard deviation.
+        legend (bool): Whether to label the curve and histogram.
+        plot (bool): Whether to draw the figure.
+        output_path (str, optional): Write the figure to this file instead of showing it.
+
+    Returns:
+        pandas.DataFrame: The weather_fit.fit_groups table, or None without data.
     """
     if df is None:
         print("No Dataframe to calculate differences")
@@ -236,70 +467,57 @@ def calculate_and_print_hourly_diffs_grouped(df, var1, var2):
 
     print("Hourly Temperature Differences", var1, "and", var2, "(Grouped):")
 
-    above_or_equal_zero = []
-    below_zero = []
-
-    for index, row in df.iterrows():
-        diff = row[diff_var]
-        if diff >= 0:
-            above_or_equal_zero.append(diff)
-        elif diff < 0:
-            below_zero.append(diff)
-
-    if above_or_equal_zero:
-        print("\nAbove or Equal to 0 °C:")
-        #for diff in above_or_equal_zero:
-            #print(f"{diff:.2f} °C")
-        if len(above_or_equal_zero) > 0:
-            mean_above = sum(above_or_equal_zero) / len(above_or_equal_zero)
-            std_dev_above = statistics.stdev(above_or_equal_zero)
-            print(f"Mean: {mean_above:.2f} °C")
-            print(f"Standard Deviation: {std_dev_above:.2f} °C")
-
-            # Plotting Normal Distribution for above_or_equal_zero
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(above_or_equal_zero), max(above_or_equal_zero), 100)
-            plt.plot(x, norm.pdf(x, mean_above, std_dev_above), 'r-')
-            plt.hist(above_or_equal_zero, density=True, alpha=0.6, color='skyblue')
-            plt.title(f"Normal Distribution (Above/Equal 0 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
-    if below_zero:
-        print("\nBelow 0 °C:")
-        #for diff in below_zero:
-            #print(f"{diff:.2f} °C")
-        if len(below_zero) > 0:
-            mean_below = sum(below_zero) / len(below_zero)
-            std_dev_below = statistics.stdev(below_zero)
-            print(f"Mean: {mean_below:.2f} °C")
-            print(f"Standard Deviation: {std_dev_below:.2f} °C")
-
-            # Plotting Normal Distribution for below_zero
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(below_zero), max(below_zero), 100)
-            plt.plot(x, norm.pdf(x, mean_below, std_dev_below), 'r-')
-            plt.hist(below_zero, density=True, alpha=0.6, color='skyblue')
-            plt.title(f"Normal Distribution (Below 0 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
+    values = df[diff_var].to_numpy(dtype=np.float64, na_value=np.nan)
+    with stage('stats.bins', rows=len(df)):
+        stats, _, _ = bin_statistics(values, edges, right_closed)
+
+    for i in reversed(range(len(stats))):
+        count = stats.at[i, 'count']
+        if count == 0:
+            continue
+        mean, std_dev = stats.at[i, 'mean'], stats.at[i, 'std']
+        print(f"\n{headings[i]}:")
+        print(f"Mean: {mean:.2f} {unit}")
+        print(f"Standard Deviation: {std_dev:.2f} {unit}")
+
+    groups = assign_bins(values, edges, right_closed)
+    fits = fit_groups(values, groups, len(stats), labels=stats['label'])
+    if plot:
+        plot_fits(
+            values, groups, fits, [f"Normal Distribution ({title})" for title in titles], "Temperature Difference (°C)",
+            order=reversed(range(len(stats))), output_path=output_path, legend=legend, hist_label="Temperature Difference",
+        )
+    return fits
+
+@profiled()
+def calculate_and_print_hourly_diffs_grouped(df, var1, var2, plot=True, output_path=None):
+    """
+    Calculates hourly temperature differences, groups them into above/equal and below 0, and calculates the mean and standard deviation for each group.
+    Also plots the normal distribution graph for each group.
 
-import pandas as pd
-import statistics
-import matplotlib.pyplot as plt
-import numpy as np
-from scipy.stats import norm
+    Args:
+        df (pandas.DataFrame): DataFrame containing time and temperature data.
+        var1 (str): name of the air temperature column
+        var2 (str): name of the soil temperature column
+        plot (bool): Whether to draw the groups, as subplots of one figure.
+        output_path (str, optional): Write the figure to this file instead of showing it.
 
-def calculate_and_print_hourly_diffs_3grouped(df, var1, var2):
+    Returns:
+        pandas.DataFrame: Fitted normal parameters and goodness of fit per group,
+        see weather_fit.fit_groups, or None without data.
+    """
+    return _report_binned_diffs(
+        df, var1, var2,
+        edges=[0], right_closed=[False],
+        headings=["Below 0 °C", "Above or Equal to 0 °C"],
+        titles=["Below 0 °C", "Above/Equal 0 °C"],
+        unit="°C",
+        plot=plot, output_path=output_path,
+    )
+
+
+@profiled()
+def calculate_and_print_hourly_diffs_3grouped(df, var1, var2, plot=True, output_path=None):
     """
     Calculates hourly temperature differences, groups them into three ranges, and calculates the mean and standard deviation for each group.
     Also plots the normal distribution graph for each group.
@@ -308,100 +526,30 @@ def calculate_and_print_hourly_diffs_3grouped(df, var1, var2):
         df (pandas.DataFrame): DataFrame containing time and temperature data.
         var1 (str): name of the air temperature column
         var2 (str): name of the soil temperature column
+        plot (bool): Whether to draw the groups, as subplots of one figure.
+        output_path (str, optional): Write the figure to this file instead of showing it.
+
+    Returns:
+        pandas.DataFrame: Fitted normal parameters and goodness of fit per group,
+        see weather_fit.fit_groups, or None without data.
     """
-    if df is None:
-        print("No Dataframe to calculate differences")
-        return
+    return _report_binned_diffs(
+        df, var1, var2,
+        edges=[-1.5, 1.5], right_closed=[True, False],
+        headings=["Below or Equal to -1.5 °C", "Between 1.5 and -1.5 °C", "Above or Equal to 1.5 °C"],
+        titles=["Below/Equal -1.5 °C", "Between 1.5 and -1.5 °C", "Above/Equal 1.5 °C"],
+        legend=True,
+        plot=plot, output_path=output_path,
+    )
 
-    diff_var = f"{var2}_diff_to_{var1}"
-    df[diff_var] = df[var2] - df[var1]
 
-    print("Hourly Temperature Differences", var1, "and", var2, "(Grouped):")
 
-    above_1_5 = []
-    between_1_5_minus1_5 = []
-    below_minus1_5 = []
-
-    for index, row in df.iterrows():
-        diff = row[diff_var]
-        if diff >= 1.5:
-            above_1_5.append(diff)
-        elif -1.5 < diff < 1.5:
-            between_1_5_minus1_5.append(diff)
-        elif diff <= -1.5:
-            below_minus1_5.append(diff)
-
-    # Group 1: Above or Equal to 1.5
-    if above_1_5:
-        print("\nAbove or Equal to 1.5 °C:")
-        if len(above_1_5) > 0:
-            mean_above_1_5 = sum(above_1_5) / len(above_1_5)
-            std_dev_above_1_5 = statistics.stdev(above_1_5)
-            print(f"Mean: {mean_above_1_5:.2f} ")
-            print(f"Standard Deviation: {std_dev_above_1_5:.2f} ")
-
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(above_1_5), max(above_1_5), 100)
-            plt.plot(x, norm.pdf(x, mean_above_1_5, std_dev_above_1_5), 'r-', label="Normal Distribution")
-            plt.hist(above_1_5, density=True, alpha=0.6, color='skyblue', label="Temperature Difference")
-            plt.title(f"Normal Distribution (Above/Equal 1.5 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.legend()
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
-    # Group 2: Between 1.5 and -1.5
-    if between_1_5_minus1_5:
-        print("\nBetween 1.5 and -1.5 °C:")
-        if len(between_1_5_minus1_5) > 0:
-            mean_between = sum(between_1_5_minus1_5) / len(between_1_5_minus1_5)
-            std_dev_between = statistics.stdev(between_1_5_minus1_5)
-            print(f"Mean: {mean_between:.2f} ")
-            print(f"Standard Deviation: {std_dev_between:.2f} ")
-
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(between_1_5_minus1_5), max(between_1_5_minus1_5), 100)
-            plt.plot(x, norm.pdf(x, mean_between, std_dev_between), 'r-', label="Normal Distribution")
-            plt.hist(between_1_5_minus1_5, density=True, alpha=0.6, color='skyblue', label="Temperature Difference")
-            plt.title(f"Normal Distribution (Between 1.5 and -1.5 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.legend()
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
-    # Group 3: Below or Equal to -1.5
-    if below_minus1_5:
-        print("\nBelow or Equal to -1.5 °C:")
-        if len(below_minus1_5) > 0:
-            mean_below_minus1_5 = sum(below_minus1_5) / len(below_minus1_5)
-            std_dev_below_minus1_5 = statistics.stdev(below_minus1_5)
-            print(f"Mean: {mean_below_minus1_5:.2f} ")
-            print(f"Standard Deviation: {std_dev_below_minus1_5:.2f} ")
-
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(below_minus1_5), max(below_minus1_5), 100)
-            plt.plot(x, norm.pdf(x, mean_below_minus1_5, std_dev_below_minus1_5), 'r-', label="Normal Distribution")
-            plt.hist(below_minus1_5, density=True, alpha=0.6, color='skyblue', label="Temperature Difference")
-            plt.title(f"Normal Distribution (Below/Equal -1.5 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.legend()
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
-
-
-def calculate_and_plot_graph_hourly_diffs_3group(df, var1, var2):
+@profiled()
+def calculate_and_plot_graph_hourly_diffs_3group(df, var1, var2, output_path=None, max_points=MAX_POINTS):
     """
     Calculates and plots hourly temperature differences with horizontal lines based on 3 groups.
+
+    output_path and max_points work as in plot_temperature_data.
     """
     if df is None:
         print("No Dataframe to plot differences")
@@ -410,145 +558,45 @@ def calculate_and_plot_graph_hourly_diffs_3group(df, var1, var2):
     diff_var = f"{var2}_diff_to_{var1}"
     df[diff_var] = df[var2] - df[var1]
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(df['time'], df[diff_var], marker='o', linestyle='-')
-    plt.title(f"Hourly Temperature Difference: {var2} - {var1}")
-    plt.xlabel("Time")
-    plt.ylabel("Temperature Difference (°C)")
-    plt.grid(True)
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-    plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=1))
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-
     # Add horizontal lines based on 3 groups
-    #plt.axhline(0, color='red', linestyle='--', label='0 °C')
-    plt.axhline(1.5, color='green', linestyle='--', label='1.5 °C')
-    plt.axhline(-1.5, color='blue', linestyle='--', label='-1.5 °C')
-
-    plt.legend() #add legend.
-    plt.show()
+    hlines = [(1.5, 'green', '1.5 °C'), (-1.5, 'blue', '-1.5 °C')]
+    return _plot_diff_series(df, var1, var2, hlines, True, output_path, max_points)
 
 
 
-def calculate_and_print_hourly_diffs_4grouped(df, var1, var2):
- 
-    if df is None:
-        print("No Dataframe to calculate differences")
-        return
-
-    diff_var = f"{var2}_diff_to_{var1}"
-    df[diff_var] = df[var2] - df[var1]
+@profiled()
+def calculate_and_print_hourly_diffs_4grouped(df, var1, var2, plot=True, output_path=None):
+    """
+    Calculates hourly temperature differences, groups them into four ranges split at -1.5, 0 and 1.5,
+    and calculates the mean and standard deviation for each group.
+    Also plots the normal distribution graph for each group.
 
-    print("Hourly Temperature Differences", var1, "and", var2, "(Grouped):")
+    Args:
+        df (pandas.DataFrame): DataFrame containing time and temperature data.
+        var1 (str): name of the air temperature column
+        var2 (str): name of the soil temperature column
+        plot (bool): Whether to draw the groups, as subplots of one figure.
+        output_path (str, optional): Write the figure to this file instead of showing it.
 
-    above_1_5 = []
-    between_1_5_0 = []
-    between_0_minus1_5 = []
-    below_minus1_5 = []
-
-    for index, row in df.iterrows():
-        diff = row[diff_var]
-        if diff >= 1.5:
-            above_1_5.append(diff)
-        elif 0 <= diff < 1.5:
-            between_1_5_0.append(diff)
-        elif -1.5 < diff < 0:
-            between_0_minus1_5.append(diff)
-        elif diff <= -1.5:
-            below_minus1_5.append(diff)
-
-    # Group 1: diff >= 1.5
-    if above_1_5:
-        print("\nAbove or Equal to 1.5 °C:")
-        if len(above_1_5) > 0:
-            mean_above_1_5 = sum(above_1_5) / len(above_1_5)
-            std_dev_above_1_5 = statistics.stdev(above_1_5)
-            print(f"Mean: {mean_above_1_5:.2f} ")
-            print(f"Standard Deviation: {std_dev_above_1_5:.2f} ")
-
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(above_1_5), max(above_1_5), 100)
-            plt.plot(x, norm.pdf(x, mean_above_1_5, std_dev_above_1_5), 'r-', label="Normal Distribution")
-            plt.hist(above_1_5, density=True, alpha=0.6, color='skyblue', label="Temperature Difference")
-            plt.title(f"Normal Distribution (Above or Equal to 1.5 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.legend()
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
-    # Group 2: 0 <= diff < 1.5
-    if between_1_5_0:
-        print("\nBetween equal 0 and -1.50 °C:")
-        if len(between_1_5_0) > 0:
-            mean_between_1_5_0 = sum(between_1_5_0) / len(between_1_5_0)
-            std_dev_between_1_5_0 = statistics.stdev(between_1_5_0)
-            print(f"Mean: {mean_between_1_5_0:.2f} ")
-            print(f"Standard Deviation: {std_dev_between_1_5_0:.2f} ")
-
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(between_1_5_0), max(between_1_5_0), 100)
-            plt.plot(x, norm.pdf(x, mean_between_1_5_0, std_dev_between_1_5_0), 'r-', label="Normal Distribution")
-            plt.hist(between_1_5_0, density=True, alpha=0.6, color='skyblue', label="Temperature Difference")
-            plt.title(f"Normal Distribution (Between equal 0 and -1.50 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.legend()
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
-    # Group 3: -1.5 < diff < 0
-    if between_0_minus1_5:
-        print("\nBetween -1.5 and 0 °C:")
-        if len(between_0_minus1_5) > 0:
-            mean_between_0_minus1_5 = sum(between_0_minus1_5) / len(between_0_minus1_5)
-            std_dev_between_0_minus1_5 = statistics.stdev(between_0_minus1_5)
-            print(f"Mean: {mean_between_0_minus1_5:.2f} ")
-            print(f"Standard Deviation: {std_dev_between_0_minus1_5:.2f} ")
-
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(between_0_minus1_5), max(between_0_minus1_5), 100)
-            plt.plot(x, norm.pdf(x, mean_between_0_minus1_5, std_dev_between_0_minus1_5), 'r-', label="Normal Distribution")
-            plt.hist(between_0_minus1_5, density=True, alpha=0.6, color='skyblue', label="Temperature Difference")
-            plt.title(f"Normal Distribution (Between -1.5 and 0 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.legend()
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
-    # Group 4: diff <= -1.5
-    if below_minus1_5:
-        print("\nBelow or Equal to -1.5 °C:")
-        if len(below_minus1_5) > 0:
-            mean_below_minus1_5 = sum(below_minus1_5) / len(below_minus1_5)
-            std_dev_below_minus1_5 = statistics.stdev(below_minus1_5)
-            print(f"Mean: {mean_below_minus1_5:.2f} ")
-            print(f"Standard Deviation: {std_dev_below_minus1_5:.2f} ")
-
-            plt.figure(figsize=(8, 6))
-            x = np.linspace(min(below_minus1_5), max(below_minus1_5), 100)
-            plt.plot(x, norm.pdf(x, mean_below_minus1_5, std_dev_below_minus1_5), 'r-', label="Normal Distribution")
-            plt.hist(below_minus1_5, density=True, alpha=0.6, color='skyblue', label="Temperature Difference")
-            plt.title(f"Normal Distribution (Below or Equal to -1.5 °C)")
-            plt.xlabel("Temperature Difference (°C)")
-            plt.ylabel("Probability Density")
-            plt.legend()
-            plt.tight_layout()
-            plt.show()
-        else:
-            print("No data in this group to calculate mean and standard deviation")
-
-def calculate_and_plot_graph_hourly_diffs_4group(df, var1, var2):
+    Returns:
+        pandas.DataFrame: Fitted normal parameters and goodness of fit per group,
+        see weather_fit.fit_groups, or None without data.
+    """
+    return _report_binned_diffs(
+        df, var1, var2,
+        edges=[-1.5, 0, 1.5], right_closed=[True, False, False],
+        headings=["Below or Equal to -1.5 °C", "Between -1.5 and 0 °C", "Between equal 0 and -1.50 °C", "Above or Equal to 1.5 °C"],
+        titles=["Below or Equal to -1.5 °C", "Between -1.5 and 0 °C", "Between equal 0 and -1.50 °C", "Above or Equal to 1.5 °C"],
+        legend=True,
+        plot=plot, output_path=output_path,
+    )
+
+@profiled()
+def calculate_and_plot_graph_hourly_diffs_4group(df, var1, var2, output_path=None, max_points=MAX_POINTS):
     """
     Calculates and plots hourly temperature differences with horizontal lines based on 4 groups.
+
+    output_path and max_points work as in plot_temperature_data.
     """
     if df is None:
         print("No Dataframe to plot differences")
@@ -557,21 +605,6 @@ def calculate_and_plot_graph_hourly_diffs_4group(df, var1, var2):
     diff_var = f"{var2}_diff_to_{var1}"
     df[diff_var] = df[var2] - df[var1]
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(df['time'], df[diff_var], marker='o', linestyle='-')
-    plt.title(f"Hourly Temperature Difference: {var2} - {var1}")
-    plt.xlabel("Time")
-    plt.ylabel("Temperature Difference (°C)")
-    plt.grid(True)
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-    plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=1))
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-
-    # Add horizontal lines based on 3 groups
-    plt.axhline(0, color='red', linestyle='--', label='0 °C')
-    plt.axhline(1.5, color='green', linestyle='--', label='1.5 °C')
-    plt.axhline(-1.5, color='blue', linestyle='--', label='-1.5 °C')
-
-    plt.legend() #add legend.
-    plt.show()
+    # Add horizontal lines based on 4 groups
+    hlines = [(0, 'red', '0 °C'), (1.5, 'green', '1.5 °C'), (-1.5, 'blue', '-1.5 °C')]
+    return _plot_diff_series(df, var1, var2, hlines, True, output_path, max_points)
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+METHODS = ('mean', 'last', 'interpolate')
+
+
+def _time_values(df):
+    """Returns the times of a frame with a time column or a DatetimeIndex as datetime64[ns]."""
+    times = df['time'] if 'time' in df.columns else df.index
+    return pd.to_datetime(times).to_numpy().astype('datetime64[ns]')
+
+
+def _value_columns(df):
+    return [c for c in df.columns if c != 'time']
+
+
+def _grid_frame(grid, columns, values):
+    result = pd.DataFrame(values, columns=columns)
+    result.insert(0, 'time', grid)
+    return result
+
+
+def make_grid(start, end, freq='1h'):
+    """Returns a regular datetime64[ns] grid from start to end inclusive, aligned to freq."""
+    start = pd.Timestamp(start).floor(freq)
+    end = pd.Timestamp(end).floor(freq)
+    return pd.date_range(start, end, freq=freq).to_numpy().astype('datetime64[ns]')
+
+
+def resample_series(df, grid, how='mean', tolerance=None):
+    """
+    Puts one series onto a time grid.
+
+    'mean' and 'last' aggregate every sample from a grid time up to the next
+    one; 'interpolate' linearly interpolates each column at the grid times,
+    leaving NaN where the column's nearest non-missing sample is further away
+    than tolerance. Without samples every value is NaN, and an empty grid
+    gives an empty frame.
+
+    Args:
+        df (pandas.DataFrame): Frame with a time column (or DatetimeIndex).
+        grid (numpy.ndarray): Increasing, evenly spaced datetime64[ns] grid.
+        how (str): 'mean', 'last' or 'interpolate'.
+        tolerance (str or pandas.Timedelta, optional): Maximum distance to the
+            nearest sample for interpolated values.
+
+    Returns:
+        pandas.DataFrame: One row per grid time, with a time column.
+    """
+    if how not in METHODS:
+        raise ValueError(f"Unknown method {how!r}, expected one of {METHODS}")
+    grid = np.asarray(grid).astype('datetime64[ns]')
+    columns = _value_columns(df)
+    out = np.full((len(grid), len(columns)), np.nan)
+    if len(grid) == 0:
+        # E.g. an inner join of sources that do not overlap in time.
+        return _grid_frame(grid, columns, out)
+
+    times = _time_values(df)
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    t = times.astype(np.int64)
+    g = grid.astype(np.int64)
+
+    if how == 'interpolate':
+        limit = pd.Timedelta(tolerance).value if tolerance is not None else None
+        for j in range(len(columns)):
+            valid = ~np.isnan(values[:, j])
+            if not valid.any():
+                continue
+            tv = t[valid]
+            out[:, j] = np.interp(g, tv, values[valid, j], left=np.nan, right=np.nan)
+            if limit is not None:
+                # Distance from every grid time to this column's nearest own sample.
+                pos = np.searchsorted(tv, g)
+                before = np.abs(g - tv[np.maximum(pos - 1, 0)])
+                after = np.abs(tv[np.minimum(pos, len(tv) - 1)] - g)
+                out[np.minimum(before, after) > limit, j] = np.nan
+    else:
+        step = g[1] - g[0] if len(g) > 1 else 1
+        slot = (t - g[0]) // step
+        inside = (slot >= 0) & (slot < len(g))
+        slot, vals = slot[inside], values[inside]
+        for j in range(len(columns)):
+            valid = ~np.isnan(vals[:, j])
+            s, v = slot[valid], vals[valid, j]
+            if how == 'mean':
+                counts = np.bincount(s, minlength=len(g))
+                sums = np.bincount(s, weights=v, minlength=len(g))
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    out[:, j] = sums / counts
+            else:
+                # Samples are time-sorted, so the last write per slot is the latest sample.
+                out[s, j] = v
+    return _grid_frame(grid, columns, out)
+
+
+def align_series(frames, freq='1h', how='mean', join='inner', tolerance=None):
+    """
+    Resamples several sources onto one common time grid and joins them.
+
+    Columns are renamed to '<source>_<column>', e.g. 'sensor_temperature_2m'
+    next to 'meteo_temperature_2m', and the result can be passed to the
+    weather.py diff functions with those names as var1 and var2.
+
+    Args:
+        frames (dict): Source name to frame with a time column (or DatetimeIndex).
+        freq (str): Grid spacing, e.g. '1h' or '10min'.
+        how (str or dict): 'mean', 'last' or 'interpolate', or one per source.
+        join (str): 'inner' spans only the time range all sources cover,
+            'outer' the range any source covers.
+        tolerance (str, optional): See resample_series.
+
+    Returns:
+        pandas.DataFrame: Aligned frame with a time column.
+    """
+    ranges = []
+    for df in frames.values():
+        times = _time_values(df)
+        ranges.append((times.min(), times.max()))
+    if join == 'inner':
+        start, end = max(r[0] for r in ranges), min(r[1] for r in ranges)
+    elif join == 'outer':
+        start, end = min(r[0] for r in ranges), max(r[1] for r in ranges)
+    else:
+        raise ValueError(f"Unknown join {join!r}, expected 'inner' or 'outer'")
+    grid = make_grid(start, end, freq) if start <= end else np.empty(0, dtype='datetime64[ns]')
+
+    result = pd.DataFrame({'time': grid})
+    for name, df in frames.items():
+        method = how[name] if isinstance(how, dict) else how
+        resampled = resample_series(df, grid, method, tolerance)
+        for column in _value_columns(resampled):
+            result[f"{name}_{column}"] = resampled[column].to_numpy()
+    return result
+
+
+def asof_join(left, right, tolerance='30min', direction='nearest', suffixes=('', '_right')):
+    """
+    Attaches to every row of left the closest row of right in time.
+
+    Args:
+        left (pandas.DataFrame): Frame with a time column, e.g. hourly Open-Meteo data.
+        right (pandas.DataFrame): Frame with a time column, e.g. sensor readings.
+        tolerance (str): Maximum time distance for a match; unmatched rows get NaN.
+        direction (str): 'backward', 'forward' or 'nearest', as in pandas.merge_asof.
+        suffixes (tuple): Suffixes for column names present in both frames.
+
+    Returns:
+        pandas.DataFrame: left with the matched right columns added.
+    """
+    left = left.assign(time=_time_values(left)).sort_values('time', kind='stable')
+    right = right.assign(time=_time_values(right)).sort_values('time', kind='stable')
+    overlap = (set(left.columns) & set(right.columns)) - {'time'}
+    left = left.rename(columns={c: c + suffixes[0] for c in overlap})
+    right = right.rename(columns={c: c + suffixes[1] for c in overlap})
+    return pd.merge_asof(left, right, on='time', tolerance=pd.Timedelta(tolerance), direction=direction)
@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from weather import ARCHIVE_URL, _fetch_hourly
+
+
+def make_session(pool_size=8):
+    """
+    Creates a requests.Session whose connection pool fits pool_size concurrent requests.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _fetch_with_retry(job, temperature_variables, session, cache, base_url, retries, backoff):
+    """
+    Fetches one (latitude, longitude, start_date, end_date) job, retrying failed requests.
+
+    The wait doubles after every failed attempt. Client errors other than
+    429 (Too Many Requests) and malformed responses are not retried.
+    """
+    latitude, longitude, start_date, end_date = job
+    for attempt in range(retries + 1):
+        try:
+            return _fetch_hourly(latitude, longitude, start_date, end_date, temperature_variables, cache, session, base_url)
+        except (requests.exceptions.JSONDecodeError, KeyError) as e:
+            # Checked first: the decode error is a RequestException without a response.
+            print(f"Error processing data for {job}: {e}")
+            return None
+        except requests.exceptions.RequestException as e:
+            response = getattr(e, 'response', None)
+            status = response.status_code if response is not None else None
+            retryable = status is None or status == 429 or status >= 500
+            if not retryable or attempt == retries:
+                print(f"Error fetching data for {job}: {e}")
+                return None
+            time.sleep(backoff * 2 ** attempt)
+
+
+def fetch_meteo_batch(jobs, temperature_variables, max_workers=8, retries=3, backoff=0.5, session=None, cache=None, base_url=ARCHIVE_URL):
+    """
+    Fetches many locations and date ranges concurrently over one pooled session.
+
+    Args:
+        jobs (list): List of (latitude, longitude, start_date, end_date) tuples.
+        temperature_variables (list): List of temperature variable names.
+        max_workers (int): Maximum number of requests in flight.
+        retries (int): Number of retries per job after the first attempt.
+        backoff (float): Seconds to wait before the first retry.
+        session (requests.Session, optional): Session to use, one is created if omitted.
+        cache (weather_cache.MeteoCache, optional): On-disk cache shared by all jobs.
+        base_url (str, optional): Archive endpoint, e.g. a local stub server.
+
+    Returns:
+        pandas.DataFrame: Long-format DataFrame with latitude, longitude, time,
+        variable and value columns. Jobs that fail are reported and left out.
+    """
+    own_session = session is None
+    if own_session:
+        session = make_session(max_workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_fetch_with_retry, job, temperature_variables, session, cache, base_url, retries, backoff)
+                for job in jobs
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        if own_session:
+            session.close()
+
+    frames = []
+    for (latitude, longitude, _, _), df in zip(jobs, results):
+        if df is None:
+            continue
+        long_df = df.melt(id_vars='time', value_vars=temperature_variables, var_name='variable', value_name='value')
+        long_df.insert(0, 'longitude', longitude)
+        long_df.insert(0, 'latitude', latitude)
+        frames.append(long_df)
+
+    if not frames:
+        return pd.DataFrame(columns=['latitude', 'longitude', 'time', 'variable', 'value'])
+    result = pd.concat(frames, ignore_index=True)
+    # Overlapping jobs for the same location would otherwise repeat hours.
+    result = result.drop_duplicates(subset=['latitude', 'longitude', 'variable', 'time'], keep='last')
+    return result.sort_values(['latitude', 'longitude', 'variable', 'time'], ignore_index=True)
@@ -0,0 +1,293 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _to_hours(times):
+    """Converts datetime-like values to integer hours since the Unix epoch."""
+    return pd.to_datetime(times).values.astype('datetime64[h]').astype(np.int64)
+
+
+def _day_to_hour(date_string):
+    """Converts a 'YYYY-MM-DD' string to the first hour of that day since the epoch."""
+    return int(np.datetime64(date_string, 'D').astype(np.int64)) * 24
+
+
+def _hour_to_date(hour):
+    """Converts an hour since the epoch to the 'YYYY-MM-DD' string of its day."""
+    return str(np.datetime64(int(hour) // 24, 'D'))
+
+
+def _merge_intervals(intervals):
+    """
+    Merges overlapping or adjacent half-open [start, end) hour intervals.
+
+    Args:
+        intervals (numpy.ndarray): Array of shape (n, 2) with start and end hours.
+
+    Returns:
+        numpy.ndarray: Sorted, non-overlapping intervals of shape (m, 2).
+    """
+    if len(intervals) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    intervals = intervals[np.argsort(intervals[:, 0], kind='stable')]
+    merged = [list(intervals[0])]
+    for start, end in intervals[1:]:
+        if start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return np.asarray(merged, dtype=np.int64)
+
+
+def _runs_to_intervals(hours):
+    """Turns a sorted array of unique hours into [start, end) intervals of consecutive hours."""
+    if len(hours) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    breaks = np.flatnonzero(np.diff(hours) != 1) + 1
+    starts = hours[np.r_[0, breaks]]
+    ends = hours[np.r_[breaks - 1, len(hours) - 1]] + 1
+    return np.column_stack([starts, ends]).astype(np.int64)
+
+
+def _subtract_intervals(start, end, covered):
+    """Returns the parts of [start, end) that are not inside any of the covered intervals."""
+    gaps = []
+    cursor = start
+    for c_start, c_end in covered:
+        if c_end <= cursor:
+            continue
+        if c_start >= end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, c_start))
+        cursor = max(cursor, c_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class MeteoCache:
+    """
+    Persistent on-disk cache of hourly Open-Meteo values.
+
+    Each (latitude, longitude, variable) series is stored in its own .npz file
+    holding the cached hours, their values and when each hour was fetched.
+    Every hour the API returned counts as covered, including hours whose value
+    came back missing (days the archive has not published yet, or a depth it
+    does not have), so a range that was fetched once is served offline.
+    Missing values expire after ``null_ttl`` seconds, after which their days are
+    requested again in case the archive has filled them in. Entries are evicted
+    least recently used first once ``max_bytes`` or ``max_entries`` is exceeded.
+
+    Args:
+        cache_dir (str): Directory holding the cache files.
+        max_bytes (int, optional): Size budget for all entries on disk.
+        max_entries (int, optional): Maximum number of cached series.
+        null_ttl (float, optional): Seconds a missing value stays covered; None
+            keeps missing values for good.
+    """
+
+    def __init__(self, cache_dir, max_bytes=None, max_entries=None, null_ttl=24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.null_ttl = null_ttl
+        self._lock = threading.RLock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, 'index.json')
+
+    # --- Index bookkeeping ---
+
+    def _key(self, latitude, longitude, variable):
+        return f"{float(latitude):.4f}_{float(longitude):.4f}_{variable}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def _read_index(self):
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        tmp_path = self._index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _touch(self, index, key):
+        if key in index:
+            index[key]['last_access'] = time.time()
+
+    def _read_entry(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as entry:
+            hours, values = entry['hours'], entry['values']
+            # Entries written before fetch times were kept only hold non-missing values as covered.
+            fetched = entry['fetched'] if 'fetched' in entry.files else np.zeros(len(hours))
+        return hours, values, fetched
+
+    # --- Public API ---
+
+    def coverage(self, latitude, longitude, variable):
+        """
+        Returns the hour ranges already held for a series.
+
+        Returns:
+            numpy.ndarray: Array of shape (n, 2) of [start, end) hours since the epoch.
+        """
+        with self._lock:
+            entry = self._read_entry(self._key(latitude, longitude, variable))
+        if entry is None:
+            return np.empty((0, 2), dtype=np.int64)
+        hours, values, fetched = entry
+        covered = ~np.isnan(values)
+        if self.null_ttl is None:
+            covered |= fetched > 0
+        else:
+            covered |= fetched >= time.time() - self.null_ttl
+        return _runs_to_intervals(hours[covered])
+
+    def missing_ranges(self, latitude, longitude, variables, start_date, end_date):
+        """
+        Works out which days still have to be fetched for a request.
+
+        Gaps from all variables are combined, because one API call returns every
+        variable for the same days.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+            variables (list): List of temperature variable names.
+            start_date (str): Start date in 'YYYY-MM-DD' format.
+            end_date (str): End date in 'YYYY-MM-DD' format.
+
+        Returns:
+            list: (start_date, end_date) string pairs, empty when fully covered.
+        """
+        start = _day_to_hour(start_date)
+        end = _day_to_hour(end_date) + 24
+        gaps = []
+        for var in variables:
+            gaps.extend(_subtract_intervals(start, end, self.coverage(latitude, longitude, var)))
+        if not gaps:
+            return []
+        # Widen every gap to whole days, since the archive API works in dates.
+        day_gaps = np.asarray([(s // 24 * 24, -(-e // 24) * 24) for s, e in gaps], dtype=np.int64)
+        return [(_hour_to_date(s), _hour_to_date(e - 1)) for s, e in _merge_intervals(day_gaps)]
+
+    def store(self, latitude, longitude, df, variables):
+        """
+        Merges freshly fetched data into the cache.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+            df (pandas.DataFrame): DataFrame in the fetch_meteo_data format.
+            variables (list): Columns of df to cache.
+        """
+        if df is None or df.empty:
+            return
+        new_hours = _to_hours(df['time'])
+        new_fetched = np.full(len(new_hours), time.time())
+        with self._lock:
+            index = self._read_index()
+            for var in variables:
+                key = self._key(latitude, longitude, var)
+                new_values = df[var].to_numpy(dtype=np.float64, na_value=np.nan)
+                entry = self._read_entry(key)
+                if entry is not None:
+                    old_hours, old_values, old_fetched = entry
+                    all_hours = np.concatenate([old_hours, new_hours])
+                    all_values = np.concatenate([old_values, new_values])
+                    all_fetched = np.concatenate([old_fetched, new_fetched])
+                else:
+                    all_hours, all_values, all_fetched = new_hours, new_values, new_fetched
+                # Reverse so np.unique keeps the newest value of a duplicated hour.
+                hours, first = np.unique(all_hours[::-1], return_index=True)
+                values = all_values[::-1][first]
+                fetched = all_fetched[::-1][first]
+                path = self._path(key)
+                tmp_path = path + '.tmp.npz'
+                np.savez(tmp_path, hours=hours, values=values, fetched=fetched)
+                os.replace(tmp_path, path)
+                index[key] = {'last_access': time.time(), 'bytes': os.path.getsize(path)}
+            self._evict(index, keep=set(self._key(latitude, longitude, v) for v in variables))
+            self._write_index(index)
+
+    def load(self, latitude, longitude, start_date, end_date, variables):
+        """
+        Reads a range back from the cache.
+
+        Hours that are not cached are left as NaN.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+            start_date (str): Start date in 'YYYY-MM-DD' format.
+            end_date (str): End date in 'YYYY-MM-DD' format.
+            variables (list): List of temperature variable names.
+
+        Returns:
+            pandas.DataFrame: DataFrame containing time (datetime64[ns], as
+            fetch_meteo_data returns it) and temperature data.
+        """
+        start = _day_to_hour(start_date)
+        end = _day_to_hour(end_date) + 24
+        hours = np.arange(start, end, dtype=np.int64)
+        df = pd.DataFrame({'time': hours.astype('datetime64[h]').astype('datetime64[ns]')})
+        with self._lock:
+            index = self._read_index()
+            for var in variables:
+                key = self._key(latitude, longitude, var)
+                column = np.full(len(hours), np.nan)
+                entry = self._read_entry(key)
+                if entry is not None:
+                    cached_hours, cached_values = entry[0], entry[1]
+                    lo, hi = np.searchsorted(cached_hours, [start, end])
+                    column[cached_hours[lo:hi] - start] = cached_values[lo:hi]
+                    self._touch(index, key)
+                df[var] = column
+            self._write_index(index)
+        return df
+
+    def _evict(self, index, keep=()):
+        """Drops least recently used entries until the size and count budgets are met."""
+        for key in [k for k in index if not os.path.exists(self._path(k))]:
+            del index[key]
+        order = sorted(index, key=lambda k: index[k]['last_access'])
+        total = sum(entry['bytes'] for entry in index.values())
+        for key in order:
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            over_count = self.max_entries is not None and len(index) > self.max_entries
+            if not (over_bytes or over_count):
+                break
+            if key in keep:
+                continue
+            total -= index[key]['bytes']
+            del index[key]
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Removes every cached entry."""
+        with self._lock:
+            for key in self._read_index():
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._write_index({})
@@ -0,0 +1,234 @@
+import numpy as np
+import pandas as pd
+
+from weather_stream import RunningMoments
+
+WINDOWS = ('24h', '7D')
+STATISTICS = ('mean', 'std', 'min', 'max')
+
+
+def _hourly_diff(df, var1, var2):
+    """Returns (times, var2 - var1) of a fetch_meteo_data frame, sorted by time, without modifying it."""
+    times = pd.to_datetime(df['time']).to_numpy().astype('datetime64[ns]')
+    diff = df[var2].to_numpy(dtype=np.float64, na_value=np.nan) - df[var1].to_numpy(dtype=np.float64, na_value=np.nan)
+    order = np.argsort(times, kind='stable')
+    return times[order], diff[order]
+
+
+def _month_hour(times):
+    """Returns the month-of-year (0-11) * 24 + hour-of-day cell of every time."""
+    months = times.astype('datetime64[M]').astype(np.int64) % 12
+    hours = (times - times.astype('datetime64[D]')).astype('timedelta64[h]').astype(np.int64)
+    return months * 24 + hours
+
+
+def _collapse(moments, axis):
+    """
+    Combines the month x hour cells of a RunningMoments along one axis.
+
+    Uses the same pooled mean and M2 formula as RunningMoments.merge.
+    """
+    count = moments.count.reshape(12, 24)
+    mean = moments.mean.reshape(12, 24)
+    m2 = moments.m2.reshape(12, 24)
+    total = count.sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pooled = (count * mean).sum(axis=axis) / total
+        expanded = np.expand_dims(pooled, axis)
+        pooled_m2 = (m2 + count * (mean - expanded) ** 2).sum(axis=axis)
+        std = np.where(total > 1, np.sqrt(pooled_m2 / (total - 1)), np.nan)
+    return pd.DataFrame({
+        'count': total,
+        'mean': np.where(total > 0, pooled, np.nan),
+        'std': std,
+        'min': np.fmin.reduce(moments.min.reshape(12, 24), axis=axis),
+        'max': np.fmax.reduce(moments.max.reshape(12, 24), axis=axis),
+    })
+
+
+def rolling_statistics(times, values, windows=WINDOWS):
+    """
+    Trailing time-window statistics of an hourly series.
+
+    Windows are time based, so gaps in the series shrink a window rather than
+    stretching it over more rows; NaN hours are skipped.
+
+    Args:
+        times (numpy.ndarray): Increasing datetime64 times.
+        values (numpy.ndarray): Value per time.
+        windows (tuple): pandas offsets such as '24h' or '7D'.
+
+    Returns:
+        pandas.DataFrame: A time column plus '<window>_<statistic>' columns.
+    """
+    series = pd.Series(values, index=pd.DatetimeIndex(times))
+    result = pd.DataFrame({'time': times})
+    for window in windows:
+        rolled = series.rolling(window, min_periods=1).agg(list(STATISTICS))
+        for statistic in STATISTICS:
+            result[f"{window}_{statistic}"] = rolled[statistic].to_numpy()
+    return result
+
+
+class ClimateSummary:
+    """
+    Precomputed climatology and rolling statistics of an air-soil difference.
+
+    Hours are accumulated per month-of-year and hour-of-day cell with
+    weather_stream.RunningMoments; hour-of-day and monthly climatologies are
+    pooled from those 288 cells on request. The rolling table gets one row per
+    hour and only keeps the raw differences of the longest window between
+    updates, so appending new days never rescans the history. New rows are
+    kept as chunks and only joined into one table when rolling is read.
+
+    Appended frames may overlap what was seen before: only hours after the
+    last summarised hour are used. Trailing hours without a difference (days
+    the archive has not published yet, or uncached hours) are held back until
+    a later update provides them.
+
+    Args:
+        var1 (str): Name of the air temperature column.
+        var2 (str): Name of the soil temperature column; the difference is var2 - var1.
+        windows (tuple): Rolling windows as pandas offsets.
+    """
+
+    def __init__(self, var1, var2, windows=WINDOWS):
+        self.var1 = var1
+        self.var2 = var2
+        self.windows = tuple(windows)
+        self.moments = RunningMoments(12 * 24)
+        self.last_time = None
+        self._rolling_chunks = [rolling_statistics(np.empty(0, dtype='datetime64[ns]'), np.empty(0), self.windows)]
+        self._tail_times = np.empty(0, dtype='datetime64[ns]')
+        self._tail_values = np.empty(0)
+
+    @property
+    def rolling(self):
+        """Rolling statistics with one row per summarised hour, see rolling_statistics."""
+        if len(self._rolling_chunks) > 1:
+            self._rolling_chunks = [pd.concat(self._rolling_chunks, ignore_index=True)]
+        return self._rolling_chunks[0]
+
+    def update(self, df):
+        """
+        Appends the hours of a frame in the fetch_meteo_data format.
+
+        Returns:
+            int: Number of hours added.
+        """
+        times, diff = _hourly_diff(df, self.var1, self.var2)
+        if self.last_time is not None:
+            new = times > self.last_time
+            times, diff = times[new], diff[new]
+        valid = np.flatnonzero(~np.isnan(diff))
+        if len(valid) == 0:
+            return 0
+        times, diff = times[:valid[-1] + 1], diff[:valid[-1] + 1]
+
+        cells = np.where(np.isnan(diff), -1, _month_hour(times))
+        self.moments.update(diff, cells)
+
+        # Recompute the windows over the kept tail plus the new hours, then keep only the new rows.
+        all_times = np.concatenate([self._tail_times, times])
+        all_values = np.concatenate([self._tail_values, diff])
+        rolled = rolling_statistics(all_times, all_values, self.windows)
+        self._rolling_chunks.append(rolled.iloc[len(self._tail_times):])
+
+        self.last_time = times[-1]
+        span = max(pd.Timedelta(window) for window in self.windows).to_timedelta64()
+        keep = all_times > self.last_time - span
+        self._tail_times, self._tail_values = all_times[keep], all_values[keep]
+        return len(times)
+
+    def update_from_cache(self, cache, latitude, longitude, start_date, end_date):
+        """
+        Appends the days a weather_cache.MeteoCache holds that are not summarised yet.
+
+        Returns:
+            int: Number of hours added.
+        """
+        if self.last_time is not None:
+            start_date = max(start_date, str(self.last_time.astype('datetime64[D]')))
+        if start_date > end_date:
+            return 0
+        return self.update(cache.load(latitude, longitude, start_date, end_date, [self.var1, self.var2]))
+
+    def merge(self, other):
+        """
+        Folds the climatology of another summary into this one, e.g. of another
+        site or a separately summarised period. The rolling table is per series
+        and is left unchanged.
+        """
+        self.moments.merge(other.moments)
+        return self
+
+    def month_hour(self):
+        """Climatology per (month, hour) cell."""
+        frame = self.moments.frame()
+        frame.index = pd.MultiIndex.from_product([range(1, 13), range(24)], names=['month', 'hour'])
+        return frame
+
+    def hour_of_day(self):
+        """Climatology per hour of day, pooled over all months."""
+        frame = _collapse(self.moments, axis=0)
+        frame.index = pd.RangeIndex(24, name='hour')
+        return frame
+
+    def month_of_year(self):
+        """Climatology per month, pooled over all hours."""
+        frame = _collapse(self.moments, axis=1)
+        frame.index = pd.RangeIndex(1, 13, name='month')
+        return frame
+
+    def rolling_between(self, start=None, end=None):
+        """Returns the rolling table rows from start to end inclusive."""
+        times = self.rolling['time']
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= pd.Timestamp(start)
+        if end is not None:
+            mask &= times <= pd.Timestamp(end)
+        return self.rolling[mask].reset_index(drop=True)
+
+    def save(self, path):
+        """Writes the summary to an .npz file."""
+        np.savez(
+            path,
+            var1=self.var1, var2=self.var2, windows=np.asarray(self.windows, dtype=str),
+            count=self.moments.count, mean=self.moments.mean, m2=self.moments.m2,
+            min=self.moments.min, max=self.moments.max,
+            last_time=np.asarray([] if self.last_time is None else [self.last_time], dtype='datetime64[ns]'),
+            tail_times=self._tail_times, tail_values=self._tail_values,
+            rolling_columns=np.asarray(self.rolling.columns[1:], dtype=str),
+            rolling_time=self.rolling['time'].to_numpy().astype('datetime64[ns]'),
+            rolling_values=self.rolling.iloc[:, 1:].to_numpy(dtype=np.float64),
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Reads a summary written by save."""
+        with np.load(path) as data:
+            summary = cls(str(data['var1']), str(data['var2']), tuple(str(w) for w in data['windows']))
+            for name in ('count', 'mean', 'm2', 'min', 'max'):
+                setattr(summary.moments, name, data[name])
+            summary.last_time = data['last_time'][0] if len(data['last_time']) else None
+            summary._tail_times = data['tail_times']
+            summary._tail_values = data['tail_values']
+            rolling = pd.DataFrame(data['rolling_values'], columns=[str(c) for c in data['rolling_columns']])
+            rolling.insert(0, 'time', data['rolling_time'])
+            summary._rolling_chunks = [rolling]
+        return summary
+
+
+def climatology(df, var1, var2):
+    """
+    One-off hour-of-day and month-of-year climatologies of var2 - var1.
+
+    Returns:
+        tuple: (hour_of_day, month_of_year) DataFrames with count, mean, std, min and max.
+    """
+    summary = ClimateSummary(var1, var2)
+    times, diff = _hourly_diff(df, var1, var2)
+    summary.moments.update(diff, np.where(np.isnan(diff), -1, _month_hour(times)))
+    return summary.hour_of_day(), summary.month_of_year()
@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from weather_plot import finish_figure, new_figure
+
+FAMILIES = {
+    'norm': stats.norm,
+    'skewnorm': stats.skewnorm,
+    'gamma': stats.gamma,
+}
+# Fitted parameters per family, for the AIC.
+N_PARAMS = {'norm': 2, 'skewnorm': 3, 'gamma': 3}
+# Largest skewness a skew-normal distribution can have.
+_SKEWNORM_MAX_SKEW = 0.99
+
+
+def group_moments(values, groups, n_groups):
+    """
+    Count, mean, sample standard deviation and skewness of every group.
+
+    Args:
+        values (numpy.ndarray): Values.
+        groups (numpy.ndarray): Group of every value; negative groups are skipped.
+        n_groups (int): Number of groups.
+
+    Returns:
+        tuple: (count, mean, std, skew) arrays of length n_groups.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups)
+    keep = (groups >= 0) & ~np.isnan(values)
+    values, groups = values[keep], groups[keep]
+    count = np.bincount(groups, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(groups, weights=values, minlength=n_groups) / count
+        deviation = values - mean[groups]
+        m2 = np.bincount(groups, weights=deviation ** 2, minlength=n_groups)
+        m3 = np.bincount(groups, weights=deviation ** 3, minlength=n_groups)
+        std = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+        skew = np.where(m2 > 0, (m3 / count) / (m2 / count) ** 1.5, 0.0)
+    return count, mean, std, np.where(count > 0, skew, np.nan)
+
+
+def _moment_parameters(family, mean, std, skew):
+    """
+    Method-of-moments (shape, loc, scale) for every group at once.
+
+    The normal fit uses the sample standard deviation, like the old
+    statistics.stdev based plots. Skew-normal parameters follow from the
+    skewness, clipped to what the family can reach; gamma is fitted as a
+    Pearson type III (shifted gamma), which only exists for positive skewness.
+    """
+    nan = np.full_like(mean, np.nan)
+    if family == 'norm':
+        return nan, mean, std
+    if family == 'skewnorm':
+        g = np.clip(skew, -_SKEWNORM_MAX_SKEW, _SKEWNORM_MAX_SKEW)
+        b = np.abs(g) ** (2 / 3)
+        delta = np.sign(g) * np.sqrt(np.pi / 2 * b / (b + ((4 - np.pi) / 2) ** (2 / 3)))
+        shape = delta / np.sqrt(1 - delta ** 2)
+        scale = std / np.sqrt(1 - 2 * delta ** 2 / np.pi)
+        loc = mean - scale * delta * np.sqrt(2 / np.pi)
+        return shape, loc, scale
+    if family == 'gamma':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            positive = skew > 0
+            shape = np.where(positive, 4 / skew ** 2, np.nan)
+            scale = np.where(positive, std * skew / 2, np.nan)
+            loc = np.where(positive, mean - 2 * std / skew, np.nan)
+        return shape, loc, scale
+    raise ValueError(f"Unknown family {family!r}, expected one of {sorted(FAMILIES)}")
+
+
+def _mle_parameters(family, values, groups, n_groups):
+    """Maximum-likelihood (shape, loc, scale) with scipy, one group at a time."""
+    shape, loc, scale = (np.full(n_groups, np.nan) for _ in range(3))
+    for group in range(n_groups):
+        sample = values[groups == group]
+        if len(sample) < 3:
+            continue
+        fitted = FAMILIES[family].fit(sample)
+        if family == 'norm':
+            loc[group], scale[group] = fitted
+        else:
+            shape[group], loc[group], scale[group] = fitted
+    return shape, loc, scale
+
+
+def _frozen_args(family, shape, loc, scale):
+    return (loc, scale) if family == 'norm' else (shape, loc, scale)
+
+
+def fit_groups(values, groups, n_groups, families=('norm',), method='moments', labels=None):
+    """
+    Fits distributions to every group of a binned array.
+
+    Parameters come from the group moments in one vectorised pass
+    (method='moments'), or from scipy's maximum-likelihood fit per group
+    (method='mle'). Goodness of fit is computed for all groups together: the
+    Kolmogorov-Smirnov statistic from the values sorted by group, its
+    p-value, and the log-likelihood and AIC.
+
+    Args:
+        values (array-like): Values, e.g. hourly differences or run lengths.
+        groups (array-like): Group of every value, e.g. from
+            weather_stats.assign_bins; negative groups and NaN values are skipped.
+        n_groups (int): Number of groups.
+        families (tuple): Any of 'norm', 'skewnorm' and 'gamma'.
+        method (str): 'moments' or 'mle'.
+        labels (list, optional): Label per group, added as a column.
+
+    Returns:
+        pandas.DataFrame: Indexed by (group, family) with count, shape (NaN for
+        the normal), loc, scale, ks_stat, ks_pvalue, loglik and aic columns.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups)
+    keep = (groups >= 0) & ~np.isnan(values)
+    values, groups = values[keep], groups[keep]
+    count, mean, std, skew = group_moments(values, groups, n_groups)
+
+    # Values sorted within each group, with each value's 1-based rank in its group.
+    order = np.lexsort((values, groups))
+    sorted_values, sorted_groups = values[order], groups[order]
+    starts = np.r_[0, np.cumsum(count)[:-1]]
+    rank = np.arange(1, len(values) + 1) - starts[sorted_groups]
+    n = count[sorted_groups]
+
+    tables = []
+    for family in families:
+        if method == 'moments':
+            shape, loc, scale = _moment_parameters(family, mean, std, skew)
+        elif method == 'mle':
+            shape, loc, scale = _mle_parameters(family, values, groups, n_groups)
+        else:
+            raise ValueError(f"Unknown method {method!r}, expected 'moments' or 'mle'")
+        # A single value does not determine a distribution.
+        shape, loc, scale = (np.where(count > 1, p, np.nan) for p in (shape, loc, scale))
+        dist = FAMILIES[family]
+        args = _frozen_args(family, shape[sorted_groups], loc[sorted_groups], scale[sorted_groups])
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            cdf = dist.cdf(sorted_values, *args)
+            logpdf = dist.logpdf(sorted_values, *args)
+        distance = np.fmax(rank / n - cdf, cdf - (rank - 1) / n)
+        ks_stat = np.full(n_groups, np.nan)
+        np.fmax.at(ks_stat, sorted_groups, distance)
+        valid = (count > 1) & np.isfinite(scale)
+        ks_stat[~valid] = np.nan
+        with np.errstate(invalid='ignore'):
+            ks_pvalue = np.where(valid, stats.kstwo.sf(ks_stat, np.maximum(count, 1)), np.nan)
+        loglik = np.where(valid, np.bincount(sorted_groups, weights=logpdf, minlength=n_groups), np.nan)
+        table = pd.DataFrame({
+            'group': np.arange(n_groups),
+            'family': family,
+            'count': count,
+            'shape': shape,
+            'loc': loc,
+            'scale': scale,
+            'ks_stat': ks_stat,
+            'ks_pvalue': ks_pvalue,
+            'loglik': loglik,
+            'aic': 2 * N_PARAMS[family] - 2 * loglik,
+        })
+        if labels is not None:
+            table.insert(2, 'label', list(labels))
+        tables.append(table)
+    return pd.concat(tables).set_index(['group', 'family']).sort_index(level='group', sort_remaining=False)
+
+
+def pdf(fits, group, family, x):
+    """
+    Evaluates the fitted density of one group and family at x.
+
+    Groups without a usable fit (no spread, too few values) give NaN.
+    """
+    row = fits.loc[(group, family)]
+    if not row['scale'] > 0:
+        return np.full(np.shape(x), np.nan)
+    return FAMILIES[family].pdf(x, *_frozen_args(family, row['shape'], row['loc'], row['scale']))
+
+
+def plot_fits(values, groups, fits, titles, xlabel, order=None, output_path=None, legend=False,
+              hist_bins=10, ncols=2, curve_label="Normal Distribution", hist_label=None):
+    """
+    Draws every group's histogram and fitted densities as subplots of one figure.
+
+    Groups with fewer than two values are left out.
+
+    Args:
+        values, groups (array-like): As given to fit_groups.
+        fits (pandas.DataFrame): Result of fit_groups.
+        titles (list): Subplot title per group.
+        xlabel (str): x axis label of every subplot.
+        order (list, optional): Groups in drawing order, all groups by default.
+        output_path (str, optional): Write the figure to this file through the
+            Agg backend instead of showing it.
+        legend (bool): Whether to label the curves and histogram.
+        hist_bins (int): Histogram buckets per group, over the group's own range.
+        ncols (int): Subplots per row.
+        curve_label (str): Legend label of the normal curve; other families are
+            labelled by name.
+        hist_label (str, optional): Legend label of the histogram.
+
+    Returns:
+        The output_path, or None if no group had enough values to draw.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups)
+    counts = fits.xs(fits.index.get_level_values('family')[0], level='family')['count']
+    order = range(len(counts)) if order is None else order
+    drawn = [group for group in order if counts.iloc[group] >= 2]
+    if not drawn:
+        return None
+    families = list(dict.fromkeys(fits.index.get_level_values('family')))
+
+    ncols = min(ncols, len(drawn))
+    nrows = -(-len(drawn) // ncols)
+    fig, axes = new_figure((6 * ncols, 4.5 * nrows), output_path, nrows=nrows, ncols=ncols)
+    axes = np.atleast_1d(axes).ravel()
+    colors = {'norm': 'r', 'skewnorm': 'g', 'gamma': 'm'}
+    for ax, group in zip(axes, drawn):
+        sample = values[(groups == group) & ~np.isnan(values)]
+        x = np.linspace(sample.min(), sample.max(), 100)
+        for family in families:
+            label = (curve_label if family == 'norm' else family) if legend else None
+            ax.plot(x, pdf(fits, group, family, x), colors.get(family, 'k') + '-', label=label)
+        ax.hist(sample, bins=hist_bins, density=True, alpha=0.6, color='skyblue', label=hist_label if legend else None)
+        ax.set_title(titles[group])
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel("Probability Density")
+        if legend:
+            ax.legend()
+    for ax in axes[len(drawn):]:
+        ax.set_visible(False)
+    return finish_figure(fig, output_path)
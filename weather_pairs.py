@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from weather_stats import assign_bins, bin_labels, run_lengths, run_length_statistics, transition_matrix
+
+
+def difference_cube(df, variables):
+    """
+    Computes every pairwise difference between the given columns at once.
+
+    The input frame is only read, never widened with diff columns.
+
+    Args:
+        df (pandas.DataFrame): DataFrame containing the temperature columns.
+        variables (list): K column names, e.g. air temperature and three soil layers.
+
+    Returns:
+        numpy.ndarray: Array of shape (N, K, K) where [n, i, j] is
+        variables[j] - variables[i] at hour n, i.e. the
+        f"{variables[j]}_diff_to_{variables[i]}" column of the weather.py functions.
+    """
+    values = df[list(variables)].to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[:, None, :] - values[:, :, None]
+
+
+def pair_index(variables):
+    """Returns (i, j) index arrays of every pair i < j of variables, row by row."""
+    return np.triu_indices(len(variables), k=1)
+
+
+def pair_statistics(df, variables, edges, right_closed=None):
+    """
+    Bins the differences of every variable pair and summarises them in one pass.
+
+    Each pair (i, j) with i < j uses variables[j] - variables[i], so with the
+    variables ordered from the air downwards every pair is deeper minus
+    shallower, as var2 - var1 in the weather.py diff functions. The hours of all
+    pairs are keyed by pair and bin and reduced together with np.bincount; run
+    lengths are found on the concatenated state series of all pairs, with
+    missing differences breaking runs as in weather.find_Hmm_groups.
+
+    Args:
+        df (pandas.DataFrame): DataFrame containing the temperature columns.
+        variables (list): Column names, shallowest first.
+        edges (list): Increasing bin edges, see weather_stats.assign_bins.
+        right_closed (list, optional): Edge closure flags, see weather_stats.assign_bins.
+
+    Returns:
+        tuple: (bins, runs, transitions) where bins and runs are DataFrames
+        indexed by (var1, var2, bin); bins has label, count, mean, std, min and
+        max of the differences, runs has the run_length_statistics columns, and
+        transitions has shape (pairs, k + 1, k + 1) with each pair's
+        row-normalised transition matrix.
+    """
+    first, second = pair_index(variables)
+    n_pairs = len(first)
+    n_bins = len(edges) + 1
+    values = df[list(variables)].to_numpy(dtype=np.float64, na_value=np.nan)
+    # (pairs, N): one row of hourly differences per pair
+    diffs = (values[:, second] - values[:, first]).T
+    states = assign_bins(diffs, edges, right_closed).reshape(n_pairs, -1)
+
+    # Key every hour by pair and state; missing hours keep -1.
+    pair = np.arange(n_pairs)[:, None]
+    keys = np.where(states >= 0, pair * n_bins + states, -1)
+
+    valid = keys >= 0
+    k, v = keys[valid], diffs[valid]
+    size = n_pairs * n_bins
+    count = np.bincount(k, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(k, weights=v, minlength=size) / count
+        std = np.sqrt(np.bincount(k, weights=(v - mean[k]) ** 2, minlength=size) / (count - 1))
+    std[count < 2] = np.nan
+    minimum = np.full(size, np.nan)
+    maximum = np.full(size, np.nan)
+    np.fmin.at(minimum, k, v)
+    np.fmax.at(maximum, k, v)
+
+    index = pd.MultiIndex.from_arrays(
+        [np.repeat(np.asarray(variables)[first], n_bins), np.repeat(np.asarray(variables)[second], n_bins), np.tile(np.arange(n_bins), n_pairs)],
+        names=['var1', 'var2', 'bin'],
+    )
+    bins = pd.DataFrame({
+        'label': np.tile(bin_labels(edges, right_closed), n_pairs),
+        'count': count, 'mean': mean, 'std': std, 'min': minimum, 'max': maximum,
+    }, index=index)
+
+    # Consecutive pairs never share a key, so runs cannot span two pairs.
+    flat = keys.reshape(-1)
+    _, lengths, run_keys = run_lengths(flat)
+    runs = run_length_statistics(lengths, run_keys, size)
+    runs.index = index
+
+    counts = transition_matrix(flat, size, normalize=False)
+    blocks = np.arange(n_pairs) * n_bins
+    span = np.arange(n_bins)
+    counts = counts[(blocks[:, None] + span)[:, :, None], (blocks[:, None] + span)[:, None, :]]
+    totals = counts.sum(axis=2, keepdims=True)
+    transitions = np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+    return bins, runs, transitions
+
+
+def site_pair_statistics(frames, variables, edges, right_closed=None):
+    """
+    Runs pair_statistics for several sites.
+
+    Args:
+        frames (dict): Site name to DataFrame, e.g. from weather_batch.fetch_meteo_batch
+            pivoted per location.
+        variables, edges, right_closed: See pair_statistics.
+
+    Returns:
+        tuple: (bins, runs) DataFrames with the site as the outermost index level.
+    """
+    results = {site: pair_statistics(df, variables, edges, right_closed) for site, df in frames.items()}
+    bins = pd.concat({site: result[0] for site, result in results.items()}, names=['site'])
+    runs = pd.concat({site: result[1] for site, result in results.items()}, names=['site'])
+    return bins, runs
@@ -0,0 +1,211 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from weather_profile import stage
+
+# Series longer than this are drawn without point markers.
+MARKER_LIMIT = 200
+
+# Default point budget per plotted series. The figures are at most 1400 pixels
+# wide, so a few points per pixel column keep the visible shape; shorter series
+# (about seven months of hourly data) are drawn unchanged.
+MAX_POINTS = 5000
+
+
+def _as_float(x):
+    """Returns x as float64, converting datetimes to nanoseconds since the epoch."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Picks n_out points with the largest-triangle-three-buckets algorithm.
+
+    The first and last points are always kept. For every bucket in between, the
+    point forming the largest triangle with the previously kept point and the
+    mean of the next bucket is chosen, which preserves peaks and troughs.
+
+    Args:
+        x (array-like): Increasing x values (numbers or datetimes).
+        y (array-like): y values. NaN values are skipped when picking points and
+            averaging buckets; a bucket that is entirely NaN keeps its first
+            point, so a gap in the data still breaks the plotted line.
+        n_out (int): Number of points to keep, at least 3.
+
+    Returns:
+        numpy.ndarray: Sorted indices of the kept points.
+    """
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket i (1..n_out-2) covers [bounds[i-1], bounds[i]) of the inner points.
+    bounds = (1 + np.arange(n_out - 1) * (n - 2) // (n_out - 2)).astype(np.int64)
+    valid = ~np.isnan(y)
+    y_filled = np.where(valid, y, 0.0)
+    bucket_sum_x = np.add.reduceat(x[1:-1] * valid[1:-1], bounds[:-1] - 1)
+    bucket_sum_y = np.add.reduceat(y_filled[1:-1], bounds[:-1] - 1)
+    bucket_valid = np.add.reduceat(valid[1:-1].astype(np.int64), bounds[:-1] - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_x = np.r_[bucket_sum_x / bucket_valid, x[-1]]
+        avg_y = np.r_[bucket_sum_y / bucket_valid, y[-1]]
+    # An all-NaN bucket (or a NaN last point) borrows the mean of the nearest
+    # buckets, so it does not pull the triangles of its neighbour towards zero.
+    filled = ~np.isnan(avg_y)
+    if filled.any():
+        position = np.arange(len(avg_y))
+        avg_x = np.where(filled, avg_x, np.interp(position, position[filled], avg_x[filled]))
+        avg_y = np.where(filled, avg_y, np.interp(position, position[filled], avg_y[filled]))
+    else:
+        avg_x = np.r_[(x[bounds[:-1]] + x[bounds[1:] - 1]) / 2, x[-1]]
+        avg_y = np.zeros(len(avg_x))
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        if bucket_valid[i] == 0:
+            selected[i + 1] = lo
+            continue
+        ax_, ay_ = x[previous], y_filled[previous]
+        area = np.abs((ax_ - avg_x[i + 1]) * (y[lo:hi] - ay_) - (ax_ - x[lo:hi]) * (avg_y[i + 1] - ay_))
+        area[np.isnan(area)] = -1.0
+        previous = lo + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Keeps the minimum and maximum of each of n_buckets equal-size buckets.
+
+    Args:
+        y (array-like): y values.
+        n_buckets (int): Number of buckets; up to 2 * n_buckets points are kept.
+
+    Returns:
+        numpy.ndarray: Sorted unique indices of the kept points.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    bucket = np.arange(n) * n_buckets // n
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n]
+    by_min = np.lexsort((np.where(np.isnan(y), np.inf, y), bucket))
+    by_max = np.lexsort((np.where(np.isnan(y), -np.inf, y), bucket))
+    return np.unique(np.r_[by_min[starts], by_max[ends - 1]])
+
+
+def downsample(x, y, max_points, method='lttb'):
+    """
+    Reduces a series to at most max_points points for plotting.
+
+    Args:
+        x (array-like): x values.
+        y (array-like): y values.
+        max_points (int, optional): Point budget, None keeps every point.
+        method (str): 'lttb' or 'minmax'.
+
+    Returns:
+        tuple: (x, y) of the kept points.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if max_points is None or len(x) <= max_points:
+        return x, y
+    if method == 'lttb':
+        keep = lttb_indices(x, y, max_points)
+    elif method == 'minmax':
+        keep = minmax_indices(y, max_points // 2)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return x[keep], y[keep]
+
+
+def configure_time_axis(ax, times, max_ticks=12):
+    """
+    Sets a date locator and formatter whose tick count fits the plotted span.
+
+    Hourly ticks are only used for spans of up to max_ticks hours; longer spans
+    get coarser ticks chosen by AutoDateLocator.
+    """
+    times = pd.to_datetime(np.asarray(times))
+    span = times.max() - times.min() if len(times) else pd.Timedelta(0)
+    if span <= pd.Timedelta(hours=max_ticks):
+        locator = mdates.HourLocator(interval=1)
+    else:
+        locator = mdates.AutoDateLocator(minticks=3, maxticks=max_ticks)
+    fmt = '%Y-%m-%d %H:%M' if span <= pd.Timedelta(days=3) else '%Y-%m-%d'
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter(fmt))
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+
+
+def new_figure(figsize, output_path=None, nrows=1, ncols=1):
+    """
+    Creates a figure and axes, an array of them for a grid of subplots.
+
+    With an output_path the figure is built directly on the Agg canvas without
+    touching pyplot, so it works headless and in worker processes.
+    """
+    if output_path is None:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=figsize)
+    else:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+    return fig, fig.subplots(nrows, ncols)
+
+
+def finish_figure(fig, output_path=None, dpi=100):
+    """Shows the figure, or writes it to output_path (format taken from the extension)."""
+    with stage('plot.render', path=output_path):
+        fig.tight_layout()
+        if output_path is None:
+            import matplotlib.pyplot as plt
+            plt.show()
+        else:
+            fig.savefig(output_path, dpi=dpi)
+    return output_path
+
+
+def _render_job(job):
+    func, args, kwargs = job
+    return func(*args, **kwargs)
+
+
+def render_figures(jobs, processes=None):
+    """
+    Renders many figures to files in a process pool.
+
+    Args:
+        jobs (list): (function, args, kwargs) tuples, e.g.
+            (weather.plot_temperature_data, (df, variables), {'output_path': 'a.png'}).
+            The function must be importable at module level and kwargs must
+            contain output_path so nothing is shown interactively.
+        processes (int, optional): Number of worker processes.
+
+    Returns:
+        list: Return value of every job, in order.
+    """
+    for _, _, kwargs in jobs:
+        if kwargs.get('output_path') is None:
+            raise ValueError("Every render job needs an output_path")
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_render_job, jobs))
@@ -0,0 +1,227 @@
+"""
+Opt-in timing and allocation instrumentation.
+
+Instrumented code marks its stages with ``stage()`` or ``@profiled``. Until
+``enable()`` is called both reduce to a global lookup and a direct call, so the
+hooks can stay in place permanently.
+
+Example:
+    import weather, weather_profile
+    profiler = weather_profile.enable(track_allocations=True)
+    df = weather.fetch_meteo_data(52.52, 13.41, "2023-01-01", "2023-12-31", ["temperature_2m"])
+    weather.find_Hmm_2group(df, "temperature_2m", "temperature_2m")
+    weather_profile.disable()
+    print(profiler.summary())
+    profiler.write_chrome_trace("trace.json")  # open in chrome://tracing or Perfetto
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+_profiler = None
+
+
+class Profiler:
+    """
+    Collects one record per stage: name, start, duration, thread, nesting
+    depth and any fields the stage set, such as rows or bytes.
+
+    With track_allocations, tracemalloc runs while the profiler is enabled and
+    every record gets alloc_bytes (net traced memory change) and peak_bytes
+    (traced peak above the stage's starting point). tracemalloc is process-wide,
+    so stages running concurrently in other threads are counted too.
+
+    Args:
+        track_allocations (bool): Record memory allocations per stage.
+    """
+
+    def __init__(self, track_allocations=False):
+        self.track_allocations = track_allocations
+        self.records = []
+        self._origin = time.perf_counter_ns()
+        self._started_tracemalloc = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def stage(self, name, **fields):
+        stack = self._stack()
+        record = dict(fields)
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+            tracemalloc.reset_peak()
+            alloc = {'_start': current, '_peak': current}
+        stack.append(alloc if self.track_allocations else None)
+        start = time.perf_counter_ns()
+        try:
+            yield record
+        finally:
+            end = time.perf_counter_ns()
+            stack.pop()
+            if self.track_allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, alloc['_peak'])
+                if stack:
+                    stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+                record['alloc_bytes'] = current - alloc['_start']
+                record['peak_bytes'] = peak - alloc['_start']
+            record.update(
+                name=name,
+                start_ns=start - self._origin,
+                duration_ns=end - start,
+                thread=threading.get_ident(),
+                depth=len(stack),
+            )
+            with self._lock:
+                self.records.append(record)
+
+    def start(self):
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def frame(self):
+        """Returns every record as a DataFrame in completion order."""
+        return pd.DataFrame(self.records)
+
+    def summary(self):
+        """
+        Aggregates the records per stage name.
+
+        Returns:
+            pandas.DataFrame: calls, total/mean/max milliseconds and the summed
+            rows, bytes and allocations per stage, slowest total first.
+        """
+        df = self.frame()
+        if df.empty:
+            return df
+        df['ms'] = df['duration_ns'] / 1e6
+        aggregations = {'calls': ('ms', 'size'), 'total_ms': ('ms', 'sum'), 'mean_ms': ('ms', 'mean'), 'max_ms': ('ms', 'max')}
+        for column in ('rows', 'bytes', 'alloc_bytes'):
+            if column in df:
+                aggregations[column] = (column, 'sum')
+        if 'peak_bytes' in df:
+            aggregations['peak_bytes'] = ('peak_bytes', 'max')
+        return df.groupby('name').agg(**aggregations).sort_values('total_ms', ascending=False)
+
+    def chrome_trace(self):
+        """Returns the records in the Chrome trace event format, one complete event per stage."""
+        pid = os.getpid()
+        events = []
+        for record in self.records:
+            args = {k: v for k, v in record.items() if k not in ('name', 'start_ns', 'duration_ns', 'thread', 'depth')}
+            events.append({
+                'name': record['name'],
+                'cat': record['name'].split('.')[0],
+                'ph': 'X',
+                'ts': record['start_ns'] / 1000,
+                'dur': record['duration_ns'] / 1000,
+                'pid': pid,
+                'tid': record['thread'],
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        return path
+
+
+def enable(track_allocations=False):
+    """Starts recording into a new Profiler and returns it."""
+    global _profiler
+    disable()
+    _profiler = Profiler(track_allocations).start()
+    return _profiler
+
+
+def disable():
+    """Stops recording; the returned Profiler keeps its records."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def active():
+    """Returns the recording Profiler, or None."""
+    return _profiler
+
+
+@contextlib.contextmanager
+def profiling(track_allocations=False):
+    """Context manager form of enable()/disable()."""
+    profiler = enable(track_allocations)
+    try:
+        yield profiler
+    finally:
+        disable()
+
+
+def stage(name, **fields):
+    """
+    Marks a block of code as a stage.
+
+    The context value is a dict; keys set on it (e.g. rows, bytes) end up in
+    the record. While profiling is off a no-op context is returned whose dict
+    is fresh for every call and simply dropped afterwards.
+    """
+    profiler = _profiler
+    if profiler is None:
+        return contextlib.nullcontext({})
+    return profiler.stage(name, **fields)
+
+
+def _count_rows(args, result):
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if args and isinstance(args[0], pd.DataFrame):
+        return len(args[0])
+    return None
+
+
+def profiled(name=None):
+    """
+    Decorator that records every call of a function as a stage.
+
+    The stage is named after the function unless name is given. rows is set to
+    the length of a DataFrame result, or else of a DataFrame first argument.
+    """
+    def decorate(func):
+        stage_name = name or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                rows = _count_rows(args, result)
+                if rows is not None:
+                    record['rows'] = rows
+                return result
+        return wrapper
+    return decorate
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+
+
+def assign_bins(values, edges, right_closed=None):
+    """
+    Assigns every value to a threshold bin.
+
+    With k edges there are k + 1 bins numbered from the lowest upwards. By default
+    a value equal to an edge belongs to the bin above it, like np.digitize.
+
+    Args:
+        values (array-like): Values to bin.
+        edges (list): Increasing bin edges, e.g. [0], [-1.5, 1.5] or [-1.5, 0, 1.5].
+        right_closed (list, optional): One flag per edge; True puts values equal to
+            that edge into the bin below it instead.
+
+    Returns:
+        numpy.ndarray: Bin number of every value, -1 for NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    edges = np.asarray(edges, dtype=np.float64)
+    bins = np.digitize(values, edges)
+    if right_closed is not None:
+        for edge, closed in zip(edges, right_closed):
+            if closed:
+                bins[values == edge] -= 1
+    bins[np.isnan(values)] = -1
+    return bins
+
+
+def bin_labels(edges, right_closed=None):
+    """
+    Builds readable labels such as '< 0' or '[0, 1.5)' for the bins of assign_bins.
+    """
+    if right_closed is None:
+        right_closed = [False] * len(edges)
+    labels = []
+    for i in range(len(edges) + 1):
+        lower = f"{edges[i - 1]:g}" if i > 0 else None
+        upper = f"{edges[i]:g}" if i < len(edges) else None
+        lower_open = i > 0 and right_closed[i - 1]
+        upper_closed = i < len(edges) and right_closed[i]
+        if lower is None:
+            labels.append(f"{'<=' if upper_closed else '<'} {upper}")
+        elif upper is None:
+            labels.append(f"{'>' if lower_open else '>='} {lower}")
+        else:
+            labels.append(f"{'(' if lower_open else '['}{lower}, {upper}{']' if upper_closed else ')'}")
+    return labels
+
+
+def bin_statistics(values, edges, right_closed=None, hist_bins=10):
+    """
+    Computes per-bin count, mean, standard deviation and histogram in one pass.
+
+    The standard deviation is the sample standard deviation, as returned by
+    statistics.stdev. Each bin's histogram spans that bin's own min..max range
+    with hist_bins equal-width buckets, matching what plt.hist draws by default.
+
+    Args:
+        values (array-like): Values to bin, NaN values are ignored.
+        edges (list): Increasing bin edges, see assign_bins.
+        right_closed (list, optional): Edge closure flags, see assign_bins.
+        hist_bins (int): Number of histogram buckets per bin.
+
+    Returns:
+        tuple: (stats, hist_counts, hist_edges) where stats is a DataFrame indexed
+        by bin number with label, count, mean, std, min and max columns,
+        hist_counts has shape (k + 1, hist_bins) and hist_edges has shape
+        (k + 1, hist_bins + 1).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    bins = assign_bins(values, edges, right_closed)
+    valid = bins >= 0
+    values, bins = values[valid], bins[valid]
+    n_bins = len(edges) + 1
+
+    stats = (
+        pd.Series(values)
+        .groupby(bins)
+        .agg(['count', 'mean', 'std', 'min', 'max'])
+        .reindex(range(n_bins))
+    )
+    stats['count'] = stats['count'].fillna(0).astype(np.int64)
+    stats.insert(0, 'label', bin_labels(edges, right_closed))
+
+    lows = stats['min'].to_numpy()
+    highs = stats['max'].to_numpy()
+    # plt.hist widens a zero-width range by 0.5 on each side; do the same.
+    flat = highs == lows
+    lows = np.where(flat, lows - 0.5, lows)
+    highs = np.where(flat, highs + 0.5, highs)
+    widths = highs - lows
+    position = np.floor((values - lows[bins]) / widths[bins] * hist_bins).astype(np.int64)
+    position = np.clip(position, 0, hist_bins - 1)
+    hist_counts = np.bincount(bins * hist_bins + position, minlength=n_bins * hist_bins).reshape(n_bins, hist_bins)
+    hist_edges = lows[:, None] + widths[:, None] * np.linspace(0.0, 1.0, hist_bins + 1)[None, :]
+    return stats, hist_counts, hist_edges
+
+
+def run_lengths(states):
+    """
+    Run-length encodes a sequence of states.
+
+    Args:
+        states (array-like): Integer state of every hour.
+
+    Returns:
+        tuple: (starts, lengths, values) arrays giving the first index, length and
+        state of every run of identical consecutive states.
+    """
+    states = np.asarray(states)
+    if len(states) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, states[:0]
+    starts = np.r_[0, np.flatnonzero(np.diff(states) != 0) + 1]
+    lengths = np.diff(np.r_[starts, len(states)])
+    return starts, lengths, states[starts]
+
+
+def run_length_statistics(lengths, values, n_states):
+    """
+    Summarises run lengths per state.
+
+    Runs with a negative state (missing data from assign_bins) are ignored.
+
+    Args:
+        lengths (numpy.ndarray): Run lengths from run_lengths.
+        values (numpy.ndarray): Run states from run_lengths.
+        n_states (int): Number of states.
+
+    Returns:
+        pandas.DataFrame: Indexed by state with runs, mean, std (sample), min and
+        max columns; mean and std are NaN where there are too few runs.
+    """
+    keep = values >= 0
+    lengths, values = lengths[keep].astype(np.float64), values[keep]
+    runs = np.bincount(values, minlength=n_states)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(values, weights=lengths, minlength=n_states) / runs
+        squares = np.bincount(values, weights=(lengths - mean[values]) ** 2, minlength=n_states)
+        std = np.sqrt(squares / (runs - 1))
+    std[runs < 2] = np.nan
+    minimum = np.full(n_states, np.nan)
+    maximum = np.full(n_states, np.nan)
+    np.fmin.at(minimum, values, lengths)
+    np.fmax.at(maximum, values, lengths)
+    return pd.DataFrame({'runs': runs, 'mean': mean, 'std': std, 'min': minimum, 'max': maximum})
+
+
+def transition_matrix(states, n_states, normalize=True):
+    """
+    Counts hour-to-hour transitions between states.
+
+    Transitions into or out of a missing (negative) state are skipped.
+
+    Args:
+        states (array-like): Integer state of every hour.
+        n_states (int): Number of states.
+        normalize (bool): Return row-normalised probabilities instead of counts.
+
+    Returns:
+        numpy.ndarray: Matrix of shape (n_states, n_states) where entry [i, j]
+        is the count or probability of moving from state i to state j.
+    """
+    states = np.asarray(states)
+    src, dst = states[:-1], states[1:]
+    keep = (src >= 0) & (dst >= 0)
+    counts = np.bincount(src[keep] * n_states + dst[keep], minlength=n_states * n_states)
+    counts = counts.reshape(n_states, n_states)
+    if not normalize:
+        return counts
+    totals = counts.sum(axis=1, keepdims=True)
+    return np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
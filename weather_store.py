@@ -0,0 +1,184 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMATS = {'parquet': '.parquet', 'feather': '.feather'}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("weather_store needs pyarrow (pip install pyarrow)")
+
+
+def location_dir(root, latitude, longitude):
+    """Returns the partition directory of one location."""
+    return os.path.join(root, f"lat={float(latitude):.4f}_lon={float(longitude):.4f}")
+
+
+def _to_table(df, variables):
+    """Converts the time and variables columns of a DataFrame to an Arrow table with float32 values."""
+    columns = {'time': pa.array(pd.to_datetime(df['time']).to_numpy().astype('datetime64[s]'), type=pa.timestamp('s'))}
+    for var in variables:
+        columns[var] = pa.array(df[var].to_numpy(dtype=np.float32, na_value=np.nan), type=pa.float32())
+    return pa.table(columns)
+
+
+def _read_table(path, columns=None, start=None, end=None, memory_map=True):
+    if columns is not None:
+        # A partition only holds the variables it was written with.
+        if path.endswith('.parquet'):
+            schema = pq.read_schema(path)
+        else:
+            with pa.memory_map(path) as source:
+                schema = pa.ipc.open_file(source).schema
+        columns = [c for c in columns if c in schema.names]
+    if path.endswith('.parquet'):
+        filters = []
+        if start is not None:
+            filters.append(('time', '>=', start))
+        if end is not None:
+            filters.append(('time', '<', end))
+        return pq.read_table(path, columns=columns, filters=filters or None, memory_map=memory_map)
+    table = feather.read_table(path, columns=columns, memory_map=memory_map)
+    if start is not None:
+        table = table.filter(pc.greater_equal(table['time'], pa.scalar(start, type=table['time'].type)))
+    if end is not None:
+        table = table.filter(pc.less(table['time'], pa.scalar(end, type=table['time'].type)))
+    return table
+
+
+def write_series(root, latitude, longitude, df, variables, fmt='parquet'):
+    """
+    Writes fetched data to month partitions under root.
+
+    Only the time column and the given variables are stored, so columns the
+    analysis functions add to a frame (such as the *_diff_to_* columns) stay
+    out of the store. Values are stored as float32. For hours already on disk
+    the written variables replace the stored values; other stored variables
+    are kept. A month stored in the other format is merged the same way and
+    its file removed, so every month has one partition.
+
+    Args:
+        root (str): Root directory of the store.
+        latitude (float): Latitude of the location.
+        longitude (float): Longitude of the location.
+        df (pandas.DataFrame): DataFrame in the fetch_meteo_data format.
+        variables (list): Columns of df to store.
+        fmt (str): 'parquet' or 'feather'.
+
+    Returns:
+        list: Paths of the partitions that were written.
+    """
+    _require_pyarrow()
+    if df is None or df.empty:
+        return []
+    extension = FORMATS[fmt]
+    directory = location_dir(root, latitude, longitude)
+    os.makedirs(directory, exist_ok=True)
+    months = pd.to_datetime(df['time']).dt.strftime('%Y-%m')
+    written = []
+    variables = list(variables)
+    df = df[['time'] + variables].assign(time=pd.to_datetime(df['time']).astype('datetime64[ns]'))
+    for month, part in df.groupby(months.to_numpy(), sort=True):
+        path = os.path.join(directory, month + extension)
+        existing = _month_paths(directory, month)
+        part = part.drop_duplicates(subset='time', keep='last').set_index('time')
+        stored = variables
+        if existing:
+            old = _read_table(existing[-1], memory_map=False).to_pandas()
+            # Widen the stored float32 values so the new float64 values can be written into them.
+            old = old.assign(time=old['time'].astype('datetime64[ns]')).set_index('time').astype(np.float64)
+            stored = list(old.columns) + [var for var in variables if var not in old.columns]
+            merged = old.reindex(old.index.union(part.index), columns=stored)
+            merged.loc[part.index, variables] = part[variables]
+            part = merged
+        table = _to_table(part.sort_index(kind='stable').reset_index(), stored)
+        tmp_path = path + '.tmp'
+        if fmt == 'parquet':
+            pq.write_table(table, tmp_path)
+        else:
+            # Uncompressed Feather can be memory-mapped without a copy.
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        for other in existing:
+            if other != path:
+                os.remove(other)
+        written.append(path)
+    return written
+
+
+def _month_paths(directory, month):
+    """Returns the existing partition files of one month, oldest first."""
+    paths = [os.path.join(directory, month + extension) for extension in FORMATS.values()]
+    return sorted((path for path in paths if os.path.exists(path)), key=os.path.getmtime)
+
+
+def list_partitions(root, latitude, longitude):
+    """
+    Returns (month, path) pairs for a location, sorted by month.
+
+    If a month is stored in both formats, as stores written before
+    write_series removed the other format can be, the newer file is used.
+    """
+    partitions = {}
+    for extension in FORMATS.values():
+        for path in glob.glob(os.path.join(location_dir(root, latitude, longitude), '*' + extension)):
+            month = os.path.basename(path)[:-len(extension)]
+            if month not in partitions or os.path.getmtime(path) > os.path.getmtime(partitions[month]):
+                partitions[month] = path
+    return sorted(partitions.items())
+
+
+def read_series(root, latitude, longitude, start=None, end=None, columns=None, memory_map=True):
+    """
+    Reads a time window of stored data back as a DataFrame.
+
+    Only partitions whose month overlaps the window are opened, and only the
+    requested columns are read. Parquet files additionally filter row groups
+    on time; Feather files are memory-mapped. Partitions written with
+    different variables are combined, with NaN for the hours of a variable a
+    partition does not hold.
+
+    Args:
+        root (str): Root directory of the store.
+        latitude (float): Latitude of the location.
+        longitude (float): Longitude of the location.
+        start (str, optional): First time to include, e.g. '2024-02-01'.
+        end (str, optional): Time to stop before, e.g. '2024-03-01'.
+        columns (list, optional): Variables to read, all of them by default.
+        memory_map (bool): Memory-map the files where possible.
+
+    Returns:
+        pandas.DataFrame: DataFrame in the fetch_meteo_data format, with float32
+        values and datetime64[ns] times whichever format stored them, or None
+        if nothing is stored for the window.
+    """
+    _require_pyarrow()
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    first_month = start.strftime('%Y-%m') if start is not None else None
+    last_month = (end - pd.Timedelta(seconds=1)).strftime('%Y-%m') if end is not None else None
+    read_columns = None if columns is None else ['time'] + [c for c in columns if c != 'time']
+
+    tables = []
+    for month, path in list_partitions(root, latitude, longitude):
+        if first_month is not None and month < first_month:
+            continue
+        if last_month is not None and month > last_month:
+            continue
+        tables.append(_read_table(path, read_columns, start, end, memory_map))
+    if not tables:
+        return None
+    # Parquet stores second timestamps as milliseconds; Feather keeps seconds.
+    tables = [table.set_column(table.schema.get_field_index('time'), 'time', table['time'].cast(pa.timestamp('ns'))) for table in tables]
+    return pa.concat_tables(tables, promote_options='default').to_pandas()
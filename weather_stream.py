@@ -0,0 +1,290 @@
+import numpy as np
+import pandas as pd
+
+from weather_stats import assign_bins, bin_labels, run_lengths
+
+
+class RunningMoments:
+    """
+    Running count, mean, variance, min and max for a fixed number of groups.
+
+    Chunks are folded in with the parallel form of Welford's algorithm (Chan et
+    al.), so memory stays O(1) per group and two accumulators can be merged.
+
+    Args:
+        n_groups (int): Number of groups.
+    """
+
+    def __init__(self, n_groups):
+        self.count = np.zeros(n_groups, dtype=np.int64)
+        self.mean = np.zeros(n_groups)
+        self.m2 = np.zeros(n_groups)
+        self.min = np.full(n_groups, np.nan)
+        self.max = np.full(n_groups, np.nan)
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            weight = np.where(total > 0, count / total, 0.0)
+            self.mean = np.where(count > 0, self.mean + delta * weight, self.mean)
+            self.m2 = np.where(count > 0, self.m2 + m2 + delta ** 2 * self.count * weight, self.m2)
+        self.count = total
+        self.min = np.fmin(self.min, minimum)
+        self.max = np.fmax(self.max, maximum)
+
+    def update(self, values, groups):
+        """
+        Adds a chunk of values.
+
+        Args:
+            values (numpy.ndarray): Values to add.
+            groups (numpy.ndarray): Group of every value; negative groups are skipped.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        groups = np.asarray(groups)
+        keep = groups >= 0
+        values, groups = values[keep], groups[keep]
+        if len(values) == 0:
+            return
+        n_groups = len(self.count)
+        count = np.bincount(groups, minlength=n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.bincount(groups, weights=values, minlength=n_groups) / count
+        mean = np.nan_to_num(mean)
+        m2 = np.bincount(groups, weights=(values - mean[groups]) ** 2, minlength=n_groups)
+        minimum = np.full(n_groups, np.nan)
+        maximum = np.full(n_groups, np.nan)
+        np.fmin.at(minimum, groups, values)
+        np.fmax.at(maximum, groups, values)
+        self._combine(count, mean, m2, minimum, maximum)
+
+    def merge(self, other):
+        """Folds another accumulator over the same groups into this one."""
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def copy(self):
+        result = RunningMoments(len(self.count))
+        result.merge(self)
+        return result
+
+    @property
+    def std(self):
+        """Sample standard deviation per group, NaN with fewer than two values."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+    def frame(self, count_name='count'):
+        """Returns the statistics as a DataFrame indexed by group."""
+        mean = np.where(self.count > 0, self.mean, np.nan)
+        return pd.DataFrame({count_name: self.count, 'mean': mean, 'std': self.std, 'min': self.min, 'max': self.max})
+
+
+class FixedHistogram:
+    """
+    Per-group histogram over fixed bucket edges, so histograms of separate
+    chunks can simply be added together.
+
+    Values outside the edges are counted in underflow and overflow.
+
+    Args:
+        edges (array-like): Increasing bucket edges shared by all groups.
+        n_groups (int): Number of groups.
+    """
+
+    def __init__(self, edges, n_groups):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        n_buckets = len(self.edges) - 1
+        self.counts = np.zeros((n_groups, n_buckets), dtype=np.int64)
+        self.underflow = np.zeros(n_groups, dtype=np.int64)
+        self.overflow = np.zeros(n_groups, dtype=np.int64)
+
+    def update(self, values, groups):
+        """Adds a chunk of values; negative groups are skipped."""
+        values = np.asarray(values, dtype=np.float64)
+        groups = np.asarray(groups)
+        keep = groups >= 0
+        values, groups = values[keep], groups[keep]
+        n_groups, n_buckets = self.counts.shape
+        # Like np.histogram, the last bucket includes its right edge.
+        bucket = np.searchsorted(self.edges, values, side='right') - 1
+        bucket[values == self.edges[-1]] = n_buckets - 1
+        below = bucket < 0
+        above = bucket >= n_buckets
+        self.underflow += np.bincount(groups[below], minlength=n_groups)
+        self.overflow += np.bincount(groups[above], minlength=n_groups)
+        inside = ~(below | above)
+        flat = np.bincount(groups[inside] * n_buckets + bucket[inside], minlength=n_groups * n_buckets)
+        self.counts += flat.reshape(n_groups, n_buckets)
+
+    def merge(self, other):
+        """Adds another histogram with the same edges and groups."""
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+
+class RunningRunLengths:
+    """
+    Run-length statistics of a state sequence that arrives in chunks.
+
+    The first and the last run of the data seen so far are kept aside, since a
+    neighbouring chunk may still extend them; only runs known to be complete go
+    into the per-state statistics. This keeps the state O(1) per state and
+    makes accumulators of consecutive segments mergeable in time order.
+
+    Args:
+        n_states (int): Number of states.
+    """
+
+    def __init__(self, n_states):
+        self.n_states = n_states
+        self.interior = RunningMoments(n_states)
+        self.transitions = np.zeros((n_states, n_states), dtype=np.int64)
+        self.head = None
+        self.tail = None
+        self.single = True
+
+    def _add_run(self, state, length):
+        if state >= 0:
+            self.interior.update([length], [state])
+
+    def update(self, states):
+        """Adds the states of the next chunk in time order."""
+        states = np.asarray(states)
+        if len(states) == 0:
+            return
+        segment = RunningRunLengths(self.n_states)
+        _, lengths, values = run_lengths(states)
+        segment.head = (int(values[0]), int(lengths[0]))
+        segment.tail = (int(values[-1]), int(lengths[-1]))
+        segment.single = len(lengths) == 1
+        if len(lengths) > 2:
+            segment.interior.update(lengths[1:-1], values[1:-1])
+        src, dst = states[:-1], states[1:]
+        keep = (src >= 0) & (dst >= 0)
+        flat = np.bincount(src[keep] * self.n_states + dst[keep], minlength=self.n_states ** 2)
+        segment.transitions = flat.reshape(self.n_states, self.n_states)
+        self.merge(segment)
+
+    def merge(self, other):
+        """Appends an accumulator covering the data right after this one."""
+        if other.head is None:
+            return self
+        if self.head is None:
+            self.head, self.tail, self.single = other.head, other.tail, other.single
+            self.interior = other.interior.copy()
+            self.transitions = other.transitions.copy()
+            return self
+
+        self.transitions = self.transitions + other.transitions
+        tail_state, head_state = self.tail[0], other.head[0]
+        if tail_state >= 0 and head_state >= 0:
+            self.transitions[tail_state, head_state] += 1
+        self.interior.merge(other.interior)
+
+        if tail_state == head_state:
+            joined = (tail_state, self.tail[1] + other.head[1])
+            if self.single and other.single:
+                self.head = self.tail = joined
+            elif self.single:
+                self.head, self.tail = joined, other.tail
+            elif other.single:
+                self.tail = joined
+            else:
+                self._add_run(*joined)
+                self.tail = other.tail
+            self.single = self.single and other.single
+        else:
+            if not self.single:
+                self._add_run(*self.tail)
+            if not other.single:
+                self._add_run(*other.head)
+            self.tail = other.tail
+            self.single = False
+        return self
+
+    def statistics(self):
+        """
+        Returns the same table as weather_stats.run_length_statistics, counting
+        the first and the still open last run as they stand.
+        """
+        result = self.interior.copy()
+        if self.head is not None:
+            runs = [self.head] if self.single else [self.head, self.tail]
+            for state, length in runs:
+                if state >= 0:
+                    result.update([length], [state])
+        return result.frame(count_name='runs')
+
+    def transition_matrix(self, normalize=True):
+        """Returns the hourly transition counts or row-normalised probabilities."""
+        if not normalize:
+            return self.transitions.copy()
+        totals = self.transitions.sum(axis=1, keepdims=True)
+        return np.divide(self.transitions, totals, out=np.zeros(self.transitions.shape), where=totals > 0)
+
+
+class HourlyDiffAccumulator:
+    """
+    Incremental version of the grouped diff and find_Hmm analyses.
+
+    Feed DataFrames in the fetch_meteo_data format in time order with update();
+    the statistics always equal what bin_statistics, run_length_statistics and
+    transition_matrix return for all rows seen so far (up to floating-point
+    rounding). The input frames are not modified.
+
+    Args:
+        var1 (str): name of the air temperature column
+        var2 (str): name of the soil temperature column
+        edges (list): Increasing bin edges, see weather_stats.assign_bins.
+        right_closed (list, optional): Edge closure flags, see weather_stats.assign_bins.
+        hist_edges (array-like, optional): Fixed histogram bucket edges for the
+            differences, defaults to 0.5 °C buckets from -20 to 20 °C.
+    """
+
+    def __init__(self, var1, var2, edges, right_closed=None, hist_edges=None):
+        self.var1 = var1
+        self.var2 = var2
+        self.edges = list(edges)
+        self.right_closed = right_closed
+        n_bins = len(self.edges) + 1
+        if hist_edges is None:
+            hist_edges = np.arange(-20.0, 20.5, 0.5)
+        self.values = RunningMoments(n_bins)
+        self.histogram = FixedHistogram(hist_edges, n_bins)
+        self.runs = RunningRunLengths(n_bins)
+
+    def update(self, df):
+        """Adds the next chunk of hourly rows."""
+        if df is None or len(df) == 0:
+            return self
+        diff = df[self.var2].to_numpy(dtype=np.float64, na_value=np.nan) - df[self.var1].to_numpy(dtype=np.float64, na_value=np.nan)
+        bins = assign_bins(diff, self.edges, self.right_closed)
+        self.values.update(diff, bins)
+        self.histogram.update(diff, bins)
+        self.runs.update(bins)
+        return self
+
+    def merge(self, other):
+        """Appends an accumulator that covers the rows right after this one."""
+        self.values.merge(other.values)
+        self.histogram.merge(other.histogram)
+        self.runs.merge(other.runs)
+        return self
+
+    def bin_statistics(self):
+        """Returns the per-bin table in the format of weather_stats.bin_statistics."""
+        stats = self.values.frame()
+        stats.insert(0, 'label', bin_labels(self.edges, self.right_closed))
+        return stats
+
+    def run_statistics(self):
+        """Returns the per-state run length table of weather_stats.run_length_statistics."""
+        return self.runs.statistics()
+
+    def transition_matrix(self, normalize=True):
+        """Returns the hourly state-transition matrix."""
+        return self.runs.transition_matrix(normalize)